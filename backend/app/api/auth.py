@@ -1,22 +1,39 @@
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
-from database.models import get_db
-from database import crud
+from database.models import get_async_db
+from database import async_crud as crud
+from api.cache import TTLCache
+from api.metrics import register_cache
 
 # Load secrets from environment variables
 SECRET_KEY = os.getenv("SECRET_KEY", "replace-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Comma-separated usernames allowed to use admin-only options (e.g. forced refreshes)
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow (~100-300ms). It runs on a small dedicated pool so a
+# burst of logins queues there instead of freezing the event loop.
+BCRYPT_MAX_CONCURRENCY = int(os.getenv("BCRYPT_MAX_CONCURRENCY", "2"))
+bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_CONCURRENCY, thread_name_prefix="bcrypt")
+
+# Verified JWT subject -> user row, so authenticated requests skip the users query
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+user_cache = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+register_cache("auth_user", user_cache)
+
 # OAuth2 token URL
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -41,10 +58,22 @@ def verify_password(plain_password, hashed_password):
 def hash_password(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_executor, verify_password, plain_password, hashed_password)
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_executor, hash_password, password)
+
+def invalidate_cached_user(username: str):
+    """Call whenever a user row changes (or is deleted)."""
+    user_cache.invalidate(username)
+
 # Authentication logic
-def authenticate_user(db: Session, username: str, password: str):
-    user = crud.get_user_by_username(db, username)
-    if not user or not verify_password(password, user.hashed_password):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await crud.get_user_by_username(db, username)
+    if not user or not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -55,7 +84,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 # Get current user from token
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -69,34 +98,44 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_username(db, username=username)
+    user = user_cache.lookup(username)
+    if user is not None:
+        return user
+    user = await crud.get_user_by_username(db, username=username)
     if user is None:
         raise credentials_exception
+    # Detach so the cached row outlives this request's session
+    db.expunge(user)
+    user_cache.set(username, user)
     return user
 
+def is_admin(user) -> bool:
+    return user is not None and user.username in ADMIN_USERNAMES
+
 # API router
 auth_router = APIRouter()
 
 # Register endpoint
 @auth_router.post("/register", status_code=201)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if username or email already exists
-    if crud.get_user_by_username(db, username=user.username):
+    if await crud.get_user_by_username(db, username=user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    if crud.get_user_by_email(db, email=user.email):
+    if await crud.get_user_by_email(db, email=user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password before storing
-    hashed_pw = hash_password(user.password)
-    crud.create_user(db=db, username=user.username, email=user.email, password=hashed_pw)
+    hashed_pw = await hash_password_async(user.password)
+    await crud.create_user(db=db, username=user.username, email=user.email, hashed_password=hashed_pw)
+    invalidate_cached_user(user.username)
     
     return {"msg": "User registered successfully"}
 
 # Login endpoint
 @auth_router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+# Result handed to waiters when the leading caller was cancelled: they start over
+_RETRY = object()
+
+
+class TTLCache:
+    """
+    In-process TTL + LRU cache with single-flight loading.
+
+    Concurrent misses for the same key share one in-flight loader call
+    instead of each hitting the upstream. If the caller running the loader
+    is cancelled, the others retry instead of failing with it.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float | Callable[[], float] = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Any, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _ttl_seconds(self, ttl=None) -> float:
+        ttl = self.ttl if ttl is None else ttl
+        return ttl() if callable(ttl) else ttl
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def lookup(self, key):
+        """get() that counts a hit or a miss, for callers that load a miss themselves."""
+        value = self.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self._data[key] = (time.monotonic() + self._ttl_seconds(ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_load(self, key, loader: Callable[[], Awaitable[Any]], ttl=None):
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                value = await asyncio.shield(pending)
+                if value is _RETRY:
+                    continue  # one of the waiters becomes the new leader
+                return value
+
+            self.misses += 1
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            try:
+                value = await loader()
+            except asyncio.CancelledError:
+                # Only this caller was cancelled; the waiters weren't
+                future.set_result(_RETRY)
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                # Mark retrieved so an un-awaited failure doesn't log a warning
+                future.exception()
+                raise
+            else:
+                self.set(key, value, ttl)
+                future.set_result(value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "in_flight": len(self._inflight),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
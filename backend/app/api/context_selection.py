@@ -0,0 +1,248 @@
+import heapq
+import os
+import re
+from dataclasses import dataclass, field
+
+# Prompt budget for news text (scraped articles + stored context), in tokens
+ANALYSIS_CONTEXT_TOKENS = int(os.getenv("ANALYSIS_CONTEXT_TOKENS", "2000"))
+# At most this share of the budget goes to stored (database) news
+STORED_CONTEXT_SHARE = float(os.getenv("STORED_CONTEXT_SHARE", "0.25"))
+# Paragraphs at least this similar (Jaccard over word shingles) count as duplicates
+DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.6"))
+
+SHINGLE_SIZE = 4
+MIN_PASSAGE_CHARS = 40
+# Each further paragraph from the same article is worth a bit less
+SAME_SOURCE_DECAY = 0.85
+# Stored news competes with the articles scraped for this request at a discount
+STORED_WEIGHT = 0.6
+
+# Corporate suffixes dropped from a company name before phrase matching
+# (also used by news_search); filler words only don't count as name terms
+NAME_SUFFIXES = {"limited", "ltd", "co", "corporation", "corp"}
+NAME_FILLER_WORDS = {"india", "the", "and", "of"}
+SIGNAL_WORDS = {
+    "profit", "revenue", "earnings", "margin", "quarter", "guidance", "target", "downgrade",
+    "upgrade", "dividend", "buyback", "crore", "lakh", "ebitda", "outlook", "order", "stake",
+    "acquisition", "merger", "results", "growth", "debt", "rating", "sebi", "rbi",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English news text; close enough for budgeting
+    return max(1, len(text) // 4)
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def shingles(words: list[str], size: int = SHINGLE_SIZE) -> frozenset:
+    if len(words) <= size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class Passage:
+    text: str
+    source: str  # "article" (scraped for this request) or "stored"
+    doc: int  # article index, or stored news rank
+    position: int  # paragraph number within the article
+    label: str = ""
+    score: float = 0.0
+    tokens: int = 0
+    shingles: frozenset = frozenset()
+
+
+@dataclass
+class ContextSelection:
+    articles: list[str]
+    stored: list[str]
+    stored_heading: str
+    included: list[Passage]
+    dropped: dict = field(default_factory=dict)
+    budget: int = ANALYSIS_CONTEXT_TOKENS
+
+    @property
+    def tokens_used(self) -> int:
+        return sum(p.tokens for p in self.included)
+
+    def debug_view(self) -> dict:
+        return {
+            "budget_tokens": self.budget,
+            "tokens_used": self.tokens_used,
+            "stored_heading": self.stored_heading,
+            "dropped": self.dropped,
+            "included": [
+                {
+                    "source": p.source,
+                    "doc": p.doc,
+                    "position": p.position,
+                    "label": p.label,
+                    "score": round(p.score, 3),
+                    "tokens": p.tokens,
+                    "preview": p.text[:120],
+                }
+                for p in self.included
+            ],
+        }
+
+
+class RelevanceScorer:
+    """
+    Scores text for a symbol: ticker mentions, the company name as a phrase,
+    how many of the name's distinctive words appear, plus a small bonus for
+    financially meaningful words.
+    """
+
+    def __init__(self, symbol: str | None, company_name: str | None):
+        self.symbol = (symbol or "").strip().lower()
+        name_words = _words(company_name or "")
+        while len(name_words) > 1 and name_words[-1] in NAME_SUFFIXES:
+            name_words.pop()
+        self.name_phrase = " ".join(name_words)
+        self.name_terms = {w for w in name_words if w not in NAME_SUFFIXES | NAME_FILLER_WORDS and len(w) > 2}
+
+    def score(self, text: str) -> float:
+        words = _words(text)
+        if not words:
+            return 0.0
+        vocabulary = set(words)
+        score = 0.0
+        if self.symbol and self.symbol in vocabulary:
+            score += 2.0
+        if self.name_phrase and self.name_phrase in " ".join(words):
+            score += 2.0
+        if self.name_terms:
+            score += len(self.name_terms & vocabulary) / len(self.name_terms)
+        score += min(len(SIGNAL_WORDS & vocabulary), 3) * 0.2
+        if any(ch.isdigit() for ch in text):
+            score += 0.2  # figures: prices, percentages, dates
+        return score
+
+
+def split_passages(article: str, doc: int) -> list[Passage]:
+    passages = []
+    for position, paragraph in enumerate(p.strip() for p in re.split(r"\n+", article)):
+        if len(paragraph) >= MIN_PASSAGE_CHARS:
+            passages.append(Passage(text=paragraph, source="article", doc=doc, position=position))
+    if not passages and article.strip():
+        # Only short lines (bullets, a one-line brief): keep them as one passage
+        passages.append(Passage(text=" ".join(article.split()), source="article", doc=doc, position=0))
+    return passages
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Leading part of `text` within `tokens`, cut at a word boundary."""
+    limit = tokens * 4 - 1
+    if len(text) <= limit + 1:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > limit // 2 else limit].rstrip() + "…"
+
+
+def select_context(
+    articles: list[str],
+    stored: list[dict],
+    symbol: str | None = None,
+    company_name: str | None = None,
+    stored_heading: str = "",
+    budget: int = ANALYSIS_CONTEXT_TOKENS,
+) -> ContextSelection:
+    """
+    Pick the most relevant, non-duplicate text from the scraped articles and
+    the stored news items ({"headline", "snippet", ...}) within `budget`
+    tokens. Greedy: best remaining passage first, skipping near-duplicates of
+    anything already chosen; the result is put back in reading order.
+    """
+    scorer = RelevanceScorer(symbol, company_name)
+    candidates = []
+    for doc, article in enumerate(articles):
+        for passage in split_passages(article, doc):
+            # Earlier paragraphs of a news article usually carry the story
+            passage.score = (1.0 + scorer.score(passage.text)) / (1.0 + 0.05 * passage.position)
+            candidates.append(passage)
+    for rank, item in enumerate(stored):
+        title = item.get("headline") or item.get("link") or ""
+        text = f"{title} - {item['snippet']}" if item.get("snippet") else title
+        if not text:
+            continue
+        passage = Passage(text=text, source="stored", doc=rank, position=0, label=item.get("link") or "")
+        passage.score = STORED_WEIGHT * (1.0 + scorer.score(text))
+        candidates.append(passage)
+    stored_budget = int(budget * STORED_CONTEXT_SHARE)
+    chosen: list[Passage] = []
+    per_doc: dict[tuple[str, int], int] = {}
+    used = stored_used = 0
+    dropped = {"duplicates": 0, "over_budget": 0, "truncated": 0}
+
+    def effective(p: Passage) -> float:
+        return p.score * SAME_SOURCE_DECAY ** per_doc.get((p.source, p.doc), 0)
+
+    # Lazy greedy: scores only ever decay, so a popped passage whose
+    # recomputed score still beats the next heap entry is the true best
+    heap = [(-p.score, i, p) for i, p in enumerate(candidates)]
+    heapq.heapify(heap)
+    while heap and budget - used >= MIN_PASSAGE_CHARS // 4:
+        key, i, best = heapq.heappop(heap)
+        current = effective(best)
+        if heap and current < -heap[0][0] and current < -key:
+            heapq.heappush(heap, (-current, i, best))
+            continue
+        best.tokens = estimate_tokens(best.text)
+        if best.source == "article" and used + best.tokens > budget and not any(
+            p.source == "article" and p.doc == best.doc for p in chosen
+        ):
+            # An article's best paragraph is longer than what's left: keep its
+            # beginning rather than losing the article altogether
+            best.text = truncate_to_tokens(best.text, budget - used)
+            best.tokens = estimate_tokens(best.text)
+            dropped["truncated"] += 1
+        if used + best.tokens > budget or (best.source == "stored" and stored_used + best.tokens > stored_budget):
+            dropped["over_budget"] += 1
+            continue
+        best.shingles = shingles(_words(best.text))
+        if any(jaccard(best.shingles, p.shingles) >= DUPLICATE_THRESHOLD for p in chosen):
+            dropped["duplicates"] += 1
+            continue
+        best.score = current
+        chosen.append(best)
+        per_doc[(best.source, best.doc)] = per_doc.get((best.source, best.doc), 0) + 1
+        used += best.tokens
+        if best.source == "stored":
+            stored_used += best.tokens
+    dropped["over_budget"] += len(heap)
+
+    if articles and not any(p.source == "article" for p in chosen):
+        # Never send a prompt without any article text: fall back to each
+        # article's leading passage, truncated to an equal share of the budget
+        share = max((budget - used) // len(articles), MIN_PASSAGE_CHARS // 4)
+        for doc, article in enumerate(articles):
+            leading = split_passages(article, doc)[:1]
+            for passage in leading:
+                passage.text = truncate_to_tokens(passage.text, share)
+                passage.tokens = estimate_tokens(passage.text)
+                chosen.append(passage)
+                dropped["truncated"] += 1
+
+    chosen.sort(key=lambda p: (p.source != "article", p.doc, p.position))
+    article_texts = []
+    for doc in sorted({p.doc for p in chosen if p.source == "article"}):
+        article_texts.append("\n".join(p.text for p in chosen if p.source == "article" and p.doc == doc))
+    return ContextSelection(
+        articles=article_texts,
+        stored=[p.text for p in chosen if p.source == "stored"],
+        stored_heading=stored_heading,
+        included=chosen,
+        dropped=dropped,
+        budget=budget,
+    )
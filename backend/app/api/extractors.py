@@ -0,0 +1,172 @@
+from dataclasses import dataclass, field
+import re
+from urllib.parse import unquote
+
+from bs4 import BeautifulSoup
+
+from api.html_parser import make_soup
+from api.quote_model import Quote
+
+# Pure HTML -> dict extraction. Nothing here touches the network, the DB or
+# FastAPI, so these functions can run inside the parse pool's worker processes.
+
+# --- Google Finance Quote Page ---
+@dataclass
+class QuotePage:
+    """Everything we read from one Google Finance quote page."""
+    stock_data: dict  # display strings, as shown on the page
+    news: list[dict] = field(default_factory=list)  # [{"headline", "link"}]
+    quote: Quote | None = None  # the same metrics, parsed to numbers
+    stale: bool = False  # served from the last good copy while upstream is unavailable
+    status: str = "ok"  # "ok", "not_found" (a Finance page without figures) or "unrecognized"
+
+# Interstitials Google serves instead of the page when it is throttling us
+QUOTE_BLOCK_MARKERS = (
+    "unusual traffic from your computer network",
+    "g-recaptcha",
+    "consent.google.com",
+    "Before you continue to Google",
+)
+
+def is_blocked_page(html: str) -> bool:
+    return any(marker in html for marker in QUOTE_BLOCK_MARKERS)
+
+def extract_quote_page(html: str, news_limit: int = 7, symbol: str = "") -> QuotePage:
+    """
+    Parse a quote page once and return both the metrics and the news links.
+    """
+    soup = make_soup(html)
+    stock_data = parse_stock_info(soup)
+    quote = Quote.from_display(stock_data, symbol=symbol)
+    status = "ok"
+    if quote.is_empty:
+        # Unknown symbols still get a normal Google Finance page, just without
+        # figures; anything else means the layout changed or we were blocked
+        title = soup.title.get_text() if soup.title else ""
+        status = "not_found" if "Google Finance" in title else "unrecognized"
+    return QuotePage(
+        stock_data=stock_data,
+        news=parse_quote_news(soup, news_limit),
+        quote=quote,
+        status=status,
+    )
+
+def parse_google_finance_data(html):
+    return parse_stock_info(make_soup(html))
+
+def parse_quote_news(soup: BeautifulSoup, limit: int = 7) -> list[dict]:
+    news = []
+    for item in soup.find_all("div", class_="yY3Lee")[:limit]:
+        a_tag = item.find("a", href=True)
+        headline_div = item.find("div", class_="Yfwt5")
+        if a_tag and headline_div:
+            link = a_tag['href']
+            if link.startswith('/'):
+                link = f"https://www.google.com{link}"
+            news.append({"headline": headline_div.get_text(strip=True), "link": link})
+    return news
+
+def parse_stock_info(soup: BeautifulSoup) -> dict:
+    # Extract current price
+    price_div = soup.find("div", class_="YMlKec fxKbKc")
+    price = price_div.text.strip() if price_div else "N/A"
+
+    # Extract other stock metadata
+    stock_info = {
+        "price": price,
+        "revenue": "N/A",
+        "profit": "N/A",
+        "previous_close": "N/A",
+        "day_range": "N/A",
+        "year_range": "N/A",
+        "market_cap": "N/A",
+        "avg_volume": "N/A",
+        "pe_ratio": "N/A",
+        "dividend_yield": "N/A",
+        "primary_exchange": "N/A",
+    }
+
+    # Try parsing the financial summary table
+    summary_rows = soup.find_all("div", class_="gyFHrc")
+    for row in summary_rows:
+        try:
+            label = row.find("div", class_="mfs7Fc").text.strip().lower()
+            value = row.find("div", class_="P6K39c").text.strip()
+
+            if "previous close" in label:
+                stock_info["previous_close"] = value
+            elif "day range" in label:
+                stock_info["day_range"] = value
+            elif "year range" in label:
+                stock_info["year_range"] = value
+            elif "market cap" in label:
+                stock_info["market_cap"] = value
+            elif "avg volume" in label or "volume" in label:
+                stock_info["avg_volume"] = value
+            elif "p/e ratio" in label:
+                stock_info["pe_ratio"] = value
+            elif "dividend yield" in label:
+                stock_info["dividend_yield"] = value
+            elif "primary exchange" in label:
+                stock_info["primary_exchange"] = value
+        except:
+            continue
+
+    # Also extract revenue and profit (like before)
+    tables = soup.find_all('table', class_="slpEwd")
+    for table in tables:
+        for row in table.find_all('tr', class_="roXhBd"):
+            cells = row.find_all('td')
+            if len(cells) >= 2:
+                label = cells[0].find('div', class_="rsPbEe").get_text(strip=True).lower()
+                value = cells[1].get_text(strip=True)
+                if 'revenue' in label and stock_info["revenue"] == "N/A":
+                    stock_info["revenue"] = value
+                if ('net profit margin' in label or 'profit' in label) and stock_info["profit"] == "N/A":
+                    stock_info["profit"] = value
+
+    return stock_info
+
+
+# --- Yahoo News Search Results ---
+YAHOO_REDIRECT_PATTERN = re.compile(r'RU=(.+?)/RK')
+
+def parse_yahoo_news(html: str) -> list[dict]:
+    """
+    Headlines, publisher links and snippets from a Yahoo news search page.
+    """
+    soup = make_soup(html)
+    news_list = []
+    all_items = soup.select("li")  # Select all list items — many news results are in <li> elements
+
+    # for li in soup.select("li.ov-a"):
+    for li in all_items:
+        li_class = li.get("class", [])
+        if any("ad" in c for c in li_class):
+            continue
+        h4 = li.find("h4", class_="s-title")
+        a = h4.find("a") if h4 else None
+        headline = a.text.strip() if a else None
+        link = a["href"] if a and a.has_attr("href") else None
+
+        # Extract and clean the publisher link if it's a Yahoo redirect
+        clear_link = None
+        if link:
+            unquoted_link = unquote(link)
+            match = re.search(YAHOO_REDIRECT_PATTERN, unquoted_link)
+            if match:
+                clear_link = unquote(match.group(1))
+            else:
+                clear_link = link  # fallback to raw link if pattern not found
+
+        snippet_tag = li.find("p", class_="s-desc")
+        snippet = snippet_tag.text.strip() if snippet_tag else None
+
+        if headline and clear_link:
+            news_list.append({
+                "headline": headline,
+                "link": clear_link,
+                "snippet": snippet,
+                "article": None
+            })
+    return news_list
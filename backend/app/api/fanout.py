@@ -0,0 +1,155 @@
+import asyncio
+import os
+from urllib.parse import urlsplit
+
+import httpx
+
+from api.http_client import http_client
+from api.upstream import guard_for, guarded_get
+
+# Whole news fan-out: after this many seconds return what we have
+NEWS_FANOUT_DEADLINE = float(os.getenv("NEWS_FANOUT_DEADLINE", "8"))
+# Per-article budget, and the reduced budget for publishers that are consistently slow
+ARTICLE_FETCH_BUDGET = float(os.getenv("ARTICLE_FETCH_BUDGET", "20"))
+SLOW_DOMAIN_BUDGET = float(os.getenv("SLOW_DOMAIN_BUDGET", "4"))
+SLOW_DOMAIN_THRESHOLD = float(os.getenv("SLOW_DOMAIN_THRESHOLD", "3"))  # EWMA seconds
+# Hedging: fire a second request if the first hasn't answered by then
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "1.0"))
+HEDGE_MULTIPLIER = float(os.getenv("HEDGE_MULTIPLIER", "2.0"))
+
+EWMA_ALPHA = 0.3
+MIN_SAMPLES = 3
+
+TIMED_OUT = "timed_out"
+
+
+def _domain(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+class DomainLatencyTracker:
+    """
+    Exponentially weighted fetch latency per publisher domain.
+    """
+
+    def __init__(self):
+        self._ewma: dict[str, float] = {}
+        self._samples: dict[str, int] = {}
+        self.timeouts: dict[str, int] = {}
+
+    def record(self, url: str, seconds: float, timed_out: bool = False):
+        domain = _domain(url)
+        previous = self._ewma.get(domain)
+        self._ewma[domain] = seconds if previous is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * previous
+        self._samples[domain] = self._samples.get(domain, 0) + 1
+        if timed_out:
+            self.timeouts[domain] = self.timeouts.get(domain, 0) + 1
+
+    def latency(self, url: str) -> float | None:
+        domain = _domain(url)
+        if self._samples.get(domain, 0) < MIN_SAMPLES:
+            return None
+        return self._ewma[domain]
+
+    def is_slow(self, url: str) -> bool:
+        latency = self.latency(url)
+        return latency is not None and latency > SLOW_DOMAIN_THRESHOLD
+
+    def budget(self, url: str) -> float:
+        """Seconds we're willing to wait for one article from this publisher."""
+        return SLOW_DOMAIN_BUDGET if self.is_slow(url) else ARTICLE_FETCH_BUDGET
+
+    def hedge_delay(self, url: str) -> float:
+        latency = self.latency(url)
+        if latency is None:
+            return max(HEDGE_MIN_DELAY, SLOW_DOMAIN_THRESHOLD)
+        return max(HEDGE_MIN_DELAY, latency * HEDGE_MULTIPLIER)
+
+    def stats(self) -> dict:
+        return {
+            domain: {
+                "ewma_ms": round(self._ewma[domain] * 1000, 1),
+                "samples": self._samples[domain],
+                "timeouts": self.timeouts.get(domain, 0),
+                "slow": self._samples[domain] >= MIN_SAMPLES and self._ewma[domain] > SLOW_DOMAIN_THRESHOLD,
+            }
+            for domain in sorted(self._ewma)
+        }
+
+
+latency_tracker = DomainLatencyTracker()
+fanout_stats = {"hedges_sent": 0, "hedges_won": 0, "timed_out": 0}
+
+
+async def hedged_get(url: str, **kwargs) -> httpx.Response:
+    """
+    GET through the shared client. If the publisher hasn't answered within
+    its hedge delay, send a second identical request and keep whichever
+    finishes first. Links on rate-limited hosts (Google's relative news
+    links) go through that host's guard instead and are never hedged.
+    """
+    if guard_for(url) is not None:
+        return await guarded_get(url, **kwargs)
+    if not HEDGE_ENABLED:
+        return await http_client.get(url, **kwargs)
+
+    primary = asyncio.ensure_future(http_client.get(url, **kwargs))
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=latency_tracker.hedge_delay(url))
+        if done:
+            return primary.result()
+
+        fanout_stats["hedges_sent"] += 1
+        hedge = asyncio.ensure_future(http_client.get(url, **kwargs))
+        tasks.append(hedge)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        fanout_stats["hedges_won"] += 1
+                    return task.result()
+        # Both failed: surface the primary's error
+        return primary.result()
+    finally:
+        # Also when the caller is cancelled during the hedge delay
+        for task in tasks:
+            task.cancel()
+
+
+async def gather_with_deadline(coros: list, deadline: float = None) -> list:
+    """
+    Like asyncio.gather, but stops waiting after `deadline` seconds. Tasks
+    still running are cancelled and come back as TIMED_OUT. If the caller is
+    cancelled, every task still running is cancelled with it.
+    """
+    deadline = NEWS_FANOUT_DEADLINE if deadline is None else deadline
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    if not tasks:
+        return []
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+    finally:
+        for task in tasks:
+            task.cancel()
+    results = []
+    for task in tasks:
+        if task in pending:
+            fanout_stats["timed_out"] += 1
+            results.append(TIMED_OUT)
+        elif task.exception() is not None:
+            results.append(f"Error scraping article: {str(task.exception())}")
+        else:
+            results.append(task.result())
+    return results
+
+
+def fanout_state() -> dict:
+    return {
+        **fanout_stats,
+        "deadline_seconds": NEWS_FANOUT_DEADLINE,
+        "domains": latency_tracker.stats(),
+    }
@@ -0,0 +1,222 @@
+import os
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+# "auto" picks the fastest installed backend: selectolax > lxml > html.parser
+HTML_PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", "auto")
+
+REMOVED_TAGS = ['aside', 'footer', 'nav', 'form', 'script', 'style', 'header', 'noscript']
+COMMON_ARTICLE_CLASSES = [
+    'article-content', 'story-body', 'main-content', 'content__article-body',
+    'entry-content', 'post-content', 'news-content', 'article__content',
+    'caas-body', 'caas-content', 'body__inner', 'story__content'
+]
+BAD_KEYWORDS = ['copyright', 'footer', 'related', 'advertisement', 'comments']
+
+# Strings bs4's get_text() counts (comments, doctypes etc. are skipped)
+TEXT_TYPES = (NavigableString, CData)
+
+
+def available_backends() -> list[str]:
+    backends = []
+    if HAS_SELECTOLAX:
+        backends.append("selectolax")
+    if HAS_LXML:
+        backends.append("lxml")
+    backends.append("html.parser")
+    return backends
+
+
+def resolve_backend(backend: str | None = None) -> str:
+    backend = backend or HTML_PARSER_BACKEND
+    available = available_backends()
+    if backend == "auto" or backend not in available:
+        return available[0]
+    return backend
+
+
+def bs4_features() -> str:
+    """Tree builder to hand BeautifulSoup: lxml when installed, else html.parser."""
+    return "lxml" if HAS_LXML and HTML_PARSER_BACKEND != "html.parser" else "html.parser"
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, bs4_features())
+
+
+def _has_bad_keyword(text: str) -> bool:
+    lowered = text.lower()
+    return any(bad in lowered for bad in BAD_KEYWORDS)
+
+
+def _is_probable(n_strings: int, text_len: int, newlines: int, bad: bool) -> bool:
+    # Same heuristic as the old is_probable_article(): the '\n'-joined text has at
+    # least 3 newlines (separators plus any inside the strings), is at least 500
+    # chars and has no boilerplate words
+    joined_newlines = newlines + max(n_strings - 1, 0)
+    return joined_newlines >= 3 and text_len + n_strings - 1 >= 500 and not bad
+
+
+def _clean_lines(text: str) -> str:
+    lines = [line for line in text.split('\n') if len(line.strip()) > 20]
+    return '\n'.join(lines[:50]) if lines else "No article content found."
+
+
+# --- BeautifulSoup backend (lxml or html.parser tree builder) ---
+def _bs4_subtree_stats(root: Tag) -> dict[int, tuple[int, int, int, bool]]:
+    """
+    One bottom-up pass computing (non-empty strings, stripped text length,
+    newlines inside the strings, has boilerplate keyword) for every tag,
+    instead of calling get_text() on every div.
+    """
+    stats = {}
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.contents if isinstance(child, Tag))
+            continue
+        n_strings = text_len = newlines = 0
+        bad = False
+        for child in node.contents:
+            if isinstance(child, Tag):
+                child_n, child_len, child_newlines, child_bad = stats[id(child)]
+            elif type(child) in TEXT_TYPES:
+                text = child.strip()
+                if not text:
+                    continue
+                child_n, child_len, child_newlines, child_bad = 1, len(text), text.count('\n'), _has_bad_keyword(text)
+            else:
+                continue
+            n_strings += child_n
+            text_len += child_len
+            newlines += child_newlines
+            bad = bad or child_bad
+        stats[id(node)] = (n_strings, text_len, newlines, bad)
+    return stats
+
+
+def _extract_article_bs4(html: str, features: str) -> str:
+    soup = BeautifulSoup(html, features)
+    for tag in soup(REMOVED_TAGS):
+        tag.decompose()
+    article = soup.find('article')
+    if article:
+        return _clean_lines(article.get_text(separator='\n', strip=True))
+
+    candidates = []
+    for class_name in COMMON_ARTICLE_CLASSES:
+        div = soup.find('div', class_=class_name)
+        if div:
+            candidates.append(div)
+    if candidates:
+        main_content = max(candidates, key=lambda d: len(d.get_text(strip=True)))
+        return _clean_lines(main_content.get_text(separator='\n', strip=True))
+
+    stats = _bs4_subtree_stats(soup)
+    best, best_len = None, -1
+    for div in soup.find_all('div'):
+        n_strings, text_len, newlines, bad = stats[id(div)]
+        if _is_probable(n_strings, text_len, newlines, bad) and text_len > best_len:
+            best, best_len = div, text_len
+    text = best.get_text(separator='\n', strip=True) if best is not None else ""
+    return _clean_lines(text)
+
+
+# --- selectolax (lexbor) backend ---
+def _selectolax_strings(node) -> list[str]:
+    # Node.text(strip=True) keeps empty pieces, so collect non-empty strings ourselves
+    # to match bs4's get_text(separator='\n', strip=True)
+    parts = []
+    for child in node.traverse(include_text=True):
+        if child.tag == '-text':
+            text = child.text_content.strip()
+            if text:
+                parts.append(text)
+    return parts
+
+
+def _selectolax_text(node) -> str:
+    return '\n'.join(_selectolax_strings(node))
+
+
+def _selectolax_subtree_stats(root) -> dict[int, tuple[int, int, int, bool]]:
+    stats = {}
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend(
+                (child, False) for child in node.iter(include_text=False)
+            )
+            continue
+        n_strings = text_len = newlines = 0
+        bad = False
+        for child in node.iter(include_text=True):
+            if child.tag == '-text':
+                text = child.text_content.strip()
+                if not text:
+                    continue
+                child_n, child_len, child_newlines, child_bad = 1, len(text), text.count('\n'), _has_bad_keyword(text)
+            elif child.mem_id in stats:
+                child_n, child_len, child_newlines, child_bad = stats[child.mem_id]
+            else:
+                continue
+            n_strings += child_n
+            text_len += child_len
+            newlines += child_newlines
+            bad = bad or child_bad
+        stats[node.mem_id] = (n_strings, text_len, newlines, bad)
+    return stats
+
+
+def _extract_article_selectolax(html: str) -> str:
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(REMOVED_TAGS)
+    article = tree.css_first('article')
+    if article is not None:
+        return _clean_lines(_selectolax_text(article))
+
+    candidates = []
+    for class_name in COMMON_ARTICLE_CLASSES:
+        div = tree.css_first(f'div.{class_name}')
+        if div is not None:
+            candidates.append(div)
+    if candidates:
+        main_content = max(candidates, key=lambda d: sum(map(len, _selectolax_strings(d))))
+        return _clean_lines(_selectolax_text(main_content))
+
+    root = tree.root
+    if root is None:
+        return _clean_lines("")
+    stats = _selectolax_subtree_stats(root)
+    best, best_len = None, -1
+    for div in tree.css('div'):
+        n_strings, text_len, newlines, bad = stats.get(div.mem_id, (0, 0, 0, False))
+        if _is_probable(n_strings, text_len, newlines, bad) and text_len > best_len:
+            best, best_len = div, text_len
+    return _clean_lines(_selectolax_text(best) if best is not None else "")
+
+
+def extract_article_text(html: str, backend: str | None = None) -> str:
+    """
+    Pull the main article text out of a news page with the chosen backend.
+    """
+    backend = resolve_backend(backend)
+    if backend == "selectolax":
+        return _extract_article_selectolax(html)
+    return _extract_article_bs4(html, backend)
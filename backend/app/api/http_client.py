@@ -0,0 +1,146 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+from api.metrics import register_collector
+
+# Pool tuning (all overridable from the environment / .env)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "8"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "1") == "1"
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class SharedHttpClient:
+    """
+    App-lifetime httpx.AsyncClient shared by the scrapers and the Gemini calls.
+
+    Opened and closed by the FastAPI lifespan in main.py. Requests to the same
+    host are capped by a per-host semaphore so one slow publisher can't eat
+    the whole pool.
+    """
+
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.errors = 0
+        self.new_connections = 0
+        self.in_flight = 0
+
+    async def start(self):
+        if self._client is not None:
+            return
+        http2 = HTTP_ENABLE_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                http2 = False
+        self._client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=HTTP_TIMEOUT,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _trace(self, event_name: str, info: dict):
+        # httpcore emits this once per freshly opened TCP connection,
+        # so requests - new_connections is the number of reused ones.
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).hostname or ""
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(HTTP_PER_HOST_LIMIT)
+            self._host_limits[host] = sem
+        return sem
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self._client is None:
+            # Scripts and tests may call the scrapers without the app lifespan
+            await self.start()
+        extensions = kwargs.pop("extensions", None) or {}
+        extensions.setdefault("trace", self._trace)
+        async with self._host_limit(url):
+            self.requests += 1
+            self.in_flight += 1
+            try:
+                return await self._client.request(method, url, extensions=extensions, **kwargs)
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """Like request(), but yields the response before the body is read."""
+        if self._client is None:
+            await self.start()
+        extensions = kwargs.pop("extensions", None) or {}
+        extensions.setdefault("trace", self._trace)
+        async with self._host_limit(url):
+            self.requests += 1
+            self.in_flight += 1
+            try:
+                async with self._client.stream(method, url, extensions=extensions, **kwargs) as response:
+                    yield response
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        reused = max(self.requests - self.new_connections, 0)
+        open_connections = idle_connections = 0
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is not None:
+            connections = pool.connections
+            open_connections = len(connections)
+            idle_connections = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "new_connections": self.new_connections,
+            "reused_connections": reused,
+            "reuse_rate": round(reused / self.requests, 3) if self.requests else 0.0,
+            "open_connections": open_connections,
+            "idle_connections": idle_connections,
+            "per_host_limit": HTTP_PER_HOST_LIMIT,
+            "max_connections": HTTP_MAX_CONNECTIONS,
+        }
+
+
+http_client = SharedHttpClient()
+register_collector(lambda: [
+    ("http_client_requests_total", "counter", "Outbound HTTP requests", {}, http_client.requests),
+    ("http_client_errors_total", "counter", "Outbound HTTP requests that raised", {}, http_client.errors),
+    ("http_client_in_flight", "gauge", "Outbound HTTP requests in flight", {}, http_client.in_flight),
+])
@@ -0,0 +1,347 @@
+import asyncio
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from api.auth import get_current_user
+from api.quote_history import BAR_DTYPE, IST_OFFSET, quote_history, _SYMBOL_RE
+from api.quote_model import Quote
+
+indicators_router = APIRouter()
+
+# --- Technical Indicators ---
+# Daily-bar indicators for many symbols at once. Every array is
+# (symbols, ...) so one NumPy operation covers the whole batch; the only
+# Python loop is over time for the exponential averages. IndicatorState
+# keeps just what the next bar needs (averages plus a 52-week window), so a
+# new bar is a single push instead of a recomputation.
+WINDOW = 252  # trading days in a year
+SMA_PERIODS = (20, 50, 200)
+EMA_FAST, EMA_SLOW, MACD_SIGNAL = 12, 26, 9
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BOLLINGER_PERIOD, BOLLINGER_K = 20, 2.0
+
+# Daily bars read per symbol (calendar days; covers WINDOW trading days)
+INDICATOR_HISTORY_DAYS = int(os.getenv("INDICATOR_HISTORY_DAYS", "400"))
+INDICATOR_MAX_SYMBOLS = int(os.getenv("INDICATOR_MAX_SYMBOLS", "100"))
+
+
+def _ema_step(previous: np.ndarray, value: np.ndarray, alpha: float) -> np.ndarray:
+    # Seeds with the first value; NaN inputs leave the average unchanged
+    seeded = np.where(np.isnan(previous), value, previous + alpha * (value - previous))
+    return np.where(np.isnan(value), previous, seeded)
+
+
+class IndicatorState:
+    """Indicator state for a batch of symbols after the last pushed bar."""
+
+    def __init__(self, size: int):
+        nan = np.full(size, np.nan)
+        self.count = np.zeros(size, dtype=np.int64)  # bars seen
+        self.prev_close = nan.copy()
+        self.ema_fast = nan.copy()
+        self.ema_slow = nan.copy()
+        self.macd_signal = nan.copy()
+        self.avg_gain = nan.copy()
+        self.avg_loss = nan.copy()
+        self.atr = nan.copy()
+        # Last WINDOW bars, oldest first
+        self.close = np.full((size, WINDOW), np.nan)
+        self.high = np.full((size, WINDOW), np.nan)
+        self.low = np.full((size, WINDOW), np.nan)
+
+    def copy(self) -> "IndicatorState":
+        clone = IndicatorState.__new__(IndicatorState)
+        clone.__dict__ = {name: value.copy() for name, value in self.__dict__.items()}
+        return clone
+
+    def _advance(self, close: np.ndarray, high: np.ndarray, low: np.ndarray):
+        """Update the recursive averages with one bar per symbol (NaN = no bar)."""
+        valid = ~np.isnan(close)
+        self.ema_fast = _ema_step(self.ema_fast, close, 2 / (EMA_FAST + 1))
+        self.ema_slow = _ema_step(self.ema_slow, close, 2 / (EMA_SLOW + 1))
+        self.macd_signal = np.where(
+            self.count + valid >= EMA_SLOW,
+            _ema_step(self.macd_signal, np.where(valid, self.ema_fast - self.ema_slow, np.nan), 2 / (MACD_SIGNAL + 1)),
+            self.macd_signal,
+        )
+        change = close - self.prev_close
+        # Wilder smoothing (alpha = 1/period), as RSI and ATR are defined
+        self.avg_gain = _ema_step(self.avg_gain, np.maximum(change, 0), 1 / RSI_PERIOD)
+        self.avg_loss = _ema_step(self.avg_loss, np.maximum(-change, 0), 1 / RSI_PERIOD)
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - self.prev_close), np.abs(low - self.prev_close)))
+        self.atr = _ema_step(self.atr, true_range, 1 / ATR_PERIOD)
+        self.prev_close = np.where(valid, close, self.prev_close)
+        self.count += valid
+        return valid
+
+    def push(self, close, high=None, low=None):
+        """Append one bar per symbol. Symbols with a NaN close are left as they were."""
+        close = np.asarray(close, dtype=float)
+        high = close if high is None else np.asarray(high, dtype=float)
+        low = close if low is None else np.asarray(low, dtype=float)
+        valid = self._advance(close, high, low)
+        for window, value in ((self.close, close), (self.high, high), (self.low, low)):
+            window[valid, :-1] = window[valid, 1:]
+            window[valid, -1] = value[valid]
+        return self
+
+    @classmethod
+    def from_bars(cls, close: np.ndarray, high: np.ndarray = None, low: np.ndarray = None) -> "IndicatorState":
+        """
+        State after a full history. Arrays are (symbols, bars), right-aligned:
+        the last column is each symbol's latest bar, shorter histories are
+        NaN-padded on the left.
+        """
+        close = np.atleast_2d(np.asarray(close, dtype=float))
+        high = close if high is None else np.atleast_2d(np.asarray(high, dtype=float))
+        low = close if low is None else np.atleast_2d(np.asarray(low, dtype=float))
+        state = cls(close.shape[0])
+        for t in range(close.shape[1]):
+            state._advance(close[:, t], high[:, t], low[:, t])
+        tail = min(WINDOW, close.shape[1])
+        if tail:
+            state.close[:, -tail:] = close[:, -tail:]
+            state.high[:, -tail:] = high[:, -tail:]
+            state.low[:, -tail:] = low[:, -tail:]
+        return state
+
+    def latest(self) -> dict[str, np.ndarray]:
+        """Current indicator values per symbol; NaN where history is too short."""
+        close = self.prev_close
+        values = {"close": close.copy(), "bars": self.count.copy()}
+        for period in SMA_PERIODS:
+            values[f"sma_{period}"] = self._window_mean(self.close, period)
+        values["ema_12"] = np.where(self.count >= EMA_FAST, self.ema_fast, np.nan)
+        values["ema_26"] = np.where(self.count >= EMA_SLOW, self.ema_slow, np.nan)
+        values["macd"] = values["ema_12"] - values["ema_26"]
+        ready = self.count >= EMA_SLOW + MACD_SIGNAL
+        values["macd_signal"] = np.where(ready, self.macd_signal, np.nan)
+        values["macd_hist"] = values["macd"] - values["macd_signal"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(self.avg_loss == 0, 100.0, 100 - 100 / (1 + self.avg_gain / self.avg_loss))
+        values["rsi_14"] = np.where(self.count > RSI_PERIOD, rsi, np.nan)
+
+        middle = self._window_mean(self.close, BOLLINGER_PERIOD)
+        recent = self.close[:, -BOLLINGER_PERIOD:]
+        with np.errstate(invalid="ignore"):
+            spread = BOLLINGER_K * np.sqrt(np.maximum(np.mean(recent * recent, axis=1) - middle * middle, 0))
+        values["bb_middle"] = middle
+        values["bb_upper"] = middle + spread
+        values["bb_lower"] = middle - spread
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values["bb_percent_b"] = (close - values["bb_lower"]) / (values["bb_upper"] - values["bb_lower"])
+
+        values["atr_14"] = np.where(self.count > ATR_PERIOD, self.atr, np.nan)
+        values["atr_pct"] = values["atr_14"] / close * 100
+        with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows: symbols with no bars yet
+            values["high_52w"] = np.nanmax(self.high, axis=1)
+            values["low_52w"] = np.nanmin(self.low, axis=1)
+            values["pos_52w"] = (close - values["low_52w"]) / (values["high_52w"] - values["low_52w"])
+        return values
+
+    def _window_mean(self, window: np.ndarray, period: int) -> np.ndarray:
+        # Full windows only: NaN until the symbol has `period` bars
+        return np.where(self.count >= period, window[:, -period:].mean(axis=1), np.nan)
+
+
+def compute_indicators(close, high=None, low=None) -> dict[str, np.ndarray]:
+    """Latest indicator values for right-aligned (symbols, bars) arrays, in one pass."""
+    return IndicatorState.from_bars(close, high, low).latest()
+
+
+def stack_bars(histories: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Right-align per-symbol bar arrays (quote_history.BAR_DTYPE) into (symbols, bars) matrices."""
+    length = max((h.size for h in histories), default=0)
+    shape = (len(histories), length)
+    close, high, low = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+    for row, bars in enumerate(histories):
+        if bars.size:
+            close[row, -bars.size:] = bars["close"]
+            high[row, -bars.size:] = bars["high"]
+            low[row, -bars.size:] = bars["low"]
+    return close, high, low
+
+
+def _row(values: dict[str, np.ndarray], row: int) -> dict:
+    result = {}
+    for name, column in values.items():
+        value = column[row].item()
+        if name == "bars":
+            result[name] = int(value)
+        else:
+            result[name] = None if value != value or value in (float("inf"), float("-inf")) else round(value, 4)
+    return result
+
+
+class IndicatorEngine:
+    """
+    Latest indicators per symbol over stored daily bars. The state through
+    the last completed day is kept per symbol; later requests push only the
+    days completed since, then apply today's (still changing) bar to a copy.
+    With include_today=False the values stop at the last completed day, so
+    they stay the same all session (used for the cached analysis prompt).
+    """
+
+    def __init__(self, store=quote_history):
+        self.store = store
+        self._lock = threading.Lock()
+        self._committed: dict[str, tuple[int, IndicatorState]] = {}  # symbol -> (last bar ts, state)
+        self.full = 0
+        self.incremental = 0
+
+    def latest(self, symbols: list[str], now: float | None = None, include_today: bool = True) -> dict[str, dict]:
+        [values] = self._views(symbols, now, (include_today,))
+        return values
+
+    def live_and_committed(self, symbols: list[str], now: float | None = None) -> tuple[dict[str, dict], dict[str, dict]]:
+        """latest() with and without today's bar, from one read of the history."""
+        live, committed = self._views(symbols, now, (True, False))
+        return live, committed
+
+    def _views(self, symbols: list[str], now: float | None, views: tuple[bool, ...]) -> list[dict[str, dict]]:
+        now = int(now if now is not None else time.time())
+        start = now - INDICATOR_HISTORY_DAYS * 86400
+        # Bars are dated by their session's IST midnight; only today's can still change
+        today = (now + IST_OFFSET) // 86400 * 86400 - IST_OFFSET
+        histories = {symbol: self.store.bars(symbol, start, now + 1, "1d") for symbol in symbols}
+        states, cold = {}, []
+        ready = [symbol for symbol, bars in histories.items() if bars.size]
+        completed_bars = {symbol: histories[symbol][histories[symbol]["ts"] < today] for symbol in ready}
+        with self._lock:
+            for symbol in ready:
+                completed = completed_bars[symbol]
+                cached = self._committed.get(symbol)
+                if cached and completed.size and cached[0] in completed["ts"]:
+                    state = cached[1]
+                    for bar in completed[completed["ts"] > cached[0]]:
+                        state.push([bar["close"]], [bar["high"]], [bar["low"]])
+                    states[symbol] = state
+                    self.incremental += 1
+                else:
+                    cold.append(symbol)
+
+            if cold:
+                # Symbols without usable state: one batched pass over all of them
+                committed = IndicatorState.from_bars(*stack_bars([completed_bars[s] for s in cold]))
+                for row, symbol in enumerate(cold):
+                    states[symbol] = _select(committed, row)
+                self.full += len(cold)
+            for symbol in ready:
+                completed = completed_bars[symbol]
+                if completed.size:
+                    self._committed[symbol] = (int(completed["ts"][-1]), states[symbol])
+
+            outputs = []
+            for include_today in views:
+                results = {}
+                if ready:
+                    view = _concat([states[symbol] for symbol in ready])
+                    if include_today:
+                        # Today's bar is still changing: push it onto a stacked copy only.
+                        # Symbols without one yet get NaN, which push() skips.
+                        current = np.zeros(len(ready), dtype=BAR_DTYPE)
+                        current["close"] = current["high"] = current["low"] = np.nan
+                        for row, symbol in enumerate(ready):
+                            if histories[symbol]["ts"][-1] >= today:
+                                current[row] = histories[symbol][-1]
+                        view.push(current["close"], current["high"], current["low"])
+                    values = view.latest()
+                    for row, symbol in enumerate(ready):
+                        results[symbol] = _row(values, row)
+                outputs.append({symbol: results.get(symbol) for symbol in symbols})
+        return outputs
+
+    def stats(self) -> dict:
+        return {"symbols": len(self._committed), "full_computations": self.full, "incremental_updates": self.incremental}
+
+
+def _select(state: IndicatorState, row: int) -> IndicatorState:
+    single = IndicatorState.__new__(IndicatorState)
+    single.__dict__ = {name: value[row:row + 1].copy() for name, value in state.__dict__.items()}
+    return single
+
+
+def _concat(states: list[IndicatorState]) -> IndicatorState:
+    stacked = IndicatorState.__new__(IndicatorState)
+    stacked.__dict__ = {name: np.concatenate([s.__dict__[name] for s in states]) for name in states[0].__dict__}
+    return stacked
+
+
+indicator_engine = IndicatorEngine()
+
+
+async def indicators_for(symbols: list[str], include_today: bool = True) -> dict[str, dict]:
+    return await asyncio.to_thread(indicator_engine.latest, symbols, None, include_today)
+
+
+async def live_and_committed_indicators(symbols: list[str]) -> tuple[dict[str, dict], dict[str, dict]]:
+    return await asyncio.to_thread(indicator_engine.live_and_committed, symbols)
+
+
+def format_technicals(symbol: str, values: dict | None, quote: Quote | None = None) -> str:
+    """
+    Compact numeric block for the analysis prompt. With less than a year of
+    stored history the 52-week range comes from the quote page instead.
+    Pass values through the last completed day (include_today=False): the
+    prompt is the summary cache key, so it must not move with every quote.
+    """
+    values = dict(values or {})
+    if quote is not None and values.get("bars", 0) < WINDOW and quote.year_low and quote.year_high:
+        values["low_52w"], values["high_52w"] = quote.year_low, quote.year_high
+        # The stored close, not the live price, for the same reason
+        price = values.get("close")
+        if price and quote.year_high > quote.year_low:
+            values["pos_52w"] = round((price - quote.year_low) / (quote.year_high - quote.year_low), 4)
+    if not any(values.get(name) is not None for name in ("sma_20", "rsi_14", "pos_52w")):
+        return ""
+
+    def num(name, digits=2):
+        value = values.get(name)
+        return "n/a" if value is None else f"{value:.{digits}f}"
+
+    lines = [
+        (("close", "sma_20", "sma_50", "sma_200"),
+         f"close {num('close')} | SMA20 {num('sma_20')} | SMA50 {num('sma_50')} | SMA200 {num('sma_200')}"),
+        (("rsi_14", "macd"),
+         f"RSI14 {num('rsi_14', 1)} | MACD {num('macd')} signal {num('macd_signal')} hist {num('macd_hist')}"),
+        (("bb_middle",), f"Bollinger(20,2) {num('bb_lower')}-{num('bb_upper')} %B {num('bb_percent_b')}"),
+        (("atr_14",), f"ATR14 {num('atr_14')} ({num('atr_pct')}% of price)"),
+        (("pos_52w",), f"52-week range {num('low_52w')}-{num('high_52w')}, position {num('pos_52w')} (0 = low, 1 = high)"),
+    ]
+    header = f"TECHNICAL INDICATORS FOR {symbol.upper()} (daily bars to the last close: {values.get('bars', 0)}):"
+    # Lines with nothing computed yet are left out
+    return "\n".join([header] + [text for names, text in lines if any(values.get(n) is not None for n in names)])
+
+
+# --- Indicator Endpoint ---
+@indicators_router.get("/api/indicators")
+async def get_indicators(
+    symbols: str = Query(..., description="Comma-separated symbols, e.g. TCS,INFY"),
+    current_user=Depends(get_current_user),
+):
+    """
+    Latest SMA/EMA, RSI, MACD, Bollinger, ATR and 52-week position per
+    symbol, from stored daily bars. null where the history is too short.
+    """
+    requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not requested or len(requested) > INDICATOR_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Give 1-{INDICATOR_MAX_SYMBOLS} symbols")
+    invalid = [s for s in requested if not _SYMBOL_RE.match(s)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid symbols: {', '.join(invalid)}")
+    try:
+        results = await indicators_for(requested)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Indicator computation failed: {str(e)}")
+    return JSONResponse(content={
+        "results": {s: v for s, v in results.items() if v is not None},
+        "no_history": [s for s, v in results.items() if v is None],
+    })
@@ -0,0 +1,305 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+metrics_router = APIRouter()
+
+# --- Metrics Registry ---
+# Prometheus text-format metrics without the client library. Stage timings
+# are recorded with `with stage("quote_fetch"):` around each pipeline step;
+# counters that modules already keep (cache hits, pool sizes) are read by
+# collectors at scrape time instead of being duplicated on the hot path.
+# Nothing here imports the rest of the app, so any module can use it.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Optional shared secret for /metrics (sent as "Authorization: Bearer <token>")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Adds a Server-Timing header with the per-stage breakdown of each request
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "0") == "1"
+# Log the breakdown of requests slower than this many seconds (0 disables)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+TRACING_ENABLED = SERVER_TIMING_ENABLED or SLOW_REQUEST_SECONDS > 0
+
+PREFIX = "stockgist_"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name, self.help, self.labelnames = PREFIX + name, help, labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in self.values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = PREFIX + name, help, labelnames, buckets
+        self.values: dict[tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels: tuple, value: float):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = []
+        names = self.labelnames + ("le",)
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+_metrics: list = []
+_collectors: list = []
+
+
+def register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collect):
+    """
+    `collect()` returns [(name, kind, help, {label: value}, number), ...],
+    read on every scrape.
+    """
+    _collectors.append(collect)
+
+
+def register_cache(name: str, cache):
+    """Expose an api.cache.TTLCache's counters under cache="<name>"."""
+    def collect():
+        labels = {"cache": name}
+        return [
+            ("cache_hits_total", "counter", "Cache lookups served from memory", labels, cache.hits),
+            ("cache_misses_total", "counter", "Cache lookups that ran the loader", labels, cache.misses),
+            ("cache_coalesced_total", "counter", "Lookups that joined an in-flight load", labels, cache.coalesced),
+            ("cache_evictions_total", "counter", "Entries evicted by the size limit", labels, cache.evictions),
+            ("cache_entries", "gauge", "Entries currently cached", labels, len(cache._data)),
+        ]
+    register_collector(collect)
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    grouped: dict[str, list] = {}
+    for collect in _collectors:
+        try:
+            samples = collect()
+        except Exception as e:
+            print(f"Metrics collector failed: {str(e)}")
+            continue
+        for name, kind, help, labels, value in samples:
+            grouped.setdefault(name, [kind, help, []])[2].append((labels, value))
+    for name, (kind, help, samples) in grouped.items():
+        lines.append(f"# HELP {PREFIX}{name} {help}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{PREFIX}{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+stage_seconds = register(Histogram("stage_duration_seconds", "Time spent per pipeline stage", ("stage",)))
+stage_errors = register(Counter("stage_errors_total", "Pipeline stage calls that raised", ("stage",)))
+stage_in_flight = register(Gauge("stage_in_flight", "Pipeline stage calls currently running", ("stage",)))
+http_seconds = register(Histogram("http_request_duration_seconds", "API request latency", ("method", "route")))
+http_requests = register(Counter("http_requests_total", "API requests by status", ("method", "route", "status")))
+http_in_flight = register(Gauge("http_requests_in_flight", "API requests currently being handled"))
+
+
+# --- Request Tracing ---
+class RequestTrace:
+    """Per-request time per stage (summed over concurrent calls, e.g. the article fan-out)."""
+    __slots__ = ("stages",)
+
+    def __init__(self):
+        self.stages: dict[str, list] = {}  # stage -> [seconds, calls]
+
+    def add(self, name: str, seconds: float):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def server_timing(self, total: float) -> str:
+        parts = [f'{name};dur={seconds * 1000:.1f};desc="{calls}x"' for name, (seconds, calls) in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_trace: ContextVar[RequestTrace | None] = ContextVar("request_trace", default=None)
+_NOOP = nullcontext()
+
+
+def observe_stage(name: str, seconds: float, failed: bool = False):
+    labels = (name,)
+    stage_seconds.observe(labels, seconds)
+    if failed:
+        stage_errors.inc(labels)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        stage_in_flight.inc((self.name,))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stage_in_flight.dec((self.name,))
+        # Cancellation (deadline hit, client gone) isn't a failure of the stage
+        failed = exc_type is not None and not issubclass(exc_type, (asyncio.CancelledError, GeneratorExit))
+        observe_stage(self.name, time.perf_counter() - self.started, failed)
+        return False
+
+
+def stage(name: str):
+    """Time a block as pipeline stage `name`. A no-op when METRICS_ENABLED=0."""
+    return _Stage(name) if METRICS_ENABLED else _NOOP
+
+
+# --- SQL Timing ---
+def instrument_engine(engine):
+    """Record every statement on a (sync) SQLAlchemy engine as stage "db"."""
+    from sqlalchemy import event
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+        stage_in_flight.inc(("db",))
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        stage_in_flight.dec(("db",))
+        observe_stage("db", time.perf_counter() - context._metrics_started)
+
+    def error(exception_context):
+        started = getattr(exception_context.execution_context, "_metrics_started", None)
+        if started is not None:
+            stage_in_flight.dec(("db",))
+            observe_stage("db", time.perf_counter() - started, failed=True)
+
+    if METRICS_ENABLED:
+        event.listen(engine, "before_cursor_execute", before)
+        event.listen(engine, "after_cursor_execute", after)
+        event.listen(engine, "handle_error", error)
+
+
+# --- HTTP Middleware ---
+class MetricsMiddleware:
+    """
+    Request latency/status metrics, plus the stage breakdown when tracing.
+    Plain ASGI rather than BaseHTTPMiddleware: timing stops at the last body
+    chunk, so streamed responses (/stock-analysis/stream) include the article
+    and LLM stages that run while the body is sent. Server-Timing is only
+    added to responses with a Content-Length; a streamed response's headers
+    go out before its stages have run.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = RequestTrace() if TRACING_ENABLED else None
+        token = _trace.set(trace)
+        http_in_flight.inc()
+        started = time.perf_counter()
+        status = 500
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            route = getattr(scope.get("route"), "path", "unmatched")  # template, not the raw path
+            http_seconds.observe((scope["method"], route), elapsed)
+            http_requests.inc((scope["method"], route, str(status)))
+            if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+                print(f"Slow request {scope['method']} {scope['path']} {elapsed:.2f}s: {trace.server_timing(elapsed)}")
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = message.get("headers", [])
+                if SERVER_TIMING_ENABLED and any(name.lower() == b"content-length" for name, _ in headers):
+                    timing = trace.server_timing(time.perf_counter() - started)
+                    message = {**message, "headers": [*headers, (b"server-timing", timing.encode("latin-1"))]}
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                await send(message)
+                finish()
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()  # no-op unless the response never completed (error, disconnect)
+            _trace.reset(token)
+
+
+# --- Metrics Endpoint ---
+@metrics_router.get("/metrics")
+async def get_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,112 @@
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.auth import get_current_user
+from api.context_selection import NAME_SUFFIXES
+from api.symbol_table import symbol_table
+from database.async_crud import news_fts_ready, search_news
+from database.models import get_async_db
+
+news_router = APIRouter()
+
+# How far back summarize_articles looks for stored news about a symbol
+NEWS_CONTEXT_DAYS = float(os.getenv("NEWS_CONTEXT_DAYS", "7"))
+
+_TERM_RE = re.compile(r"[^\s\"]+")
+
+
+def _naive_utc(value: datetime | None) -> datetime | None:
+    # Stored timestamps are naive UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_query(query: str, mode: str = "all") -> str | None:
+    """
+    FTS5 MATCH expression for free text. Every term is quoted, so
+    punctuation ("M&M", "-") and words like AND / NEAR are matched
+    literally instead of as query syntax.
+    """
+    terms = [_quote(term) for term in _TERM_RE.findall(query)]
+    if not terms:
+        return None
+    return (" OR " if mode == "any" else " ").join(terms)
+
+
+def symbol_match_query(symbol: str) -> str:
+    """Stored news mentioning the ticker or the company's name."""
+    symbol = symbol.strip().upper()
+    alternatives = [_quote(symbol)]
+    try:
+        name = symbol_table.name_for(symbol)
+    except OSError:
+        name = None  # symbol CSV missing: ticker only
+    if name:
+        words = name.split()
+        while len(words) > 1 and words[-1].lower().rstrip(".") in NAME_SUFFIXES:
+            words.pop()
+        alternatives.append(_quote(" ".join(words)))
+    return " OR ".join(dict.fromkeys(alternatives))
+
+
+async def related_news(db: AsyncSession, symbol: str, limit: int = 5, days: float = NEWS_CONTEXT_DAYS) -> list[dict]:
+    """
+    Best-ranked stored news about a symbol from the last `days` days, as
+    plain text (no highlight markers) for prompts. Empty when the search
+    index isn't available.
+    """
+    if not await news_fts_ready(db):
+        return []
+    since = datetime.utcnow() - timedelta(days=days)
+    _, results = await search_news(db, symbol_match_query(symbol), since=since, limit=limit, highlight=("", ""))
+    return results
+
+
+@news_router.get("/api/news/search")
+async def search_stored_news(
+    q: str = Query(..., min_length=1, max_length=200, description="Ticker, keywords or phrase"),
+    match: str = Query("all", pattern="^(all|any)$", description="Require all terms or any of them"),
+    days: int | None = Query(None, ge=1, le=3650, description="Only news fetched in the last N days"),
+    since: datetime | None = Query(None),
+    until: datetime | None = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search stored trending news and cached articles. Results are BM25-ranked
+    (headline matches count most) with <mark>-highlighted snippets.
+    """
+    if not await news_fts_ready(db):
+        raise HTTPException(status_code=503, detail="News search is unavailable (SQLite built without FTS5)")
+    since, until = _naive_utc(since), _naive_utc(until)
+    if days is not None:
+        window_start = datetime.utcnow() - timedelta(days=days)
+        since = max(since, window_start) if since else window_start
+
+    expression = build_match_query(q, match)
+    if expression is None:
+        return JSONResponse(content={"query": q, "total": 0, "page": page, "page_size": page_size, "results": []})
+    try:
+        total, results = await search_news(
+            db, expression, since=since, until=until, limit=page_size, offset=(page - 1) * page_size
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"News search failed: {str(e)}")
+    return JSONResponse(content={
+        "query": q,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": results,
+    })
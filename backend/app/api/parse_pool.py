@@ -0,0 +1,135 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from api.metrics import register_collector
+
+# "process" uses every core from a single uvicorn worker, "thread" avoids the
+# pickling overhead, "inline" runs on the event loop like before.
+PARSE_POOL_KIND = os.getenv("PARSE_POOL_KIND", "process")
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", str(os.cpu_count() or 2)))
+# Max jobs submitted to the executor at once; further callers wait their turn
+PARSE_POOL_MAX_PENDING = int(os.getenv("PARSE_POOL_MAX_PENDING", "64"))
+
+
+def _timed_call(func, args):
+    # Runs in the worker: report when execution actually started so the
+    # caller can tell queueing time apart from parse time.
+    started_at = time.time()
+    result = func(*args)
+    return result, started_at, time.time()
+
+
+class ParsePool:
+    """
+    Runs CPU-bound HTML extraction off the event loop.
+
+    Only the HTML string goes in and only the small result dict comes back.
+    """
+
+    def __init__(self):
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self.kind = "inline"
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.waiting = 0  # blocked on the pending limit
+        self.pending = 0  # handed to the executor, not finished yet
+        self.backpressure_wait_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def start(self):
+        if self._executor is not None or PARSE_POOL_KIND == "inline":
+            return
+        if PARSE_POOL_KIND == "thread":
+            self._executor = ThreadPoolExecutor(PARSE_POOL_WORKERS, thread_name_prefix="parse")
+        else:
+            self._executor = ProcessPoolExecutor(PARSE_POOL_WORKERS)
+        self._slots = asyncio.Semaphore(PARSE_POOL_MAX_PENDING)
+        self.kind = PARSE_POOL_KIND
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+            self.kind = "inline"
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) in the pool. func must be a module-level function
+        (picklable) when the pool is process-based.
+        """
+        if self._executor is None:
+            # No lifespan (scripts) or PARSE_POOL_KIND=inline
+            return func(*args)
+
+        waited_from = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.backpressure_wait_seconds += time.perf_counter() - waited_from
+
+        submitted_at = time.time()
+        self.submitted += 1
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        slots = self._slots
+        try:
+            job = self._executor.submit(_timed_call, func, args)
+        except Exception:
+            self.failed += 1
+            self._job_finished(slots)
+            raise
+
+        # The slot is freed when the job finishes, not when the caller stops
+        # waiting: a cancelled caller can't stop a job a worker already runs
+        def finished(_):
+            try:
+                loop.call_soon_threadsafe(self._job_finished, slots)
+            except RuntimeError:
+                pass  # event loop already closed
+
+        job.add_done_callback(finished)
+        try:
+            result, started_at, finished_at = await asyncio.wrap_future(job)
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        self.queue_wait_seconds += max(started_at - submitted_at, 0.0)
+        self.run_seconds += finished_at - started_at
+        return result
+
+    def _job_finished(self, slots: asyncio.Semaphore):
+        self.pending -= 1
+        slots.release()
+
+    def stats(self) -> dict:
+        done = self.completed or 1
+        return {
+            "kind": self.kind,
+            "workers": PARSE_POOL_WORKERS if self._executor is not None else 0,
+            "max_pending": PARSE_POOL_MAX_PENDING,
+            "queue_depth": self.waiting + self.pending,
+            "waiting_for_slot": self.waiting,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_backpressure_wait_ms": round(self.backpressure_wait_seconds / done * 1000, 2),
+            "avg_queue_wait_ms": round(self.queue_wait_seconds / done * 1000, 2),
+            "avg_run_ms": round(self.run_seconds / done * 1000, 2),
+        }
+
+
+parse_pool = ParsePool()
+register_collector(lambda: [
+    ("parse_pool_queue_depth", "gauge", "Parse jobs waiting or running", {}, parse_pool.waiting + parse_pool.pending),
+    ("parse_pool_failed_total", "counter", "Parse jobs that raised", {}, parse_pool.failed),
+])
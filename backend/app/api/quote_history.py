@@ -0,0 +1,372 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from api.auth import get_current_user
+from api.quote_model import Quote
+
+history_router = APIRouter()
+
+# --- Quote Snapshot Store ---
+# Every fetched quote is appended as one fixed-size binary record to
+# {QUOTE_HISTORY_DIR}/{SYMBOL}/{YYYY-MM}.snap. Records are in time order,
+# so a range query memory-maps the month files it needs and binary-searches
+# the timestamps; only the pages in range are read. Appends use O_APPEND,
+# which keeps concurrent writers (several workers) from interleaving records.
+QUOTE_HISTORY_ENABLED = os.getenv("QUOTE_HISTORY_ENABLED", "1") == "1"
+QUOTE_HISTORY_DIR = os.getenv("QUOTE_HISTORY_DIR", "./quote_history")
+# Month files older than this are deleted when a new month starts (0 keeps all)
+QUOTE_HISTORY_RETENTION_MONTHS = int(os.getenv("QUOTE_HISTORY_RETENTION_MONTHS", "24"))
+QUOTE_HISTORY_MAX_POINTS = int(os.getenv("QUOTE_HISTORY_MAX_POINTS", "10000"))
+# Month files whose daily bars are kept in memory (a year of 2000 symbols is ~26k)
+QUOTE_HISTORY_ROLLUP_CACHE = int(os.getenv("QUOTE_HISTORY_ROLLUP_CACHE", "32768"))
+
+SNAPSHOT_DTYPE = np.dtype([
+    ("ts", "<i8"),  # epoch seconds, UTC
+    ("price", "<f8"),
+    ("previous_close", "<f8"),
+    ("day_low", "<f8"),
+    ("day_high", "<f8"),
+    ("year_low", "<f8"),
+    ("year_high", "<f8"),
+    ("market_cap", "<f8"),
+    ("avg_volume", "<f8"),
+    ("pe_ratio", "<f4"),
+    ("dividend_yield", "<f4"),
+])  # 80 bytes; missing values are NaN
+BAR_DTYPE = np.dtype([
+    ("ts", "<i8"),  # bucket start
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("count", "<i4"),  # snapshots in the bar
+])
+
+INTERVALS = {"1m": 60, "1d": 86400}
+# Daily bars follow the NSE trading day (IST), not the UTC date
+IST_OFFSET = 5 * 3600 + 30 * 60
+NSE_OPEN_SECONDS = 9 * 3600 + 15 * 60  # 09:15 IST
+
+# Symbols are directory names: no leading dot, so "." and ".." can't escape the root
+_SYMBOL_RE = re.compile(r"^[A-Z0-9][A-Z0-9&._-]{0,19}$")
+
+
+def _month(ts: int) -> str:
+    return time.strftime("%Y-%m", time.gmtime(ts))
+
+
+def _months_between(start: int, end: int) -> list[str]:
+    first = datetime.fromtimestamp(start, timezone.utc).replace(day=1)
+    last = _month(end)
+    months = []
+    while True:
+        months.append(first.strftime("%Y-%m"))
+        if months[-1] >= last:
+            return months
+        first = (first + timedelta(days=32)).replace(day=1)
+
+
+def rollup(snapshots: np.ndarray, interval: int, offset: int = 0) -> np.ndarray:
+    """
+    OHLC bars of `price` per `interval` seconds. Buckets start at multiples
+    of `interval` shifted by `offset` (e.g. the 09:15 IST open for daily bars).
+    Snapshots without a price are skipped.
+    """
+    snapshots = snapshots[~np.isnan(snapshots["price"])]
+    if snapshots.size == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    buckets = (snapshots["ts"] + offset) // interval * interval - offset
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], buckets.size] - 1
+    price = snapshots["price"]
+    bars = np.empty(starts.size, dtype=BAR_DTYPE)
+    bars["ts"] = buckets[starts]
+    bars["open"] = price[starts]
+    bars["close"] = price[ends]
+    bars["high"] = np.maximum.reduceat(price, starts)
+    bars["low"] = np.minimum.reduceat(price, starts)
+    bars["count"] = ends - starts + 1
+    return bars
+
+
+# A session bucket runs from one 09:15 IST open to the next, so the settled
+# close published after 15:30 and overnight / pre-open look-ups stay with the
+# session they show. `ref` is the page's previous close during the bucket.
+_SESSION_DTYPE = np.dtype(BAR_DTYPE.descr + [("ref", "<f8")])
+
+
+def _session_buckets(snapshots: np.ndarray) -> np.ndarray:
+    """Per-bucket bars of one month file; weekends and holidays are folded later by _fold_sessions."""
+    snapshots = snapshots[~np.isnan(snapshots["price"])]
+    bars = rollup(snapshots, INTERVALS["1d"], offset=IST_OFFSET - NSE_OPEN_SECONDS)
+    buckets = np.empty(bars.size, dtype=_SESSION_DTYPE)
+    for name in BAR_DTYPE.names:
+        buckets[name] = bars[name]
+    # Bars are dated by the session's IST midnight
+    buckets["ts"] -= NSE_OPEN_SECONDS
+    if bars.size:
+        starts = np.r_[0, np.cumsum(bars["count"])[:-1]]
+        buckets["ref"] = np.fmax.reduceat(snapshots["previous_close"], starts)
+    return buckets
+
+
+def _fold_sessions(buckets: np.ndarray) -> np.ndarray:
+    """
+    Daily bars for trading sessions only. Look-ups on weekends and exchange
+    holidays still record snapshots, but the page then shows the last
+    session again: the same previous close as the bucket before. Those
+    buckets are folded into that session's bar. A weekend bucket showing a
+    newer session (nobody looked during it) becomes its bar, dated Friday.
+    Without a previous close, weekend buckets are folded and weekdays kept.
+    """
+    if buckets.size == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    weekday = ((buckets["ts"] + IST_OFFSET) // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+    weekend = weekday >= 5
+    ref = buckets["ref"]
+    unknown = np.isnan(ref)
+    same = np.r_[False, ref[1:] == ref[:-1]]  # NaN never compares equal
+    fold = same | (weekend & np.r_[True, unknown[1:] | unknown[:-1]])
+    sessions = np.flatnonzero(~fold)
+    if sessions.size == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    # Buckets before the first session in range belong to one outside it
+    buckets, weekend, weekday = buckets[sessions[0]:], weekend[sessions[0]:], weekday[sessions[0]:]
+    sessions -= sessions[0]
+    ends = np.r_[sessions[1:], buckets.size] - 1
+    bars = np.empty(sessions.size, dtype=BAR_DTYPE)
+    bars["ts"] = buckets["ts"][sessions] - np.where(weekend[sessions], weekday[sessions] - 4, 0) * 86400
+    bars["open"] = buckets["open"][sessions]
+    bars["close"] = buckets["close"][ends]
+    bars["high"] = np.maximum.reduceat(buckets["high"], sessions)
+    bars["low"] = np.minimum.reduceat(buckets["low"], sessions)
+    bars["count"] = np.add.reduceat(buckets["count"], sessions)
+    return bars
+
+
+def _map(path: str) -> np.ndarray:
+    """Read-only memory map of a month file (a torn trailing record is ignored)."""
+    try:
+        count = os.path.getsize(path) // SNAPSHOT_DTYPE.itemsize
+    except OSError:
+        count = 0
+    if count == 0:
+        return np.empty(0, dtype=SNAPSHOT_DTYPE)
+    return np.memmap(path, dtype=SNAPSHOT_DTYPE, mode="r", shape=(count,))
+
+
+# Month file -> (size when rolled up, session buckets). One entry per file: closed
+# months are rolled up once, and the current month's entry is replaced when
+# the file grows rather than leaving a stale copy behind for every append.
+_rollups: OrderedDict[str, tuple[int, np.ndarray]] = OrderedDict()
+_rollups_lock = threading.Lock()
+
+
+def _daily_bars(path: str, size: int) -> np.ndarray:
+    with _rollups_lock:
+        cached = _rollups.get(path)
+        if cached is not None and cached[0] == size:
+            _rollups.move_to_end(path)
+            return cached[1]
+    # Only the records that were there at `size`, even if the file grew since
+    snapshots = np.array(_map(path)[:size // SNAPSHOT_DTYPE.itemsize])
+    bars = _session_buckets(snapshots)
+    with _rollups_lock:
+        _rollups[path] = (size, bars)
+        _rollups.move_to_end(path)
+        while len(_rollups) > QUOTE_HISTORY_ROLLUP_CACHE:
+            _rollups.popitem(last=False)
+    return bars
+
+
+class QuoteHistoryStore:
+    def __init__(self, root: str = QUOTE_HISTORY_DIR, retention_months: int = QUOTE_HISTORY_RETENTION_MONTHS):
+        self.root = root
+        self.retention_months = retention_months
+        self.appended = 0
+        self._lock = threading.Lock()
+        self._current_month: dict[str, str] = {}
+
+    def _symbol_dir(self, symbol: str) -> str:
+        symbol = symbol.strip().upper()
+        if not _SYMBOL_RE.match(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        directory = os.path.join(self.root, symbol)
+        root = os.path.realpath(self.root)
+        if os.path.dirname(os.path.realpath(directory)) != root:
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        return directory
+
+    def _path(self, symbol: str, month: str) -> str:
+        return os.path.join(self._symbol_dir(symbol), f"{month}.snap")
+
+    def append(self, quote: Quote, ts: float | None = None) -> bool:
+        """Persist one quote snapshot. Quotes without a price are not stored."""
+        if quote.price is None or not quote.symbol:
+            return False
+        ts = int(ts if ts is not None else time.time())
+        record = np.zeros(1, dtype=SNAPSHOT_DTYPE)
+        record["ts"] = ts
+        for name in SNAPSHOT_DTYPE.names[1:]:
+            value = getattr(quote, name)
+            record[name] = np.nan if value is None else value
+        month = _month(ts)
+        path = self._path(quote.symbol, month)
+        with self._lock:
+            if self._current_month.get(quote.symbol) != month:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._current_month[quote.symbol] = month
+                self._prune(quote.symbol, month)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                os.write(fd, record.tobytes())
+            finally:
+                os.close(fd)
+            self.appended += 1
+        return True
+
+    def _prune(self, symbol: str, month: str):
+        if self.retention_months <= 0:
+            return
+        year, mon = map(int, month.split("-"))
+        index = year * 12 + mon - 1 - self.retention_months
+        oldest = f"{index // 12:04d}-{index % 12 + 1:02d}"
+        directory = self._symbol_dir(symbol)
+        for name in os.listdir(directory):
+            if name.endswith(".snap") and name[:-5] < oldest:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError as e:
+                    print(f"Quote history prune failed for {symbol}/{name}: {e}")
+
+    def snapshots(self, symbol: str, start: int, end: int) -> np.ndarray:
+        """Snapshots with start <= ts < end, copied out of the month files."""
+        parts = []
+        for month in _months_between(start, end - 1):
+            mapped = _map(self._path(symbol, month))
+            if mapped.size:
+                lo, hi = np.searchsorted(mapped["ts"], [start, end])
+                parts.append(np.array(mapped[lo:hi]))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=SNAPSHOT_DTYPE)
+
+    def bars(self, symbol: str, start: int, end: int, interval: str) -> np.ndarray:
+        if interval == "1m":
+            return rollup(self.snapshots(symbol, start, end), INTERVALS["1m"])
+        parts = []
+        for month in _months_between(start, end - 1):
+            path = self._path(symbol, month)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            bars = _daily_bars(path, size)
+            parts.append(bars[(bars["ts"] >= start) & (bars["ts"] < end)])
+        if not parts:
+            return np.empty(0, dtype=BAR_DTYPE)
+        # A session's overnight snapshots can fall in the next UTC month's file
+        return _fold_sessions(_merge_split_days(np.concatenate(parts)))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": QUOTE_HISTORY_ENABLED,
+            "root": os.path.abspath(self.root),
+            "appended": self.appended,
+            "daily_rollups_cached": len(_rollups),
+        }
+
+
+def _merge_split_days(bars: np.ndarray) -> np.ndarray:
+    if bars.size < 2 or np.all(bars["ts"][1:] != bars["ts"][:-1]):
+        return bars
+    starts = np.flatnonzero(np.r_[True, bars["ts"][1:] != bars["ts"][:-1]])
+    ends = np.r_[starts[1:], bars.size] - 1
+    merged = np.empty(starts.size, dtype=bars.dtype)
+    merged["ts"] = bars["ts"][starts]
+    merged["ref"] = np.fmax.reduceat(bars["ref"], starts)
+    merged["open"] = bars["open"][starts]
+    merged["close"] = bars["close"][ends]
+    merged["high"] = np.maximum.reduceat(bars["high"], starts)
+    merged["low"] = np.minimum.reduceat(bars["low"], starts)
+    merged["count"] = np.add.reduceat(bars["count"], starts)
+    return merged
+
+
+quote_history = QuoteHistoryStore()
+
+
+async def record_quote(quote: Quote | None):
+    """Append a freshly fetched quote without blocking the event loop."""
+    if not QUOTE_HISTORY_ENABLED or quote is None:
+        return
+    try:
+        await asyncio.to_thread(quote_history.append, quote)
+    except Exception as e:
+        print(f"Quote history append failed for {quote.symbol}: {e}")
+
+
+# --- History Endpoint ---
+def _epoch(value: datetime) -> int:
+    # Naive datetimes are taken as UTC, like the rest of the API
+    return int(value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp())
+
+
+def _columns(records: np.ndarray) -> dict[str, list]:
+    columns = {}
+    for name in records.dtype.names:
+        values = records[name]
+        if values.dtype.kind == "f":
+            columns[name] = [None if v != v else round(v, 6) for v in values.tolist()]
+        else:
+            columns[name] = values.tolist()
+    return columns
+
+
+@history_router.get("/api/stocks/{symbol}/history")
+async def get_quote_history(
+    symbol: str,
+    start: datetime | None = Query(None, description="Default: 1 day back (1 year for 1d bars)"),
+    end: datetime | None = Query(None, description="Default: now"),
+    interval: str = Query("1m", pattern="^(raw|1m|1d)$"),
+    current_user=Depends(get_current_user),
+):
+    """
+    Stored quote snapshots for a symbol, as raw snapshots or 1-minute /
+    daily OHLC bars of the price (one daily bar per NSE trading session). Columnar: one list per field, `ts` in
+    epoch seconds (bar start for bars).
+    """
+    symbol = symbol.strip().upper()
+    if not _SYMBOL_RE.match(symbol):
+        raise HTTPException(status_code=400, detail="Invalid symbol")
+    end_ts = _epoch(end) if end else int(time.time())
+    start_ts = _epoch(start) if start else end_ts - (365 if interval == "1d" else 1) * 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    try:
+        if interval == "raw":
+            records = await asyncio.to_thread(quote_history.snapshots, symbol, start_ts, end_ts)
+        else:
+            records = await asyncio.to_thread(quote_history.bars, symbol, start_ts, end_ts, interval)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Quote history failed: {str(e)}")
+    truncated = records.size > QUOTE_HISTORY_MAX_POINTS
+    if truncated:
+        records = records[-QUOTE_HISTORY_MAX_POINTS:]  # most recent points
+    return JSONResponse(content={
+        "symbol": symbol,
+        "interval": interval,
+        "start": start_ts,
+        "end": end_ts,
+        "count": int(records.size),
+        "truncated": truncated,
+        "columns": _columns(records),
+    })
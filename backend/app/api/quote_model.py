@@ -0,0 +1,168 @@
+from dataclasses import dataclass, field, fields
+from decimal import Decimal, InvalidOperation
+import re
+
+# Typed view of a Google Finance quote. The page gives display strings
+# ("₹2,945.10", "19.5T INR", "2.3M", "N/A"); this parses them once so
+# callers can sort, compare and store numbers. Pure functions only, so it
+# runs inside the parse pool next to the extractor.
+
+# --- Display String Parsing ---
+SCALE_SUFFIXES = {
+    "K": 10**3,
+    "M": 10**6,
+    "B": 10**9,
+    "T": 10**12,
+    "L": 10**5,  # lakh
+    "CR": 10**7,  # crore
+}
+CURRENCY_SYMBOLS = {"₹": "INR", "$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY"}
+MISSING = {"", "N/A", "-", "—", "--"}
+
+_NUMBER_RE = re.compile(r"[-+]?\d+(?:\.\d+)?")
+_SCALED_RE = re.compile(r"([-+]?\d+(?:\.\d+)?)\s*(CR|[KMBTL])?\b", re.IGNORECASE)
+_CURRENCY_CODE_RE = re.compile(r"\b([A-Z]{3})\b")
+
+
+def _clean(text: str | None) -> str | None:
+    if text is None:
+        return None
+    text = text.strip().replace(",", "").replace("−", "-").replace(" ", " ")
+    return None if text.upper() in MISSING else text
+
+
+def parse_decimal(text: str | None) -> Decimal | None:
+    """First number in a display string: "₹2,945.10" -> Decimal("2945.10")."""
+    text = _clean(text)
+    match = _NUMBER_RE.search(text) if text else None
+    if not match:
+        return None
+    try:
+        return Decimal(match.group())
+    except InvalidOperation:
+        return None
+
+
+def parse_float(text: str | None) -> float | None:
+    value = parse_decimal(text)
+    return float(value) if value is not None else None
+
+
+def parse_scaled_int(text: str | None) -> int | None:
+    """Expand a magnitude suffix: "19.5T INR" -> 19500000000000, "2.3M" -> 2300000."""
+    text = _clean(text)
+    match = _SCALED_RE.search(text) if text else None
+    if not match:
+        return None
+    number, suffix = match.groups()
+    return int(Decimal(number) * SCALE_SUFFIXES.get((suffix or "").upper(), 1))
+
+
+def parse_range(text: str | None) -> tuple[float | None, float | None]:
+    """ "₹2,900.00 - ₹2,960.50" -> (2900.0, 2960.5); (None, None) if unparseable."""
+    text = _clean(text)
+    if not text:
+        return None, None
+    # Split on the separator dash, not a sign: "-" surrounded by spaces
+    parts = re.split(r"\s+[-–]\s+", text)
+    if len(parts) != 2:
+        return None, None
+    return parse_float(parts[0]), parse_float(parts[1])
+
+
+def parse_currency(*texts: str | None) -> str | None:
+    """ISO code from a currency symbol ("₹2,945") or code ("19.5T INR")."""
+    for text in texts:
+        if not text:
+            continue
+        for symbol, code in CURRENCY_SYMBOLS.items():
+            if symbol in text:
+                return code
+        match = _CURRENCY_CODE_RE.search(text)
+        if match:
+            return match.group(1)
+    return None
+
+
+# --- Quote Record ---
+@dataclass(slots=True)
+class Quote:
+    """
+    One parsed quote. Numbers are None where the page showed "N/A" or
+    something unparseable; `raw` keeps the original display strings.
+    """
+    symbol: str = ""
+    price: float | None = None
+    currency: str | None = None
+    previous_close: float | None = None
+    day_low: float | None = None
+    day_high: float | None = None
+    year_low: float | None = None
+    year_high: float | None = None
+    market_cap: int | None = None
+    avg_volume: int | None = None
+    pe_ratio: float | None = None
+    dividend_yield: float | None = None  # percent
+    primary_exchange: str | None = None
+    raw: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_display(cls, stock_data: dict, symbol: str = "") -> "Quote":
+        """Build from parse_stock_info() output."""
+        day_low, day_high = parse_range(stock_data.get("day_range"))
+        year_low, year_high = parse_range(stock_data.get("year_range"))
+        exchange = _clean(stock_data.get("primary_exchange"))
+        return cls(
+            symbol=symbol,
+            price=parse_float(stock_data.get("price")),
+            currency=parse_currency(stock_data.get("price"), stock_data.get("market_cap")),
+            previous_close=parse_float(stock_data.get("previous_close")),
+            day_low=day_low,
+            day_high=day_high,
+            year_low=year_low,
+            year_high=year_high,
+            market_cap=parse_scaled_int(stock_data.get("market_cap")),
+            avg_volume=parse_scaled_int(stock_data.get("avg_volume")),
+            pe_ratio=parse_float(stock_data.get("pe_ratio")),
+            dividend_yield=parse_float(stock_data.get("dividend_yield")),
+            primary_exchange=exchange,
+            raw=dict(stock_data),
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        """True when nothing numeric could be read (blocked or changed page)."""
+        return all(getattr(self, name) is None for name in NUMERIC_COLUMNS)
+
+    def to_dict(self, include_raw: bool = False) -> dict:
+        values = {name: getattr(self, name) for name in QUOTE_COLUMNS}
+        if include_raw:
+            values["raw"] = dict(self.raw)
+        return values
+
+
+QUOTE_COLUMNS = tuple(f.name for f in fields(Quote) if f.name != "raw")
+NUMERIC_COLUMNS = tuple(
+    name for name in QUOTE_COLUMNS if name not in ("symbol", "currency", "primary_exchange")
+)
+
+
+# --- Columnar Serialisation ---
+def quotes_to_columns(quotes: list[Quote], include_raw: bool = False) -> dict[str, list]:
+    """
+    {"symbol": [...], "price": [...], ...}: one list per field, so a batch
+    repeats no keys and loads straight into arrays.
+    """
+    columns = {name: [getattr(q, name) for q in quotes] for name in QUOTE_COLUMNS}
+    if include_raw:
+        columns["raw"] = [dict(q.raw) for q in quotes]
+    return columns
+
+
+def quotes_from_columns(columns: dict[str, list]) -> list[Quote]:
+    count = len(columns.get("symbol", ()))
+    raw = columns.get("raw") or [{}] * count
+    return [
+        Quote(**{name: columns[name][i] for name in QUOTE_COLUMNS if name in columns}, raw=dict(raw[i]))
+        for i in range(count)
+    ]
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import random
+import socket
+import time
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from database.models import AsyncSessionLocal
+from database.async_crud import acquire_job_lease, release_job_lease
+
+# Identifies this process when several uvicorn workers share the database
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class PeriodicJob:
+    """
+    Runs an async job every `interval` seconds (+/- `jitter`) from the app lifespan.
+
+    An asyncio.Lock keeps one run per process and a lease row in the
+    job_leases table keeps one run across workers sharing the database.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[dict]],
+        interval: float,
+        jitter: float = 0.0,
+        lease_seconds: float = 600.0,
+        run_on_start: bool = True,
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.lease_seconds = lease_seconds
+        self.run_on_start = run_on_start
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._adhoc: asyncio.Task | None = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started: datetime | None = None
+        self.last_finished: datetime | None = None
+        self.last_duration: float | None = None
+        self.last_result: dict | None = None
+        self.last_error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=f"job:{self.name}")
+
+    async def stop(self):
+        # Also the run started by trigger(), so nothing is still crawling once
+        # the HTTP client and the DB engine are closed
+        for task in (self._task, self._adhoc):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._adhoc = None
+
+    def trigger(self):
+        """Kick off a run in the background unless one is already going."""
+        if not self.running and (self._adhoc is None or self._adhoc.done()):
+            self._adhoc = asyncio.create_task(self.run_once())
+
+    def _next_delay(self) -> float:
+        return max(self.interval + random.uniform(-self.jitter, self.jitter), 1.0)
+
+    async def _loop(self):
+        if not self.run_on_start:
+            await asyncio.sleep(self._next_delay())
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                # One bad iteration must not end the loop
+                print(f"Job {self.name} loop error: {str(e)}")
+            await asyncio.sleep(self._next_delay())
+
+    async def _acquire_lease(self) -> bool:
+        """False if another worker holds the lease or the database can't be reached."""
+        try:
+            async with AsyncSessionLocal() as db:
+                return await acquire_job_lease(db, self.name, WORKER_ID, self.lease_seconds)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"lease: {str(e)}"
+            print(f"Job {self.name} could not acquire its lease: {str(e)}")
+            return False
+
+    async def _release_lease(self):
+        # Logged only: the run is over and an unreleased lease expires by itself
+        try:
+            async with AsyncSessionLocal() as db:
+                await release_job_lease(db, self.name, WORKER_ID)
+        except Exception as e:
+            print(f"Job {self.name} could not release its lease: {str(e)}")
+
+    async def run_once(self, force: bool = False) -> dict | None:
+        """
+        Run the job now. If another run is in progress, wait for it and return
+        its result instead of starting a second one. `force` ignores another
+        worker's lease.
+        """
+        if self._lock.locked():
+            self.skipped += 1
+            async with self._lock:
+                return self.last_result
+
+        async with self._lock:
+            if not await self._acquire_lease() and not force:
+                self.skipped += 1
+                return self.last_result
+            self.last_started = datetime.utcnow()
+            start = time.perf_counter()
+            try:
+                self.last_result = await self.func()
+                self.last_error = None
+                self.runs += 1
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Job {self.name} failed: {str(e)}")
+            finally:
+                self.last_duration = time.perf_counter() - start
+                self.last_finished = datetime.utcnow()
+                await self._release_lease()
+            return self.last_result
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval,
+            "jitter_seconds": self.jitter,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started": str(self.last_started) if self.last_started else None,
+            "last_finished": str(self.last_finished) if self.last_finished else None,
+            "last_duration_seconds": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
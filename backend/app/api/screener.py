@@ -0,0 +1,344 @@
+import asyncio
+import operator
+import os
+import re
+import time
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from api.auth import get_current_user
+from api.quote_model import NUMERIC_COLUMNS, Quote
+from api.scheduler import PeriodicJob
+from api.scraper import fetch_quote_page
+from api.upstream import UPSTREAM_RATE, UpstreamNotFound
+from api.symbol_table import symbol_table
+
+screener_router = APIRouter()
+
+# --- Screener Config ---
+SCREENER_ENABLED = os.getenv("SCREENER_ENABLED", "0") == "1"
+# Comma-separated subset of the universe; empty means every symbol in the CSV
+SCREENER_SYMBOLS = [s.strip().upper() for s in os.getenv("SCREENER_SYMBOLS", "").split(",") if s.strip()]
+SCREENER_REFRESH_INTERVAL = float(os.getenv("SCREENER_REFRESH_INTERVAL", str(30 * 60)))  # seconds
+SCREENER_CONCURRENCY = int(os.getenv("SCREENER_CONCURRENCY", "8"))
+# Quote page requests per second. Kept below UPSTREAM_RATE so the crawl never
+# drains the shared Google bucket and interactive lookups don't queue behind it
+SCREENER_RATE = float(os.getenv("SCREENER_RATE", str(min(2.0, UPSTREAM_RATE / 2))))
+# Written by whichever worker holds the refresh lease, read by all of them
+SCREENER_SNAPSHOT_PATH = os.getenv("SCREENER_SNAPSHOT_PATH", "./screener_snapshot.npz")
+SCREENER_RELOAD_CHECK_INTERVAL = float(os.getenv("SCREENER_RELOAD_CHECK_INTERVAL", "30"))
+
+# Quote metrics plus values derived from them
+SCREENER_COLUMNS = NUMERIC_COLUMNS + ("change_pct", "pos_52w", "updated_at")
+
+OPERATORS = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+}
+_CONDITION_RE = re.compile(r"^\s*([a-z_0-9]+)\s*(<=|>=|==|!=|<|>|=)\s*(-?\d+(?:\.\d+)?)\s*%?\s*$")
+# A comma between digits groups thousands (1,000 or 1,00,000); conditions never start with a digit
+_DIGIT_GROUP_RE = re.compile(r"(?<=\d),(?=\d)")
+
+
+def parse_conditions(where: str | None) -> list[tuple[str, str, float]]:
+    """
+    "pe_ratio < 15 and dividend_yield > 2" -> [("pe_ratio", "<", 15.0), ...].
+    Conditions are ANDed; commas work as well as "and", except between
+    digits: "market_cap > 1,000" is a thousands separator.
+    """
+    conditions = []
+    where = _DIGIT_GROUP_RE.sub("", where or "")
+    for part in re.split(r"\s+and\s+|,", where, flags=re.IGNORECASE):
+        if not part.strip():
+            continue
+        match = _CONDITION_RE.match(part.lower())
+        if not match:
+            raise ValueError(f"Can't parse condition {part.strip()!r} (expected e.g. pe_ratio < 15)")
+        column, op, value = match.groups()
+        if column not in SCREENER_COLUMNS:
+            raise ValueError(f"Unknown column {column!r}")
+        conditions.append((column, op, float(value)))
+    return conditions
+
+
+# --- Columnar Table ---
+class ScreenerTable:
+    """
+    One float64 array per metric (NaN = unknown), row i for symbols[i].
+    Filters are vectorized comparisons, so a query over the whole universe
+    is a handful of array operations.
+    """
+
+    def __init__(self, symbols: list[str], names: list[str], columns: dict[str, np.ndarray] | None = None):
+        self.symbols = list(symbols)
+        self.names = list(names)
+        self.row = {symbol: i for i, symbol in enumerate(self.symbols)}
+        size = len(self.symbols)
+        self.columns = {name: np.full(size, np.nan) for name in SCREENER_COLUMNS}
+        if columns:
+            self.columns.update(columns)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def populated(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.columns["updated_at"])))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def reindex(self, symbols: list[str], names: list[str]) -> "ScreenerTable":
+        """Same data over a new universe; rows for dropped symbols go, new ones start empty."""
+        table = ScreenerTable(symbols, names)
+        old_rows = np.array([self.row.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+        keep = old_rows >= 0
+        for name in SCREENER_COLUMNS:
+            table.columns[name][keep] = self.columns[name][old_rows[keep]]
+        return table
+
+    def update(self, quote: Quote, updated_at: float | None = None) -> bool:
+        i = self.row.get(quote.symbol)
+        if i is None:
+            return False
+        for name in NUMERIC_COLUMNS:
+            value = getattr(quote, name)
+            self.columns[name][i] = np.nan if value is None else value
+        price, previous = quote.price, quote.previous_close
+        self.columns["change_pct"][i] = (price - previous) / previous * 100 if price and previous else np.nan
+        low, high = quote.year_low, quote.year_high
+        self.columns["pos_52w"][i] = (price - low) / (high - low) if price and low and high and high > low else np.nan
+        self.columns["updated_at"][i] = updated_at if updated_at is not None else time.time()
+        return True
+
+    def query(
+        self,
+        conditions: list[tuple[str, str, float]],
+        sort: str = "market_cap",
+        descending: bool = True,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> tuple[int, list[dict]]:
+        """Matching rows sorted by `sort` (unknown values last), one page of them."""
+        mask = ~np.isnan(self.columns["updated_at"])
+        with np.errstate(invalid="ignore"):
+            for column, op, value in conditions:
+                # A missing value never matches, not even "!= x"
+                values = self.columns[column]
+                mask &= OPERATORS[op](values, value) & ~np.isnan(values)
+        matches = np.flatnonzero(mask)
+        keys = self.columns[sort][matches]
+        # argsort puts NaN last; negating keeps it last for descending order too
+        order = np.argsort(-keys if descending else keys, kind="stable")
+        page = matches[order[offset:offset + limit]]
+        return int(matches.size), [self._row_dict(i) for i in page]
+
+    def _row_dict(self, i: int) -> dict:
+        row = {"symbol": self.symbols[i], "name": self.names[i]}
+        for name, column in self.columns.items():
+            value = column[i].item()
+            if value != value:
+                row[name] = None
+            elif name in ("market_cap", "avg_volume", "updated_at"):
+                row[name] = int(value)
+            else:
+                row[name] = round(value, 4)
+        return row
+
+    def save(self, path: str):
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            symbols=np.array(self.symbols, dtype=str),
+            names=np.array(self.names, dtype=str),
+            **{f"col_{name}": column for name, column in self.columns.items()},
+        )
+        os.replace(tmp_path, path)  # atomic, so other workers never load a partial file
+
+    @classmethod
+    def load(cls, path: str) -> "ScreenerTable":
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[f"col_{name}"] for name in SCREENER_COLUMNS if f"col_{name}" in data}
+            return cls(data["symbols"].tolist(), data["names"].tolist(), columns)
+
+
+# --- Rate-Limited Crawler ---
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all callers."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def crawl(symbols: list[str], fetch, on_result, concurrency: int, rate: float) -> dict:
+    """
+    `fetch(symbol)` for every symbol with at most `concurrency` in flight and
+    at most `rate` starts per second; `on_result(symbol, value)` gets each
+    success. Returns counts and throughput; symbols the source doesn't list
+    are counted as not_found rather than failed.
+    """
+    limiter = RateLimiter(rate)
+    pending = iter(symbols)
+    counts = {"fetched": 0, "not_found": 0, "failed": 0}
+
+    async def worker():
+        for symbol in pending:
+            await limiter.wait()
+            try:
+                value = await fetch(symbol)
+            except UpstreamNotFound:
+                counts["not_found"] += 1
+                continue
+            except Exception:
+                counts["failed"] += 1
+                continue
+            counts["fetched"] += 1
+            on_result(symbol, value)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    seconds = time.perf_counter() - start
+    return {
+        **counts,
+        "seconds": round(seconds, 2),
+        "symbols_per_second": round(len(symbols) / seconds, 2) if seconds else None,
+    }
+
+
+# --- Screener ---
+class Screener:
+    def __init__(self, snapshot_path: str = SCREENER_SNAPSHOT_PATH):
+        self.snapshot_path = snapshot_path
+        self.table = ScreenerTable([], [])
+        self.refreshed_at: float | None = None
+        self._snapshot_mtime: float | None = None
+        self._last_check = 0.0
+
+    def current(self) -> ScreenerTable:
+        """The table, reloaded when another worker has written a newer snapshot."""
+        now = time.monotonic()
+        if now - self._last_check >= SCREENER_RELOAD_CHECK_INTERVAL:
+            self._last_check = now
+            try:
+                mtime = os.path.getmtime(self.snapshot_path)
+                if self._snapshot_mtime is None or mtime > self._snapshot_mtime:
+                    self.table = ScreenerTable.load(self.snapshot_path)
+                    self._snapshot_mtime = self.refreshed_at = mtime
+            except (OSError, ValueError, KeyError) as e:
+                if not isinstance(e, FileNotFoundError):
+                    print(f"Screener snapshot not loaded: {str(e)}")
+        return self.table
+
+    def universe(self) -> tuple[list[str], list[str]]:
+        try:
+            index = symbol_table.index()
+        except OSError:
+            if not SCREENER_SYMBOLS:
+                raise
+            return SCREENER_SYMBOLS, [""] * len(SCREENER_SYMBOLS)  # symbol CSV missing: no names
+        symbols = SCREENER_SYMBOLS or [s for s in index.symbols if s != "SYMBOL"]  # skip a CSV header row
+        return symbols, [index.name_for(s) or "" for s in symbols]
+
+    async def refresh(self, fetch=None, concurrency: int = SCREENER_CONCURRENCY, rate: float = SCREENER_RATE) -> dict:
+        symbols, names = await asyncio.to_thread(self.universe)
+        table = self.current().reindex(symbols, names)
+        self.table = table  # queries see rows as they arrive
+        fetch = fetch or fetch_quote_page
+
+        def on_result(symbol: str, page):
+            # Blocked or unrecognised pages raise in fetch, so rows keep their previous values
+            table.update(getattr(page, "quote", page))
+
+        stats = await crawl(symbols, fetch, on_result, concurrency, rate)
+        await asyncio.to_thread(table.save, self.snapshot_path)
+        self._snapshot_mtime = self.refreshed_at = os.path.getmtime(self.snapshot_path)
+        return {
+            "symbols": len(symbols),
+            **stats,
+            "table_bytes": table.nbytes,
+        }
+
+    def stats(self) -> dict:
+        table = self.current()
+        return {
+            "enabled": SCREENER_ENABLED,
+            "symbols": len(table),
+            "populated": table.populated,
+            "table_bytes": table.nbytes,
+            "refreshed_at": self.refreshed_at,
+            "refresh_job": screener_job.stats(),
+        }
+
+
+screener = Screener()
+
+screener_job = PeriodicJob(
+    "screener_refresh",
+    screener.refresh,
+    interval=SCREENER_REFRESH_INTERVAL,
+    jitter=60,
+    # A full crawl of ~2000 symbols at SCREENER_RATE takes several minutes
+    lease_seconds=SCREENER_REFRESH_INTERVAL,
+)
+
+
+# --- Screener Endpoints ---
+@screener_router.get("/api/screener")
+async def run_screener(
+    where: str | None = Query(None, max_length=500, description='e.g. "pe_ratio < 15 and dividend_yield > 2"'),
+    sort: str = Query("-market_cap", description="Column to sort by; prefix with - for descending"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
+    current_user=Depends(get_current_user),
+):
+    """
+    Filter and sort the latest quotes for the whole symbol universe.
+    Dividend yield and change_pct are in percent, pos_52w is 0 (52-week low)
+    to 1 (52-week high).
+    """
+    try:
+        conditions = parse_conditions(where)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    descending = sort.startswith("-")
+    sort_column = sort.lstrip("-+")
+    if sort_column not in SCREENER_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort column {sort_column!r}")
+
+    table = screener.current()
+    if table.populated == 0:
+        raise HTTPException(status_code=503, detail="Screener has no data yet (is SCREENER_ENABLED set?)")
+    start = time.perf_counter()
+    total, results = table.query(
+        conditions, sort_column, descending, offset=(page - 1) * page_size, limit=page_size
+    )
+    took_ms = (time.perf_counter() - start) * 1000
+    return JSONResponse(content={
+        "where": where,
+        "sort": sort,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "scanned": len(table),
+        "took_ms": round(took_ms, 3),
+        "refreshed_at": screener.refreshed_at,
+        "results": results,
+    })
+
+
+@screener_router.get("/api/screener/stats")
+async def get_screener_stats(current_user=Depends(get_current_user)):
+    return JSONResponse(content={**screener.stats(), "columns": list(SCREENER_COLUMNS)})
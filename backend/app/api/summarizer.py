@@ -1,16 +1,125 @@
+import hashlib
+import json
 import os
-import httpx
 import re
+from datetime import datetime
 from fastapi import HTTPException
 from dotenv import load_dotenv
-from sqlalchemy.orm import Session
-from database.models import TrendingNews
-from database.crud import get_latest_trending_news
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.cache import TTLCache
+from api.http_client import http_client
+from api.metrics import register_cache, stage
+from api.context_selection import ContextSelection, select_context
+from api.news_search import related_news, NEWS_CONTEXT_DAYS
+from api.symbol_table import symbol_table
+from database.models import TrendingNews, AsyncSessionLocal
+from database.async_crud import get_latest_trending_news, get_trending_articles, get_cached_summary, store_cached_summary
 
 load_dotenv()
 GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+GEMINI_STREAM_URL = GEMINI_API_URL.replace(":generateContent", ":streamGenerateContent")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Identical prompts within the TTL reuse the stored answer instead of calling Gemini
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", "3600"))  # seconds
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "256"))
+summary_cache = TTLCache(maxsize=SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_TTL)
+register_cache("summary", summary_cache)
+
+def prompt_cache_key(prompt: str, generation_config: dict) -> str:
+    payload = json.dumps(
+        {"model": GEMINI_API_URL, "prompt": prompt, "generationConfig": generation_config},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def generate_content(prompt: str, generation_config: dict) -> str:
+    """
+    Call Gemini, memoized by a hash of the prompt and generation config.
+    Concurrent identical prompts share one in-flight call, and answers are
+    persisted to the summary_cache table so they survive restarts.
+    Errors are raised, never cached.
+    """
+    key = prompt_cache_key(prompt, generation_config)
+    ttl = SUMMARY_CACHE_TTL
+
+    async def load():
+        nonlocal ttl
+        async with AsyncSessionLocal() as db:
+            stored = await get_cached_summary(db, key, SUMMARY_CACHE_TTL)
+            if stored:
+                # Keep it in memory only for the rest of the stored row's lifetime
+                ttl = max(SUMMARY_CACHE_TTL - (datetime.utcnow() - stored.created_at).total_seconds(), 0.0)
+                return stored.summary
+
+        with stage("llm"):
+            response = await http_client.post(
+                GEMINI_API_URL,
+                params={"key": GEMINI_API_KEY},
+                timeout=30.0,
+                json={
+                    "contents": [{"parts": [{"text": prompt}]}],
+                    "generationConfig": generation_config
+                }
+            )
+            response.raise_for_status()
+        data = response.json()
+        text = data["candidates"][0]["content"]["parts"][0]["text"].strip()
+
+        async with AsyncSessionLocal() as db:
+            await store_cached_summary(db, key, text, SUMMARY_CACHE_TTL)
+        return text
+
+    # Read after load() returns, so a stored answer gets its remaining TTL
+    return await summary_cache.get_or_load(key, load, ttl=lambda: ttl)
+
+async def stream_content(prompt: str, generation_config: dict):
+    """
+    Stream a Gemini answer chunk by chunk (streamGenerateContent, SSE).
+    A memoized answer is yielded in one piece; a freshly streamed one is
+    stored in the same cache as generate_content() once complete.
+    """
+    key = prompt_cache_key(prompt, generation_config)
+    cached = summary_cache.lookup(key)
+    if cached is None:
+        async with AsyncSessionLocal() as db:
+            stored = await get_cached_summary(db, key, SUMMARY_CACHE_TTL)
+            cached = stored.summary if stored else None
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    # Timed until the last chunk arrives
+    with stage("llm_stream"):
+        async with http_client.stream(
+            "POST",
+            GEMINI_STREAM_URL,
+            params={"key": GEMINI_API_KEY, "alt": "sse"},
+            timeout=30.0,
+            json={
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": generation_config
+            }
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:"):])
+                for candidate in data.get("candidates", []):
+                    for part in candidate.get("content", {}).get("parts", []):
+                        text = part.get("text")
+                        if text:
+                            chunks.append(text)
+                            yield text
+
+    text = "".join(chunks).strip()
+    if text:
+        summary_cache.set(key, text)
+        async with AsyncSessionLocal() as db:
+            await store_cached_summary(db, key, text, SUMMARY_CACHE_TTL)
+
 def format_summary(summary: str) -> str:
     # Bold section headers
     print(summary)
@@ -24,7 +133,17 @@ def format_summary(summary: str) -> str:
 
     return summary
 
-async def summarize_articles(articles: list[str], db: Session = None, symbol: str = None) -> str:
+ANALYSIS_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "maxOutputTokens": 1000,
+    "topP": 0.8,
+    "topK": 40
+}
+
+async def summarize_articles(
+    articles: list[str], db: AsyncSession = None, symbol: str = None, selection: ContextSelection = None,
+    technicals: str = "",
+) -> str:
     """
     Summarize articles with context from trending news in the database
     """
@@ -33,28 +152,67 @@ async def summarize_articles(articles: list[str], db: Session = None, symbol: st
     if not articles:
         return "No articles to summarize."
 
-    # Get trending news from database for context
-    trending_context = ""
+    prompt = await build_analysis_prompt(articles, db=db, symbol=symbol, selection=selection, technicals=technicals)
+    try:
+        return await generate_content(prompt, ANALYSIS_GENERATION_CONFIG)
+    except Exception as e:
+        print(f"Gemini API error: {str(e)}")
+        return "Summary unavailable due to API error."
+
+async def select_analysis_context(
+    articles: list[str], db: AsyncSession = None, symbol: str = None
+) -> ContextSelection:
+    """
+    Choose what goes into the analysis prompt: the most relevant paragraphs
+    of the scraped articles plus stored news about the symbol (full-text
+    search, or the latest trending news when none match), near-duplicates
+    removed, packed into the ANALYSIS_CONTEXT_TOKENS budget.
+    """
+    stored, heading = [], ""
     if db:
         try:
-            trending_news = get_latest_trending_news(db, limit=5)  # Get latest 5 trending news
-            if trending_news:
-                trending_headlines = [news.headline for news in trending_news if news.headline]
-                trending_snippets = [news.snippet for news in trending_news if news.snippet]
-                
-                # Create trending news context
-                trending_context = "\n\nCURRENT MARKET TRENDS (for additional context):\n"
-                for i, news in enumerate(trending_news[:5], 1):
-                    trending_context += f"{i}. {news.headline}"
-                    if news.snippet:
-                        trending_context += f" - {news.snippet[:100]}..."
-                    trending_context += "\n"
+            stored = await related_news(db, symbol, limit=10) if symbol else []
+            if stored:
+                heading = f"EARLIER NEWS ABOUT {symbol.upper()} (last {NEWS_CONTEXT_DAYS:g} days)"
+            else:
+                trending_news = await get_latest_trending_news(db, limit=5)  # Get latest 5 trending news
+                stored = [{"headline": news.headline, "snippet": news.snippet, "link": news.link} for news in trending_news]
+                heading = "CURRENT MARKET TRENDS (for additional context)"
         except Exception as e:
             print(f"Error fetching trending news: {str(e)}")
-            trending_context = ""
+            stored = []
+
+    company_name = None
+    if symbol:
+        try:
+            company_name = symbol_table.name_for(symbol)
+        except OSError:
+            pass  # symbol CSV missing: score on the ticker alone
+    return select_context(articles, stored, symbol=symbol, company_name=company_name, stored_heading=heading)
 
-    # Combine all articles, truncate if needed
-    combined_text = "\n\n---\n\n".join([a[:2000] for a in articles])[:10000]  # Reduced to make room for trending news
+async def build_analysis_prompt(
+    articles: list[str], db: AsyncSession = None, symbol: str = None, selection: ContextSelection = None,
+    technicals: str = "",
+) -> str:
+    """
+    Stock analysis prompt from the selected article text, stored news context
+    and, when we have price history, computed technical indicators
+    """
+    if selection is None:
+        selection = await select_analysis_context(articles, db=db, symbol=symbol)
+
+    trending_context = ""
+    if selection.stored:
+        trending_context = f"\n\n{selection.stored_heading}:\n"
+        for i, text in enumerate(selection.stored, 1):
+            trending_context += f"{i}. {text}\n"
+
+    combined_text = "\n\n---\n\n".join(selection.articles)
+    technical_context = f"{technicals}\n\n" if technicals else ""
+    technical_source = (
+        "Use the technical indicators above for the technical outlook rather than inferring levels from news. "
+        if technicals else ""
+    )
     
     # Enhanced prompt with trending news context
     symbol_text = f" for {symbol.upper()}" if symbol else ""
@@ -65,6 +223,7 @@ async def summarize_articles(articles: list[str], db: Session = None, symbol: st
         
         f"SPECIFIC STOCK NEWS{symbol_text}:\n{combined_text}\n"
         f"{trending_context}\n"
+        f"{technical_context}"
         
         f"Based on both the specific stock news and current market trends, provide analysis covering:\n"
         f"1. **Overall Market Sentiment**: Current mood and investor confidence\n"
@@ -74,32 +233,12 @@ async def summarize_articles(articles: list[str], db: Session = None, symbol: st
         f"5. **Investment Recommendation**: Clear BUY/SELL/HOLD recommendation with rationale\n\n"
         
         f"Consider both the specific stock context and broader market trends in your analysis. "
+        f"{technical_source}"
         f"Be specific about price levels, timeframes, and confidence levels where applicable."
     )
+    return prompt
 
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                GEMINI_API_URL,
-                params={"key": GEMINI_API_KEY},
-                json={
-                    "contents": [{"parts": [{"text": prompt}]}],
-                    "generationConfig": {
-                        "temperature": 0.3,
-                        "maxOutputTokens": 1000,
-                        "topP": 0.8,
-                        "topK": 40
-                    }
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["candidates"][0]["content"]["parts"][0]["text"].strip()
-    except Exception as e:
-        print(f"Gemini API error: {str(e)}")
-        return "Summary unavailable due to API error."
-
-async def get_market_overview_summary(db: Session) -> str:
+async def get_market_overview_summary(db: AsyncSession) -> str:
     """
     Generate a general market overview based on trending news only
     """
@@ -108,9 +247,10 @@ async def get_market_overview_summary(db: Session) -> str:
     
     try:
         # Get trending news from database
-        trending_news = get_latest_trending_news(db, limit=10)
+        trending_news = await get_latest_trending_news(db, limit=10)
         if not trending_news:
             return "No trending news available for market overview."
+        articles = await get_trending_articles(db, [news.id for news in trending_news])
         
         # Prepare trending news content
         trending_content = ""
@@ -118,9 +258,10 @@ async def get_market_overview_summary(db: Session) -> str:
             trending_content += f"{i}. **{news.headline}**\n"
             if news.snippet:
                 trending_content += f"   {news.snippet}\n"
-            if news.article and len(news.article) > 50:
+            article = articles.get(news.id)
+            if article and len(article) > 50:
                 # Take first 300 chars of article if available
-                trending_content += f"   {news.article[:300]}...\n"
+                trending_content += f"   {article[:300]}...\n"
             trending_content += "\n"
         
         prompt = (
@@ -135,23 +276,12 @@ async def get_market_overview_summary(db: Session) -> str:
             f"Provide actionable insights for investors and traders."
         )
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                GEMINI_API_URL,
-                params={"key": GEMINI_API_KEY},
-                json={
-                    "contents": [{"parts": [{"text": prompt}]}],
-                    "generationConfig": {
-                        "temperature": 0.3,
-                        "maxOutputTokens": 1200,
-                        "topP": 0.8,
-                        "topK": 40
-                    }
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["candidates"][0]["content"]["parts"][0]["text"].strip()
+        return await generate_content(prompt, {
+            "temperature": 0.3,
+            "maxOutputTokens": 1200,
+            "topP": 0.8,
+            "topK": 40
+        })
             
     except Exception as e:
         print(f"Error generating market overview: {str(e)}")
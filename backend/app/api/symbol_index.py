@@ -0,0 +1,130 @@
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from rapidfuzz import fuzz, process
+
+from api.cache import TTLCache
+
+RESULT_LIMIT = 10
+FUZZY_THRESHOLD = 70
+# How many n-gram candidates get re-ranked by the (expensive) fuzzy scorer
+FUZZY_SHORTLIST = 48
+MAX_QUERY_GRAMS = 6
+NGRAM = 3
+
+
+def _ngrams(text: str, n: int = NGRAM) -> set[str]:
+    text = f" {text} "
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class SymbolIndex:
+    """
+    Autocomplete index over (SYMBOL, NAME) pairs, built once.
+
+    Lookups go exact match -> prefix match (symbol, name, any word of the
+    name) -> n-gram shortlist re-ranked with rapidfuzz. Prefix matching uses
+    sorted key arrays + bisect, which behaves like a trie without a node per
+    character.
+    """
+
+    def __init__(self, pairs: list[tuple[str, str]]):
+        self.symbols: list[str] = []
+        self.names: list[str] = []
+        seen = set()
+        for symbol, name in pairs:
+            if (symbol, name) in seen:
+                continue
+            seen.add((symbol, name))
+            self.symbols.append(symbol)
+            self.names.append(name)
+
+        self._by_symbol = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._by_name = {name: i for i, name in enumerate(self.names)}
+
+        # Sorted (key, entry id) arrays for prefix search. Name keys include
+        # every word suffix so "MOTORS" finds "TATA MOTORS LTD".
+        symbol_keys = sorted((symbol, i) for i, symbol in enumerate(self.symbols))
+        name_keys = []
+        for i, name in enumerate(self.names):
+            words = name.split()
+            for w in range(len(words)):
+                name_keys.append((" ".join(words[w:]), i))
+        name_keys.sort()
+        self._symbol_keys = [key for key, _ in symbol_keys]
+        self._symbol_ids = [i for _, i in symbol_keys]
+        self._name_keys = [key for key, _ in name_keys]
+        self._name_ids = [i for _, i in name_keys]
+
+        # n-gram -> entry ids, for pruning before fuzzy scoring
+        postings: dict[str, list[int]] = {}
+        for i, (symbol, name) in enumerate(zip(self.symbols, self.names)):
+            for gram in _ngrams(name) | _ngrams(symbol):
+                postings.setdefault(gram, []).append(i)
+        self._postings = {gram: tuple(ids) for gram, ids in postings.items()}
+
+        # /api/search-symbol is a sync endpoint, so lookups arrive from the
+        # threadpool; TTLCache itself is only safe on the event loop
+        self._results = TTLCache(maxsize=4096, ttl=3600)
+        self._results_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def name_for(self, symbol: str) -> str | None:
+        i = self._by_symbol.get(symbol.strip().upper())
+        return self.names[i] if i is not None else None
+
+    def _prefix(self, keys: list[str], ids: list[int], prefix: str, limit: int) -> list[int]:
+        found = []
+        pos = bisect_left(keys, prefix)
+        while pos < len(keys) and keys[pos].startswith(prefix) and len(found) < limit:
+            if ids[pos] not in found:
+                found.append(ids[pos])
+            pos += 1
+        return found
+
+    def _fuzzy(self, query: str, exclude: set[int], limit: int) -> list[int]:
+        # Only the rarest grams: common ones ("LTD", "IND") match half the
+        # universe and cost more to count than they help to rank
+        postings = sorted(
+            (self._postings[gram] for gram in _ngrams(query) if gram in self._postings),
+            key=len,
+        )[:MAX_QUERY_GRAMS]
+        counts = Counter()
+        for ids in postings:
+            counts.update(ids)
+        shortlist = [i for i, _ in counts.most_common(FUZZY_SHORTLIST) if i not in exclude]
+        if not shortlist:
+            return []
+        choices = {i: self.names[i] for i in shortlist}
+        matches = process.extract(query, choices, scorer=fuzz.partial_ratio, limit=limit)
+        return [i for _, score, i in matches if score >= FUZZY_THRESHOLD]
+
+    def search(self, query: str, limit: int = RESULT_LIMIT) -> list[dict]:
+        query = query.strip().upper()
+        if not query:
+            return []
+        with self._results_lock:
+            cached = self._results.get((query, limit))
+        if cached is not None:
+            return cached
+
+        ranked: list[int] = []
+        for i in (self._by_symbol.get(query), self._by_name.get(query)):
+            if i is not None and i not in ranked:
+                ranked.append(i)
+        for i in self._prefix(self._symbol_keys, self._symbol_ids, query, limit):
+            if i not in ranked:
+                ranked.append(i)
+        for i in self._prefix(self._name_keys, self._name_ids, query, limit):
+            if i not in ranked:
+                ranked.append(i)
+        if len(ranked) < limit and len(query) >= NGRAM:
+            ranked.extend(self._fuzzy(query, set(ranked), limit - len(ranked)))
+
+        results = [{"name": self.names[i], "symbol": self.symbols[i]} for i in ranked[:limit]]
+        with self._results_lock:
+            self._results.set((query, limit), results)
+        return results
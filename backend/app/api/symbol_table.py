@@ -0,0 +1,131 @@
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from api.symbol_index import SymbolIndex
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), "../../Symbols_NSE_India.csv")
+# Prebuilt binary copy of the CSV; rebuilt whenever the CSV is newer
+SNAPSHOT_PATH = os.getenv("SYMBOL_SNAPSHOT_PATH", CSV_PATH + ".snapshot")
+# How often (seconds) a lookup may stat the CSV to pick up edits
+RELOAD_CHECK_INTERVAL = float(os.getenv("SYMBOL_RELOAD_CHECK_INTERVAL", "30"))
+
+SNAPSHOT_MAGIC = b"NSESYM01"
+SNAPSHOT_HEADER = struct.Struct("<8sI")  # magic, row count
+
+
+def read_symbol_csv(path: str) -> tuple[list[str], list[str]]:
+    """
+    SYMBOL (column 0) and NAME (column 1) as parallel lists of interned,
+    stripped, upper-cased strings.
+    """
+    symbols, names = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            symbols.append(sys.intern(row[0].strip().upper()))
+            names.append(sys.intern(row[1].strip().upper()))
+    return symbols, names
+
+
+def write_snapshot(path: str, symbols: list[str], names: list[str]):
+    """
+    Layout: header, uint32 end offsets for the 2*N strings (symbols then
+    names), then one UTF-8 blob.
+    """
+    blob = bytearray()
+    offsets = array("I")
+    for text in symbols + names:
+        blob += text.encode("utf-8")
+        offsets.append(len(blob))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(symbols)))
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)  # atomic, so other workers never see a partial file
+
+
+def read_snapshot(path: str) -> tuple[list[str], list[str]]:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, count = SNAPSHOT_HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a symbol snapshot")
+        offsets = array("I")
+        start = SNAPSHOT_HEADER.size
+        offsets.frombytes(mm[start:start + 4 * 2 * count])
+        base = start + 4 * 2 * count
+        strings = []
+        prev = 0
+        for end in offsets:
+            strings.append(sys.intern(mm[base + prev:base + end].decode("utf-8")))
+            prev = end
+    return strings[:count], strings[count:]
+
+
+class SymbolTable:
+    """
+    The NSE symbol universe, loaded on first use (or by the lifespan hook)
+    and reloaded when the CSV changes on disk.
+    """
+
+    def __init__(self, csv_path: str = CSV_PATH, snapshot_path: str = SNAPSHOT_PATH):
+        self.csv_path = csv_path
+        self.snapshot_path = snapshot_path
+        self._index: SymbolIndex | None = None
+        self._csv_mtime: float | None = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.loaded_from: str | None = None
+        self.load_seconds: float | None = None
+
+    def _load(self, csv_mtime: float):
+        start = time.perf_counter()
+        symbols = names = None
+        try:
+            if os.path.getmtime(self.snapshot_path) >= csv_mtime:
+                symbols, names = read_snapshot(self.snapshot_path)
+                self.loaded_from = "snapshot"
+        except (OSError, ValueError, struct.error):
+            pass
+        if symbols is None:
+            symbols, names = read_symbol_csv(self.csv_path)
+            self.loaded_from = "csv"
+            try:
+                write_snapshot(self.snapshot_path, symbols, names)
+            except OSError as e:
+                print(f"Could not write symbol snapshot: {str(e)}")
+        self._index = SymbolIndex(list(zip(symbols, names)))
+        self._csv_mtime = csv_mtime
+        self.load_seconds = time.perf_counter() - start
+
+    def index(self) -> SymbolIndex:
+        now = time.monotonic()
+        if self._index is not None and now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return self._index
+        with self._lock:
+            self._last_check = now
+            try:
+                csv_mtime = os.path.getmtime(self.csv_path)
+            except OSError:
+                if self._index is not None:
+                    return self._index  # CSV briefly missing mid-replace: keep serving
+                raise
+            if self._index is None or csv_mtime != self._csv_mtime:
+                self._load(csv_mtime)
+            return self._index
+
+    def name_for(self, symbol: str) -> str | None:
+        return self.index().name_for(symbol)
+
+    def symbols(self) -> list[str]:
+        return self.index().symbols
+
+
+symbol_table = SymbolTable()
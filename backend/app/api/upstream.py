@@ -0,0 +1,311 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+
+from api.http_client import http_client
+from api.metrics import register_collector, stage
+
+# --- Upstream Protection ---
+# Google Finance and Yahoo search throttle (429) or serve a CAPTCHA page
+# when we hit them too hard, and retrying harder makes it worse. Every
+# request to those hosts goes through one UpstreamGuard per host: a token
+# bucket for the request rate, a semaphore for concurrency, retries with
+# exponential backoff and full jitter, and a circuit breaker that stops
+# calling the host for a while once too many recent calls failed. Callers
+# fall back to the last good value while the circuit is open.
+GUARDED_HOSTS = [h.strip() for h in os.getenv("UPSTREAM_GUARDED_HOSTS", "www.google.com,news.search.yahoo.com").split(",") if h.strip()]
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", "5"))  # requests per second per host
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "10"))
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "4"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))  # seconds
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+# Breaker: trips when at least BREAKER_MIN_CALLS of the last BREAKER_WINDOW
+# calls were made and BREAKER_FAILURE_RATIO of them failed
+BREAKER_WINDOW = int(os.getenv("UPSTREAM_BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("UPSTREAM_BREAKER_MIN_CALLS", "8"))
+BREAKER_FAILURE_RATIO = float(os.getenv("UPSTREAM_BREAKER_FAILURE_RATIO", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("UPSTREAM_BREAKER_OPEN_SECONDS", "60"))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv("UPSTREAM_BREAKER_MAX_OPEN_SECONDS", "900"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """The host is throttling us, failing, or its circuit is open."""
+
+
+class BadUpstreamResponse(Exception):
+    """A 200 response whose content is useless (CAPTCHA, block page, unknown layout)."""
+
+
+class UpstreamNotFound(Exception):
+    """The host answered normally but has nothing for this request (unknown symbol)."""
+
+
+# Refill arithmetic leaves ~1e-13 of float residue; without this slack a
+# waiter that slept exactly long enough for one token would find 0.9999...
+# and keep re-sleeping for ~1e-13s
+TOKEN_EPSILON = 1e-9
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, clock=time.monotonic, sleep=asyncio.sleep):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (the host sent Retry-After)."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self):
+        # The lock queues callers, so waiters are served in arrival order
+        async with self._lock:
+            while True:
+                now = self._clock()
+                if now >= self._paused_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - max(self._updated, self._paused_until)) * self.rate)
+                    self._updated = now
+                    if self.tokens >= 1 - TOKEN_EPSILON:
+                        self.tokens = max(self.tokens - 1, 0.0)
+                        return
+                    delay = (1 - self.tokens) / self.rate
+                else:
+                    delay = self._paused_until - now
+                self.waits += 1
+                self.wait_seconds += delay
+                await self._sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through and outcomes are recorded.
+    open: calls are refused until the cool-down ends.
+    half_open: one probe call; success closes the circuit, failure reopens
+    it with a doubled cool-down (capped at BREAKER_MAX_OPEN_SECONDS).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self.state = "closed"
+        self.outcomes: deque[bool] = deque(maxlen=BREAKER_WINDOW)  # True = failure
+        self.opened_at = 0.0
+        self.open_seconds = BREAKER_OPEN_SECONDS
+        self.trips = 0
+        self._probe_started = 0.0
+
+    def allow(self) -> bool:
+        now = self._clock()
+        if self.state == "open" and now - self.opened_at >= self.open_seconds:
+            self.state = "half_open"
+            self._probe_started = 0.0
+        if self.state == "half_open":
+            # One probe at a time; a probe that never reported back expires
+            if self._probe_started and now - self._probe_started < self.open_seconds:
+                return False
+            self._probe_started = now
+            return True
+        return self.state == "closed"
+
+    def record(self, failed: bool):
+        if self.state == "half_open":
+            if failed:
+                self._open(min(self.open_seconds * 2, BREAKER_MAX_OPEN_SECONDS))
+            else:
+                self.state = "closed"
+                self.open_seconds = BREAKER_OPEN_SECONDS
+                self.outcomes.clear()
+            return
+        self.outcomes.append(failed)
+        if (
+            self.state == "closed"
+            and len(self.outcomes) >= BREAKER_MIN_CALLS
+            and sum(self.outcomes) / len(self.outcomes) >= BREAKER_FAILURE_RATIO
+        ):
+            self._open(BREAKER_OPEN_SECONDS)
+
+    def _open(self, seconds: float):
+        self.state = "open"
+        self.opened_at = self._clock()
+        self.open_seconds = seconds
+        self.outcomes.clear()
+        self.trips += 1
+
+    def stats(self) -> dict:
+        recent = len(self.outcomes)
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "recent_failure_ratio": round(sum(self.outcomes) / recent, 3) if recent else 0.0,
+            "open_seconds": self.open_seconds,
+            "reopens_in_seconds": round(max(self.opened_at + self.open_seconds - self._clock(), 0), 1)
+            if self.state == "open" else None,
+        }
+
+
+class UpstreamGuard:
+    def __init__(self, host: str):
+        self.host = host
+        self.bucket = TokenBucket(UPSTREAM_RATE, UPSTREAM_BURST)
+        self.concurrency = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+        self.breaker = CircuitBreaker()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0  # 429 responses
+        self.failures = 0
+        self.bad_responses = 0
+        self.not_found = 0
+        self.short_circuited = 0
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled_responses": self.throttled,
+            "failures": self.failures,
+            "bad_responses": self.bad_responses,
+            "not_found": self.not_found,
+            "short_circuited": self.short_circuited,
+            "rate_limit_waits": self.bucket.waits,
+            "rate_limit_wait_seconds": round(self.bucket.wait_seconds, 3),
+            "breaker": self.breaker.stats(),
+        }
+
+
+_guards: dict[str, UpstreamGuard] = {}
+
+
+def guard_for(url: str) -> UpstreamGuard | None:
+    host = urlsplit(url).hostname or ""
+    if host not in GUARDED_HOSTS:
+        return None
+    guard = _guards.get(host)
+    if guard is None:
+        guard = _guards[host] = UpstreamGuard(host)
+    return guard
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt: int) -> float:
+    # "Full jitter": anywhere between 0 and the exponential cap, so retries
+    # from many callers don't arrive in lockstep
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+
+
+async def guarded_get(url: str, parse=None, stage_name: str = "upstream_fetch", **kwargs):
+    """
+    GET through the host's guard. `parse(response)` (async) turns the
+    response into the result and raises BadUpstreamResponse for block pages;
+    those count as failures but are not retried. UpstreamNotFound from
+    `parse` is passed through and counts as a success (the host is fine,
+    the request was wrong). Raises UpstreamUnavailable
+    when the circuit is open or retries are exhausted. Hosts outside
+    GUARDED_HOSTS are fetched directly. Each attempt is timed as `stage_name`.
+    """
+    guard = guard_for(url)
+    if guard is None:
+        with stage(stage_name):
+            response = await http_client.get(url, **kwargs)
+        return await parse(response) if parse else response
+
+    attempt = 0
+    while True:
+        if not guard.breaker.allow():
+            guard.short_circuited += 1
+            raise UpstreamUnavailable(f"{guard.host} circuit is open after repeated failures")
+        await guard.bucket.acquire()
+        guard.requests += 1
+        retry_after = None
+        try:
+            async with guard.concurrency:
+                with stage(stage_name):
+                    response = await http_client.get(url, **kwargs)
+            if response.status_code in RETRYABLE_STATUS:
+                if response.status_code == 429:
+                    guard.throttled += 1
+                    retry_after = _retry_after(response)
+                    # Everyone slows down, not just this caller
+                    guard.bucket.pause(retry_after if retry_after is not None else backoff_delay(attempt + 1))
+                raise UpstreamUnavailable(f"{guard.host} returned HTTP {response.status_code}")
+            result = await parse(response) if parse else response
+        except UpstreamNotFound:
+            guard.not_found += 1
+            guard.breaker.record(failed=False)
+            raise
+        except BadUpstreamResponse as e:
+            guard.bad_responses += 1
+            guard.breaker.record(failed=True)
+            raise UpstreamUnavailable(f"{guard.host}: {str(e)}") from e
+        except (httpx.TransportError, UpstreamUnavailable) as e:
+            guard.failures += 1
+            guard.breaker.record(failed=True)
+            give_up = retry_after is not None and retry_after > UPSTREAM_BACKOFF_MAX
+            if attempt >= UPSTREAM_MAX_RETRIES or give_up or guard.breaker.state != "closed":
+                if isinstance(e, UpstreamUnavailable):
+                    raise
+                raise UpstreamUnavailable(f"{guard.host} request failed: {str(e) or type(e).__name__}") from e
+            attempt += 1
+            guard.retries += 1
+            await asyncio.sleep(retry_after if retry_after is not None else backoff_delay(attempt))
+            continue
+        guard.breaker.record(failed=False)
+        return result
+
+
+def upstream_stats() -> dict:
+    return {
+        "config": {
+            "rate_per_second": UPSTREAM_RATE,
+            "burst": UPSTREAM_BURST,
+            "concurrency": UPSTREAM_CONCURRENCY,
+            "max_retries": UPSTREAM_MAX_RETRIES,
+        },
+        "hosts": {host: guard.stats() for host, guard in _guards.items()},
+    }
+
+
+def _upstream_metrics() -> list:
+    samples = []
+    for host, guard in _guards.items():
+        labels = {"host": host}
+        samples += [
+            ("upstream_requests_total", "counter", "Requests sent to a guarded host", labels, guard.requests),
+            ("upstream_retries_total", "counter", "Retried upstream requests", labels, guard.retries),
+            ("upstream_throttled_total", "counter", "HTTP 429 responses", labels, guard.throttled),
+            ("upstream_failures_total", "counter", "Failed upstream requests", labels, guard.failures),
+            ("upstream_bad_responses_total", "counter", "CAPTCHA / unrecognized pages", labels, guard.bad_responses),
+            ("upstream_not_found_total", "counter", "Normal pages with nothing for the request", labels, guard.not_found),
+            ("upstream_short_circuited_total", "counter", "Calls refused by an open circuit", labels, guard.short_circuited),
+            ("upstream_circuit_open", "gauge", "1 while the circuit is not closed", labels, int(guard.breaker.state != "closed")),
+        ]
+    return samples
+
+
+register_collector(_upstream_metrics)
@@ -0,0 +1,147 @@
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from . import crud, models
+from datetime import datetime, timedelta
+
+# Async counterparts of crud.py for request handlers and background jobs.
+# Same names and arguments, awaited against an AsyncSession.
+
+# --- User Functions ---
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, username: str, email: str, hashed_password: str):
+    db_user = models.User(
+        username=username,
+        email=email,
+        hashed_password=hashed_password
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+# --- Trending News Functions ---
+async def create_trending_news(db: AsyncSession, headline: str, link: str, snippet: str, article: str):
+    return await db.run_sync(crud.create_trending_news, headline, link, snippet, article)
+
+async def get_trending_news_by_link(db: AsyncSession, link: str):
+    result = await db.execute(select(models.TrendingNews).where(models.TrendingNews.link == link))
+    return result.scalars().first()
+
+async def get_latest_trending_news(db: AsyncSession, limit: int = 10):
+    """Headline listing; article text is not loaded (see get_trending_articles)."""
+    result = await db.execute(
+        select(models.TrendingNews)
+        .options(defer(models.TrendingNews.article, raiseload=True))
+        .order_by(models.TrendingNews.fetched_at.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+# Multi-statement operations run the sync implementation on the async connection
+async def get_trending_articles(db: AsyncSession, news_ids: list[int]) -> dict[int, str]:
+    return await db.run_sync(crud.get_trending_articles, news_ids)
+
+async def get_trending_article_by_link(db: AsyncSession, link: str):
+    return await db.run_sync(crud.get_trending_article_by_link, link)
+
+async def bulk_upsert_trending_news(db: AsyncSession, items: list[dict], update_existing: bool = True) -> dict:
+    """
+    Store a crawl in one transaction. Returns inserted / updated / unchanged counts.
+    """
+    return await db.run_sync(crud.bulk_upsert_trending_news, items, update_existing)
+
+async def compact_trending_news(db: AsyncSession, max_age_seconds: float, max_rows: int) -> dict:
+    return await db.run_sync(crud.compact_trending_news, max_age_seconds, max_rows)
+
+# --- Article Cache Functions ---
+async def get_cached_article(db: AsyncSession, url: str):
+    result = await db.execute(select(models.ArticleCache).where(models.ArticleCache.url == url))
+    return result.scalars().first()
+
+async def upsert_cached_article(db: AsyncSession, url: str, content: str, etag: str = None, last_modified: str = None):
+    # Sync implementation: it also reindexes the article in news_fts
+    return await db.run_sync(crud.upsert_cached_article, url, content, etag, last_modified)
+
+async def touch_cached_article(db: AsyncSession, url: str, etag: str = None, last_modified: str = None):
+    # Sync implementation: it also refreshes fetched_at in news_fts
+    return await db.run_sync(crud.touch_cached_article, url, etag, last_modified)
+
+async def prune_article_cache(db: AsyncSession, max_age_seconds: float, max_rows: int) -> dict:
+    return await db.run_sync(crud.prune_article_cache, max_age_seconds, max_rows)
+
+# --- News Full-Text Search (FTS5) ---
+async def ensure_news_fts(db: AsyncSession) -> bool:
+    return await db.run_sync(crud.ensure_news_fts)
+
+async def news_fts_ready(db: AsyncSession) -> bool:
+    return await db.run_sync(crud.news_fts_ready)
+
+async def search_news(db: AsyncSession, match: str, since: datetime = None, until: datetime = None,
+                      limit: int = 20, offset: int = 0, highlight: tuple[str, str] = ("<mark>", "</mark>")):
+    return await db.run_sync(crud.search_news, match, since, until, limit, offset, highlight)
+
+# --- LLM Summary Cache Functions ---
+async def get_cached_summary(db: AsyncSession, prompt_hash: str, max_age_seconds: float):
+    oldest = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    result = await db.execute(select(models.SummaryCache).where(
+        models.SummaryCache.prompt_hash == prompt_hash,
+        models.SummaryCache.created_at >= oldest,
+    ))
+    return result.scalars().first()
+
+async def store_cached_summary(db: AsyncSession, prompt_hash: str, summary: str, max_age_seconds: float):
+    await db.merge(models.SummaryCache(prompt_hash=prompt_hash, summary=summary, created_at=datetime.utcnow()))
+    # Expired rows are never served again, drop them while we're here
+    oldest = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    await db.execute(delete(models.SummaryCache).where(models.SummaryCache.created_at < oldest))
+    try:
+        await db.commit()
+    except Exception:
+        await db.rollback()
+
+# --- Background Job Leases ---
+async def acquire_job_lease(db: AsyncSession, name: str, owner: str, lease_seconds: float) -> bool:
+    """
+    Take (or renew) the lease for a background job. Returns False while
+    another worker holds an unexpired lease.
+    """
+    now = datetime.utcnow()
+    locked_until = now + timedelta(seconds=lease_seconds)
+    result = await db.execute(select(models.JobLease).where(models.JobLease.name == name))
+    if result.scalars().first() is None:
+        db.add(models.JobLease(name=name, owner=owner, locked_until=locked_until))
+        try:
+            await db.commit()
+            return True
+        except IntegrityError:
+            await db.rollback()  # another worker inserted it first
+            return False
+    result = await db.execute(
+        update(models.JobLease)
+        .where(
+            models.JobLease.name == name,
+            or_(models.JobLease.locked_until < now, models.JobLease.owner == owner),
+        )
+        .values(owner=owner, locked_until=locked_until)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+async def release_job_lease(db: AsyncSession, name: str, owner: str):
+    await db.execute(
+        update(models.JobLease)
+        .where(models.JobLease.name == name, models.JobLease.owner == owner)
+        .values(locked_until=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
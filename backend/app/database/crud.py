@@ -1,7 +1,18 @@
-from sqlalchemy.orm import Session
+import hashlib
+import os
+import zlib
+from sqlalchemy import or_, select, update, delete, text, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, defer
 from . import models
 from passlib.context import CryptContext
-from datetime import datetime
+from datetime import datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -12,8 +23,7 @@ def get_user_by_username(db: Session, username: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, username: str, email: str, password: str):
-    hashed_password = pwd_context.hash(password)
+def create_user(db: Session, username: str, email: str, hashed_password: str):
     db_user = models.User(
         username=username,
         email=email,
@@ -33,21 +43,454 @@ def create_trending_news(db: Session, headline: str, link: str, snippet: str, ar
         headline=headline,
         link=link,
         snippet=snippet,
-        article=article,
         fetched_at=datetime.utcnow()
     )
     db.add(db_news)
     try:
+        db.flush()
+        if article:
+            db.add(new_article_body(db_news.id, article))
+        index_news(db, [trending_fts_row(db_news.id, headline, snippet, article, link, db_news.fetched_at)])
         db.commit()
         db.refresh(db_news)
         return db_news
     except Exception as e:
         db.rollback()
-        # Optionally handle duplicate link error here
+        # Usually a duplicate link
+        print(f"Trending news insert failed for {link}: {str(e)}")
         return None
 
 def get_trending_news_by_link(db: Session, link: str):
     return db.query(models.TrendingNews).filter(models.TrendingNews.link == link).first()
 
 def get_latest_trending_news(db: Session, limit: int = 10):
-    return db.query(models.TrendingNews).order_by(models.TrendingNews.fetched_at.desc()).limit(limit).all()
+    """Headline listing; article text is not loaded (see get_trending_articles)."""
+    return db.query(models.TrendingNews).options(
+        defer(models.TrendingNews.article, raiseload=True)
+    ).order_by(models.TrendingNews.fetched_at.desc()).limit(limit).all()
+
+# --- Trending News Bodies ---
+TRENDING_BODY_CODEC = os.getenv("TRENDING_BODY_CODEC", "zlib")  # zlib, zstd (if installed) or none
+# Keeps each IN (...) lookup well under SQLite's bound-parameter limit
+BULK_LINK_CHUNK = 500
+
+def _chunks(values: list, size: int = BULK_LINK_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def encode_article(text: str, codec: str = None) -> tuple[str, bytes]:
+    codec = codec or TRENDING_BODY_CODEC
+    data = text.encode("utf-8")
+    if codec == "zstd" and zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=6).compress(data)
+    if codec in ("zlib", "zstd"):
+        return "zlib", zlib.compress(data, 6)
+    return "none", data
+
+def decode_article(codec: str, body: bytes) -> str:
+    if codec == "zlib":
+        body = zlib.decompress(body)
+    elif codec == "zstd":
+        body = zstandard.ZstdDecompressor().decompress(body)
+    return body.decode("utf-8")
+
+def article_digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def new_article_body(news_id: int, text: str) -> models.TrendingNewsBody:
+    codec, body = encode_article(text)
+    return models.TrendingNewsBody(news_id=news_id, codec=codec, body=body, digest=article_digest(text))
+
+def body_upsert_statement():
+    body = models.TrendingNewsBody
+    stmt = sqlite_insert(body)
+    return stmt.on_conflict_do_update(
+        index_elements=[body.news_id],
+        set_={"codec": stmt.excluded.codec, "body": stmt.excluded.body, "digest": stmt.excluded.digest},
+    )
+
+def get_trending_articles(db: Session, news_ids: list[int]) -> dict[int, str]:
+    """
+    Article text for trending_news ids, from trending_news_bodies or, for
+    rows compaction hasn't moved yet, the inline column.
+    """
+    news, body = models.TrendingNews, models.TrendingNewsBody
+    articles = {}
+    for chunk in _chunks(list(news_ids)):
+        for news_id, codec, data in db.execute(
+            select(body.news_id, body.codec, body.body).where(body.news_id.in_(chunk))
+        ):
+            articles[news_id] = decode_article(codec, data)
+        missing = [news_id for news_id in chunk if news_id not in articles]
+        if missing:
+            articles.update(db.execute(
+                select(news.id, news.article).where(news.id.in_(missing), news.article.is_not(None))
+            ).all())
+    return articles
+
+def get_trending_article_by_link(db: Session, link: str):
+    """(article text, fetched_at) for a stored trending link, or None."""
+    row = db.execute(
+        select(models.TrendingNews.id, models.TrendingNews.fetched_at).where(models.TrendingNews.link == link)
+    ).first()
+    if row is None:
+        return None
+    article = get_trending_articles(db, [row.id]).get(row.id)
+    return (article, row.fetched_at) if article else None
+
+# --- Bulk Trending News Ingestion ---
+
+def dedupe_trending_rows(items: list[dict]) -> list[dict]:
+    """
+    One trending_news row per link (the last occurrence wins).
+    """
+    now = datetime.utcnow()
+    rows = {}
+    for item in items:
+        link = item.get("link")
+        if not link:
+            continue
+        rows[link] = {
+            "headline": item.get("headline") or "",
+            "link": link,
+            "snippet": item.get("snippet") or "",
+            "article": item.get("article") or "",  # popped into trending_news_bodies
+            "fetched_at": now,
+        }
+    return list(rows.values())
+
+def trending_upsert_statement(update_existing: bool = True):
+    """
+    INSERT ... ON CONFLICT(link) for a batch of headline rows. Existing
+    links are only rewritten when their headline or snippet changed;
+    RETURNING yields (id, link) per row actually inserted or updated.
+    """
+    news = models.TrendingNews
+    stmt = sqlite_insert(news)
+    if update_existing:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[news.link],
+            set_={
+                "headline": stmt.excluded.headline,
+                "snippet": stmt.excluded.snippet,
+                "fetched_at": stmt.excluded.fetched_at,
+            },
+            where=or_(
+                news.headline.is_distinct_from(stmt.excluded.headline),
+                news.snippet.is_distinct_from(stmt.excluded.snippet),
+            ),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[news.link])
+    return stmt.returning(news.id, news.link)
+
+def bulk_upsert_trending_news(db: Session, items: list[dict], update_existing: bool = True) -> dict:
+    """
+    Store a crawl in one transaction. Returns inserted / updated / unchanged counts.
+    """
+    news, body = models.TrendingNews, models.TrendingNewsBody
+    rows = dedupe_trending_rows(items)
+    if not rows:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    articles = {row["link"]: row.pop("article") for row in rows}
+    now = rows[0]["fetched_at"]
+    try:
+        ids = {}
+        for chunk in _chunks(list(articles)):
+            ids.update(db.execute(select(news.link, news.id).where(news.link.in_(chunk))).all())
+        existing = set(ids)
+        changed = set()
+        for news_id, link in db.execute(trending_upsert_statement(update_existing), rows):
+            ids[link] = news_id
+            if link in existing:
+                changed.add(link)
+
+        # Article bodies: compare digests so unchanged text is never recompressed
+        stored_digests = {}
+        for chunk in _chunks([ids[link] for link in existing]):
+            stored_digests.update(db.execute(
+                select(body.news_id, body.digest).where(body.news_id.in_(chunk))
+            ).all())
+        bodies = []
+        for link, article in articles.items():
+            if not article or (link in existing and not update_existing):
+                continue
+            digest = article_digest(article)
+            if stored_digests.get(ids[link]) == digest:
+                continue
+            codec, data = encode_article(article)
+            bodies.append({"news_id": ids[link], "codec": codec, "body": data, "digest": digest})
+            if link in existing:
+                changed.add(link)
+        if bodies:
+            db.execute(body_upsert_statement(), bodies)
+        # A changed body counts as a fresh fetch too (and retires any inline copy)
+        for chunk in _chunks([ids[link] for link in changed]):
+            db.execute(
+                update(news).where(news.id.in_(chunk)).values(fetched_at=now, article=None)
+                .execution_options(synchronize_session=False)
+            )
+        index_news(db, [
+            trending_fts_row(ids[row["link"]], row["headline"], row["snippet"], articles[row["link"]], row["link"], now)
+            for row in rows
+            if row["link"] not in existing or row["link"] in changed
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    inserted = len(rows) - len(existing)
+    return {"inserted": inserted, "updated": len(changed), "unchanged": len(existing) - len(changed)}
+
+# --- Trending News Retention ---
+def compact_trending_news(db: Session, max_age_seconds: float, max_rows: int, migrate_batch: int = 500) -> dict:
+    """
+    Apply the retention policy: drop rows older than max_age_seconds, then
+    all but the newest max_rows, then their bodies. Also moves up to
+    migrate_batch inline articles (rows stored before the bodies table)
+    into trending_news_bodies. SQLite reuses the freed pages, so the file
+    stops growing once the table is at its cap.
+    """
+    news, body = models.TrendingNews, models.TrendingNewsBody
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    try:
+        expired = db.execute(
+            delete(news).where(news.fetched_at < cutoff).execution_options(synchronize_session=False)
+        ).rowcount
+        newest = select(news.id).order_by(news.fetched_at.desc()).limit(max_rows)
+        over_limit = db.execute(
+            delete(news).where(news.id.not_in(newest)).execution_options(synchronize_session=False)
+        ).rowcount
+        orphans = db.execute(
+            delete(body).where(body.news_id.not_in(select(news.id))).execution_options(synchronize_session=False)
+        ).rowcount
+        if news_fts_ready(db):
+            db.execute(text("DELETE FROM news_fts WHERE rowid > 0 AND rowid NOT IN (SELECT id FROM trending_news)"))
+
+        legacy = db.execute(
+            select(news.id, news.article).where(news.article.is_not(None)).limit(migrate_batch)
+        ).all()
+        bodies = []
+        for news_id, article in legacy:
+            if article:
+                codec, data = encode_article(article)
+                bodies.append({"news_id": news_id, "codec": codec, "body": data, "digest": article_digest(article)})
+        if bodies:
+            db.execute(body_upsert_statement(), bodies)
+        if legacy:
+            db.execute(
+                update(news).where(news.id.in_([news_id for news_id, _ in legacy])).values(article=None)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"expired": expired, "over_limit": over_limit, "orphan_bodies": orphans, "migrated_inline": len(legacy)}
+
+# --- Article Cache Functions ---
+def get_cached_article(db: Session, url: str):
+    return db.query(models.ArticleCache).filter(models.ArticleCache.url == url).first()
+
+def upsert_cached_article(db: Session, url: str, content: str, etag: str = None, last_modified: str = None):
+    cached = get_cached_article(db, url)
+    if cached is None:
+        cached = models.ArticleCache(url=url)
+        db.add(cached)
+    cached.content = content
+    cached.etag = etag
+    cached.last_modified = last_modified
+    cached.fetched_at = datetime.utcnow()
+    try:
+        db.flush()
+        index_news(db, [{
+            "rowid": -cached.id, "headline": "", "snippet": "", "body": content,
+            "link": url, "source": "article", "fetched_at": fts_timestamp(cached.fetched_at),
+        }])
+        db.commit()
+        return cached
+    except Exception:
+        db.rollback()
+        return None
+
+def touch_cached_article(db: Session, url: str, etag: str = None, last_modified: str = None):
+    """Mark a cached article as revalidated (304) without rewriting its content."""
+    cached = get_cached_article(db, url)
+    if cached is None:
+        return None
+    cached.fetched_at = datetime.utcnow()
+    if etag:
+        cached.etag = etag
+    if last_modified:
+        cached.last_modified = last_modified
+    if news_fts_ready(db):
+        # Keep the index's date filter in step with the revalidation
+        db.execute(
+            text("UPDATE news_fts SET fetched_at = :fetched_at WHERE rowid = :rowid"),
+            {"fetched_at": fts_timestamp(cached.fetched_at), "rowid": -cached.id},
+        )
+    db.commit()
+    return cached
+
+def prune_article_cache(db: Session, max_age_seconds: float, max_rows: int) -> dict:
+    """
+    Drop cached articles not fetched or revalidated within max_age_seconds,
+    then all but the max_rows most recently (re)validated ones, and their
+    news_fts entries. A stale article is revalidated on its next use, so
+    fetched_at doubles as the last-used time for the LRU cap.
+    """
+    cached = models.ArticleCache
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    try:
+        expired = db.execute(
+            delete(cached).where(cached.fetched_at < cutoff).execution_options(synchronize_session=False)
+        ).rowcount
+        newest = select(cached.id).order_by(cached.fetched_at.desc()).limit(max_rows)
+        over_limit = db.execute(
+            delete(cached).where(cached.id.not_in(newest)).execution_options(synchronize_session=False)
+        ).rowcount
+        if (expired or over_limit) and news_fts_ready(db):
+            db.execute(text("DELETE FROM news_fts WHERE rowid < 0 AND -rowid NOT IN (SELECT id FROM article_cache)"))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"expired": expired, "over_limit": over_limit}
+
+# --- News Full-Text Search (FTS5) ---
+# One index over trending news (rowid = trending_news.id) and the article
+# cache (rowid = -article_cache.id), written in the same transaction as the
+# rows it mirrors. Headlines weigh most in BM25, then snippets, then bodies.
+NEWS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE news_fts USING fts5("
+    "headline, snippet, body, link UNINDEXED, source UNINDEXED, fetched_at UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+NEWS_FTS_RANK = "bm25(10.0, 4.0, 1.0)"
+
+# Engines on which news_fts is known to exist. Checked lazily per engine, so
+# scripts, benchmarks and workers that never ran ensure_news_fts() keep the
+# index in step too; a missing table (SQLite without FTS5) is rechecked.
+_news_fts_engines = set()
+
+def news_fts_ready(db: Session) -> bool:
+    bind = db.get_bind()
+    engine = getattr(bind, "engine", bind)
+    if engine in _news_fts_engines:
+        return True
+    if db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'news_fts'")).first() is None:
+        return False
+    _news_fts_engines.add(engine)
+    return True
+
+def fts_timestamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+def trending_fts_row(news_id: int, headline: str, snippet: str, article: str, link: str, fetched_at: datetime) -> dict:
+    return {
+        "rowid": news_id, "headline": headline or "", "snippet": snippet or "", "body": article or "",
+        "link": link, "source": "trending", "fetched_at": fts_timestamp(fetched_at),
+    }
+
+def index_news(db: Session, rows: list[dict]):
+    """(Re)index rows in news_fts; an existing entry with the same rowid is replaced."""
+    if not rows or not news_fts_ready(db):
+        return
+    delete_rows = text("DELETE FROM news_fts WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True))
+    for chunk in _chunks([row["rowid"] for row in rows]):
+        db.execute(delete_rows, {"ids": chunk})
+    db.execute(text(
+        "INSERT INTO news_fts (rowid, headline, snippet, body, link, source, fetched_at) "
+        "VALUES (:rowid, :headline, :snippet, :body, :link, :source, :fetched_at)"
+    ), rows)
+
+def ensure_news_fts(db: Session) -> bool:
+    """
+    Create news_fts on first start and backfill it from the stored news.
+    Returns False when this SQLite build has no FTS5.
+    """
+    if news_fts_ready(db):
+        return True
+    try:
+        db.execute(text(NEWS_FTS_DDL))
+        db.execute(text("INSERT INTO news_fts (news_fts, rank) VALUES ('rank', :rank)"), {"rank": NEWS_FTS_RANK})
+    except OperationalError as e:
+        db.rollback()
+        # Another worker won the CREATE race; it does the backfill
+        if "already exists" in str(e) or news_fts_ready(db):
+            return True
+        print(f"News search disabled: {str(e)}")
+        return False
+    news = models.TrendingNews
+    listing = db.execute(select(news.id, news.headline, news.snippet, news.link, news.fetched_at)).all()
+    for chunk in _chunks(listing):
+        articles = get_trending_articles(db, [row.id for row in chunk])
+        index_news(db, [
+            trending_fts_row(row.id, row.headline, row.snippet, articles.get(row.id), row.link, row.fetched_at)
+            for row in chunk
+        ])
+    cached = models.ArticleCache
+    for row in db.execute(select(cached.id, cached.url, cached.content, cached.fetched_at)):
+        index_news(db, [{
+            "rowid": -row.id, "headline": "", "snippet": "", "body": row.content,
+            "link": row.url, "source": "article", "fetched_at": fts_timestamp(row.fetched_at),
+        }])
+    db.commit()
+    return True
+
+def search_news(
+    db: Session,
+    match: str,
+    since: datetime = None,
+    until: datetime = None,
+    limit: int = 20,
+    offset: int = 0,
+    highlight: tuple[str, str] = ("<mark>", "</mark>"),
+) -> tuple[int, list[dict]]:
+    """
+    BM25-ranked matches for an FTS5 query, one result per link (a story
+    stored both as trending news and in the article cache appears once).
+    Returns (total distinct links, page of results).
+    """
+    where = "news_fts MATCH :match"
+    params = {"match": match}
+    if since:
+        where += " AND fetched_at >= :since"
+        params["since"] = fts_timestamp(since)
+    if until:
+        where += " AND fetched_at <= :until"
+        params["until"] = fts_timestamp(until)
+    ranked = (
+        "SELECT rowid, score, row_number() OVER (PARTITION BY link ORDER BY score) AS nth "
+        f"FROM (SELECT rowid, link, rank AS score FROM news_fts WHERE {where})"
+    )
+    total = db.execute(text(f"SELECT count(*) FROM ({ranked}) WHERE nth = 1"), params).scalar()
+    page = db.execute(
+        text(f"SELECT rowid, score FROM ({ranked}) WHERE nth = 1 ORDER BY score LIMIT :limit OFFSET :offset"),
+        {**params, "limit": limit, "offset": offset},
+    ).all()
+    if not page:
+        return total, []
+
+    # Snippets only for the rows on this page
+    details = db.execute(
+        text(
+            "SELECT rowid, highlight(news_fts, 0, :open, :close) AS headline, "
+            "snippet(news_fts, -1, :open, :close, '…', 24) AS snippet, link, source, fetched_at "
+            "FROM news_fts WHERE news_fts MATCH :match AND rowid IN :ids"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"match": match, "open": highlight[0], "close": highlight[1], "ids": [row.rowid for row in page]},
+    ).mappings().all()
+    by_rowid = {row["rowid"]: row for row in details}
+    results = []
+    for row in page:
+        hit = by_rowid[row.rowid]
+        results.append({
+            "headline": hit["headline"] or None,
+            "snippet": hit["snippet"],
+            "link": hit["link"],
+            "source": hit["source"],
+            "fetched_at": hit["fetched_at"],
+            "score": float(f"{-row.score:.4g}"),  # higher is better
+        })
+    return total, results
@@ -1,15 +1,53 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, create_engine
+import os
+from sqlalchemy import Column, Integer, String, DateTime, Text, LargeBinary, ForeignKey, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./stock_gist.db"
+# Same file through aiosqlite, for request handlers and background jobs
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./stock_gist.db"
+
+# --- SQLite tuning ---
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))  # per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+# How long a writer waits for the lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "8"))
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers run alongside the single writer; synchronous=NORMAL is
+    durable across app crashes in WAL mode and skips an fsync per commit.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
 )
+event.listen(engine, "connect", _set_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+)
+event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+# expire_on_commit=False: rows stay readable after commit without another await
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 class User(Base):
@@ -28,11 +66,51 @@ class TrendingNews(Base):
     headline = Column(String, nullable=False)
     link = Column(String, unique=True, index=True, nullable=False)
     snippet = Column(Text)
+    # Only rows from before trending_news_bodies existed; moved out by compaction
     article = Column(Text)
-    fetched_at = Column(DateTime, default=datetime.utcnow)
+    fetched_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class TrendingNewsBody(Base):
+    """
+    Article text for a trending_news row, kept apart so listing headlines
+    never reads it.
+    """
+    __tablename__ = "trending_news_bodies"
+
+    news_id = Column(Integer, ForeignKey("trending_news.id"), primary_key=True)
+    codec = Column(String, nullable=False)  # zlib, zstd or none
+    body = Column(LargeBinary, nullable=False)
+    digest = Column(String, nullable=False)  # sha1 of the text, so unchanged articles aren't rewritten
+
+class ArticleCache(Base):
+    __tablename__ = "article_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, unique=True, index=True, nullable=False)
+    content = Column(Text, nullable=False)
+    etag = Column(String)
+    last_modified = Column(String)
+    fetched_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class SummaryCache(Base):
+    __tablename__ = "summary_cache"
+
+    prompt_hash = Column(String, primary_key=True)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    locked_until = Column(DateTime, nullable=False)
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+# create_all doesn't add new indexes to tables that already exist
+for index in TrendingNews.__table__.indexes | ArticleCache.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
 
 def get_db():
     db = SessionLocal()
@@ -40,3 +118,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,12 +1,69 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.auth import auth_router
 from api.endpoints import api_router
 from api.search_symbol import sym_router
+from api.news_search import news_router
+from api.quote_history import history_router
+from api.indicators import indicators_router
+from api.screener import screener_router, screener_job, SCREENER_ENABLED
+from api.symbol_table import symbol_table
+from api.metrics import metrics_router, MetricsMiddleware, instrument_engine, METRICS_ENABLED, TRACING_ENABLED
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.scraper import router
+from api.scraper import router, trending_job, trending_compaction_job
+from api.http_client import http_client
+from api.parse_pool import parse_pool
+from database.models import engine, async_engine, AsyncSessionLocal
+from database.async_crud import ensure_news_fts
 
-app = FastAPI()
+TRENDING_SCHEDULER_ENABLED = os.getenv("TRENDING_SCHEDULER_ENABLED", "1") == "1"
+SYMBOLS_PRELOAD = os.getenv("SYMBOLS_PRELOAD", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP client for every scraper and Gemini call
+    await http_client.start()
+    # Worker pool for BeautifulSoup / article extraction
+    parse_pool.start()
+    # Build the symbol index up front instead of on the first search
+    if SYMBOLS_PRELOAD:
+        try:
+            await asyncio.to_thread(symbol_table.index)
+        except OSError as e:
+            print(f"Symbol table not loaded: {str(e)}")
+    # Full-text index over stored news (created and backfilled on first start)
+    async with AsyncSessionLocal() as db:
+        await ensure_news_fts(db)
+    # Trending news is crawled in the background, not inside user requests
+    if TRENDING_SCHEDULER_ENABLED:
+        trending_job.start()
+        trending_compaction_job.start()
+    # Market-wide quote crawl for /api/screener (off unless configured)
+    if SCREENER_ENABLED:
+        screener_job.start()
+    try:
+        yield
+    finally:
+        await trending_job.stop()
+        await trending_compaction_job.stop()
+        await screener_job.stop()
+        parse_pool.close()
+        await http_client.close()
+        await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Stage timings for every SQL statement (crud.py and async_crud.py)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+# Request latency metrics and the optional Server-Timing breakdown
+if METRICS_ENABLED or TRACING_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 origins = [
     "http://localhost:3000",  # React dev server
@@ -24,4 +81,9 @@ app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(api_router, prefix="/api", tags=["api"])
 app.include_router(router, prefix="/api", tags=["scraper"])
 app.include_router(sym_router)
+app.include_router(news_router)
+app.include_router(history_router)
+app.include_router(indicators_router)
+app.include_router(screener_router)
+app.include_router(metrics_router)
 
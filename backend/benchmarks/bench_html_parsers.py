@@ -0,0 +1,148 @@
+"""
+Per-page parse time of scrape_article_clean's extraction for each HTML backend.
+
+Usage (from backend/):
+    python benchmarks/bench_html_parsers.py
+    python benchmarks/bench_html_parsers.py --corpus path/to/saved_news_html
+    python benchmarks/bench_html_parsers.py --synthetic 40
+
+--corpus points at a directory of saved news pages (*.html); the default is
+benchmarks/fixtures/news_html, small pages covering each extraction path
+(<article>, known content classes, the candidate-div fallback, text nodes
+with embedded newlines, boilerplate-only and too-short pages). --synthetic
+generates deeply nested, article-less pages instead, which stresses the
+candidate-div fallback.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from api.html_parser import available_backends, extract_article_text  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures" / "news_html"
+
+WORDS = (
+    "sensex nifty rally banks earnings quarter investors rupee inflation rbi policy "
+    "shares profit guidance outlook exports crude index volatility"
+).split()
+
+
+def is_probable_article(div):
+    text = div.get_text(separator='\n', strip=True)
+    # Heuristics: at least 3 paragraphs, at least 500 chars, no "footer"/"copyright"/"related"/"advertisement"/"comments"
+    if text.count('\n') < 3 or len(text) < 500:
+        return False
+    bad_keywords = ['copyright', 'footer', 'related', 'advertisement', 'comments']
+    return not any(bad in text.lower() for bad in bad_keywords)
+
+
+def legacy_extract(html: str) -> str:
+    """
+    The pre-refactor scrape_article_clean() extraction, verbatim (minus the
+    fetch): html.parser + get_text() on every div.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(['aside', 'footer', 'nav', 'form', 'script', 'style', 'header', 'noscript']):
+        tag.decompose()
+    article = soup.find('article')
+    if article:
+        text = article.get_text(separator='\n', strip=True)
+    else:
+        candidates = []
+        common_classes = [
+            'article-content', 'story-body', 'main-content', 'content__article-body',
+            'entry-content', 'post-content', 'news-content', 'article__content',
+            'caas-body', 'caas-content', 'body__inner', 'story__content'
+        ]
+        for class_name in common_classes:
+            div = soup.find('div', class_=class_name)
+            if div:
+                candidates.append(div)
+        if not candidates:
+            divs = soup.find_all('div')
+            probable_divs = [d for d in divs if is_probable_article(d)]
+            if probable_divs:
+                main_content = max(probable_divs, key=lambda d: len(d.get_text(strip=True)))
+                text = main_content.get_text(separator='\n', strip=True)
+            else:
+                text = ""
+        else:
+            main_content = max(candidates, key=lambda d: len(d.get_text(strip=True)))
+            text = main_content.get_text(separator='\n', strip=True)
+    lines = [line for line in text.split('\n') if len(line.strip()) > 20]
+    return '\n'.join(lines[:50]) if lines else "No article content found."
+
+
+def synthetic_page(rng: random.Random, depth: int = 14, paragraphs: int = 60) -> str:
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+    body = "".join(f"<p>{sentence()} {sentence()}</p>" for _ in range(paragraphs))
+    for level in range(depth):
+        body = f"<div class='wrap-{level}'><span>{sentence()}</span>{body}</div>"
+    chrome = "<nav><a href='/'>Home</a></nav><script>var x = 1;</script>"
+    footer = "<div class='foot'><p>Related stories</p><p>Copyright 2025</p></div>"
+    return f"<html><head><title>t</title></head><body>{chrome}{body}{footer}</body></html>"
+
+
+def load_corpus(args) -> list[str]:
+    if args.synthetic:
+        rng = random.Random(42)
+        return [synthetic_page(rng) for _ in range(args.synthetic)]
+    files = sorted(Path(args.corpus).glob("*.htm*"))
+    return [f.read_text(encoding="utf-8", errors="replace") for f in files]
+
+
+def bench(name, func, pages, repeat):
+    timings = []
+    outputs = []
+    for html in pages:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = func(html)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best * 1000)
+        outputs.append(out)
+    return timings, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=str(FIXTURES), help="directory of saved news HTML pages")
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark this many synthetic pages instead")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args)
+    if not pages:
+        sys.exit("No pages found in corpus")
+    print(f"{len(pages)} pages, avg {statistics.mean(len(p) for p in pages) / 1024:.1f} KiB\n")
+
+    baseline_ms, reference = bench("legacy", legacy_extract, pages, args.repeat)
+    rows = [("legacy (html.parser)", baseline_ms, len(pages))]
+    for backend in available_backends():
+        ms, outputs = bench(backend, lambda h, b=backend: extract_article_text(h, backend=b), pages, args.repeat)
+        matches = sum(1 for a, b in zip(outputs, reference) if a == b)
+        rows.append((backend, ms, matches))
+
+    print(f"{'backend':<22}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}{'speedup':>10}{'same text':>11}")
+    base = statistics.mean(baseline_ms)
+    for name, ms, matches in rows:
+        mean = statistics.mean(ms)
+        print(
+            f"{name:<22}{mean:>10.2f}{statistics.median(ms):>10.2f}{max(ms):>10.2f}"
+            f"{base / mean:>9.1f}x{matches:>7}/{len(pages)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
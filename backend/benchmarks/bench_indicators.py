@@ -0,0 +1,100 @@
+"""
+Technical indicators over a year of daily bars: one symbol at a time vs one
+batched pass, and a full recomputation vs an incremental push of a new bar.
+
+Usage (from backend/):
+    python benchmarks/bench_indicators.py
+    python benchmarks/bench_indicators.py --symbols 2000 --bars 252 --store
+
+--store also writes the bars as quote snapshots into a temporary quote
+history and times IndicatorEngine.latest() cold (full pass) and warm (only
+today's bar applied to the cached state).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import numpy as np  # noqa: E402
+
+from api.indicators import IndicatorEngine, IndicatorState, compute_indicators  # noqa: E402
+from api.quote_history import QuoteHistoryStore  # noqa: E402
+from api.quote_model import Quote  # noqa: E402
+
+
+def random_walk(rng, symbols: int, bars: int):
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, (symbols, bars)), axis=1))
+    spread = np.abs(rng.normal(0, 0.01, (symbols, bars))) * close
+    return close, close + spread, close - spread
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_store(args, rng):
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+    close, _, _ = random_walk(rng, args.symbols, args.bars)
+    now = int(time.time())
+    first_day = now - args.bars * 86400
+    with tempfile.TemporaryDirectory() as tmp:
+        store = QuoteHistoryStore(tmp, retention_months=0)
+        start = time.perf_counter()
+        for row, symbol in enumerate(symbols):
+            for day in range(args.bars):
+                store.append(Quote(symbol=symbol, price=float(close[row, day])), first_day + day * 86400)
+        write_s = time.perf_counter() - start
+        print(f"\nstore: wrote {args.symbols * args.bars} snapshots in {write_s:.1f}s")
+        engine = IndicatorEngine(store)
+        start = time.perf_counter()
+        engine.latest(symbols, now)
+        cold = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        engine.latest(symbols, now)
+        warm = (time.perf_counter() - start) * 1000
+        print(f"engine.latest cold (read bars + batched pass) {cold:>9.1f} ms")
+        print(f"engine.latest warm (read bars + today's bar)  {warm:>9.1f} ms")
+        print(f"engine stats: {engine.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--bars", type=int, default=252, help="daily bars per symbol")
+    parser.add_argument("--store", action="store_true", help="also benchmark through the quote history store")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    close, high, low = random_walk(rng, args.symbols, args.bars)
+    print(f"{args.symbols} symbols x {args.bars} daily bars")
+
+    per_symbol = timed(lambda: [compute_indicators(close[i], high[i], low[i]) for i in range(args.symbols)], repeat=1)
+    batched = timed(lambda: compute_indicators(close, high, low))
+    print(f"{'one symbol at a time':<32}{per_symbol:>10.1f} ms")
+    print(f"{'one batched pass':<32}{batched:>10.1f} ms  ({per_symbol / batched:.0f}x)")
+
+    state = IndicatorState.from_bars(close[:, :-1], high[:, :-1], low[:, :-1])
+    full = timed(lambda: IndicatorState.from_bars(close, high, low).latest())
+    incremental = timed(lambda: state.copy().push(close[:, -1], high[:, -1], low[:, -1]).latest())
+    print(f"{'new bar: full recompute':<32}{full:>10.1f} ms")
+    print(f"{'new bar: incremental push':<32}{incremental:>10.1f} ms  ({full / incremental:.0f}x)")
+
+    # Same answers either way
+    expected = IndicatorState.from_bars(close, high, low).latest()
+    pushed = state.copy().push(close[:, -1], high[:, -1], low[:, -1]).latest()
+    assert all(np.allclose(expected[k], pushed[k], equal_nan=True) for k in expected)
+
+    if args.store:
+        bench_store(args, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Screener over a synthetic NSE-sized universe: query latency on the columnar
+table, its memory footprint, and crawl throughput under the rate limit.
+
+Usage (from backend/):
+    python benchmarks/bench_screener.py
+    python benchmarks/bench_screener.py --symbols 2000 --latency-ms 250 --concurrency 8 --rate 20
+
+The crawl uses a simulated fetch (sleep for --latency-ms, then a random
+quote) so it measures the crawler, not Google Finance.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import numpy as np  # noqa: E402
+
+from api.quote_model import Quote  # noqa: E402
+from api.screener import ScreenerTable, crawl, parse_conditions  # noqa: E402
+
+QUERIES = [
+    ("pe_ratio < 15 and dividend_yield > 2", "-market_cap"),
+    ("market_cap > 1000000000000", "pe_ratio"),
+    ("pos_52w < 0.2 and avg_volume > 1000000", "-change_pct"),
+    ("", "-market_cap"),
+]
+
+
+def random_quote(rng, symbol: str) -> Quote:
+    price = float(rng.lognormal(6, 1))
+    low, high = price * rng.uniform(0.5, 1.0), price * rng.uniform(1.0, 1.6)
+    return Quote(
+        symbol=symbol,
+        price=price,
+        previous_close=price * rng.uniform(0.95, 1.05),
+        day_low=price * 0.98,
+        day_high=price * 1.02,
+        year_low=low,
+        year_high=high,
+        market_cap=int(rng.lognormal(24, 2)),
+        avg_volume=int(rng.lognormal(13, 1.5)),
+        pe_ratio=float(rng.uniform(3, 80)) if rng.random() > 0.1 else None,
+        dividend_yield=float(rng.exponential(1.2)) if rng.random() > 0.3 else None,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=250, help="simulated quote page latency")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20, help="requests per second")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+    tracemalloc.start()
+    table = ScreenerTable(symbols, [f"COMPANY {i} LIMITED" for i in range(args.symbols)])
+    for symbol in symbols:
+        table.update(random_quote(rng, symbol))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{args.symbols} symbols: columns {table.nbytes / 1024:.0f} KiB, peak while building {peak / 1024:.0f} KiB")
+
+    print(f"\n{'query':<42}{'sort':<14}{'matches':>8}{'p50 ms':>9}{'p99 ms':>9}")
+    for where, sort in QUERIES:
+        conditions = parse_conditions(where)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            total, _ = table.query(conditions, sort.lstrip("-"), sort.startswith("-"), 0, 50)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{where or '(all)':<42}{sort:<14}{total:>8}{statistics.median(timings):>9.3f}{p99:>9.3f}")
+
+    async def fetch(symbol):
+        await asyncio.sleep(args.latency_ms / 1000)
+        return random_quote(rng, symbol)
+
+    crawl_table = ScreenerTable(symbols, [""] * args.symbols)
+    stats = asyncio.run(crawl(symbols, fetch, lambda s, q: crawl_table.update(q), args.concurrency, args.rate))
+    ceiling = min(args.rate, args.concurrency / (args.latency_ms / 1000))
+    print(
+        f"\ncrawl: {stats['fetched']} quotes in {stats['seconds']}s = {stats['symbols_per_second']}/s "
+        f"(ceiling min(rate, concurrency/latency) = {ceiling:.1f}/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
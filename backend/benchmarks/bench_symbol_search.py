@@ -0,0 +1,104 @@
+"""
+Autocomplete latency: the old full fuzzy scan vs the SymbolIndex.
+
+Usage (from backend/):
+    python benchmarks/bench_symbol_search.py --csv Symbols_NSE_India.csv
+    python benchmarks/bench_symbol_search.py --synthetic 2500
+
+Queries replay keystroke prefixes of random company names (what the
+debounced frontend sends), plus a few misspellings.
+"""
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from rapidfuzz import fuzz, process  # noqa: E402
+
+from api.symbol_index import SymbolIndex  # noqa: E402
+
+PARTS = (
+    "TATA RELIANCE ADANI BAJAJ HERO MAHINDRA INFOSYS WIPRO HDFC ICICI AXIS KOTAK BHARAT "
+    "HINDUSTAN INDIAN NATIONAL SUN DR LARSEN ASIAN ULTRA GRASIM JSW VEDANTA COAL POWER "
+    "STEEL MOTORS CEMENT PAINTS PHARMA BANK FINANCE CHEMICALS TEXTILES ENERGY FOODS INFRA "
+    "TECHNOLOGIES INDUSTRIES AGRO CAPITAL HOLDINGS SYSTEMS"
+).split()
+
+
+def load_pairs(args) -> list[tuple[str, str]]:
+    if args.csv:
+        with open(args.csv, newline="", encoding="utf-8") as f:
+            return [(row[0].strip().upper(), row[1].strip().upper()) for row in csv.reader(f) if len(row) >= 2]
+    rng = random.Random(7)
+    pairs = set()
+    while len(pairs) < args.synthetic:
+        words = rng.sample(PARTS, rng.randint(2, 4))
+        name = " ".join(words) + rng.choice([" LIMITED", " LTD", " INDIA LIMITED"])
+        symbol = "".join(w[:rng.randint(2, 5)] for w in words)[:10]
+        pairs.add((symbol, name))
+    return sorted(pairs)
+
+
+def make_queries(pairs, n, rng):
+    queries = []
+    for symbol, name in rng.sample(pairs, n):
+        target = rng.choice([name, symbol])
+        for end in range(1, min(len(target), 12) + 1):
+            queries.append(target[:end])
+        if len(name) > 6:
+            i = rng.randrange(1, len(name) - 1)
+            queries.append(name[:i] + name[i + 1:])  # dropped letter
+    return queries
+
+
+def legacy_search(company_dict, query):
+    query = query.strip().upper()
+    matches = process.extract(query, company_dict.keys(), scorer=fuzz.partial_ratio, limit=10)
+    return [{"name": name, "symbol": company_dict[name]} for name, score, _ in matches if score >= 70]
+
+
+def time_queries(func, queries):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        func(q)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{label:<28}{statistics.mean(timings):>10.3f}{statistics.median(timings):>10.3f}{p99:>10.3f}{timings[-1]:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="NSE symbol CSV (symbol, name, ...)")
+    parser.add_argument("--synthetic", type=int, default=2500)
+    parser.add_argument("--names", type=int, default=100, help="company names to type out")
+    args = parser.parse_args()
+
+    pairs = load_pairs(args)
+    rng = random.Random(11)
+    queries = make_queries(pairs, min(args.names, len(pairs)), rng)
+
+    start = time.perf_counter()
+    index = SymbolIndex(pairs)
+    build_ms = (time.perf_counter() - start) * 1000
+    company_dict = {name: symbol for symbol, name in pairs}
+    print(f"{len(index)} symbols, {len(queries)} queries, index built in {build_ms:.1f} ms\n")
+
+    print(f"{'':<28}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    report("legacy full fuzzy scan", time_queries(lambda q: legacy_search(company_dict, q), queries))
+    report("index (cold)", time_queries(index.search, queries))
+    report("index (repeat, cached)", time_queries(index.search, queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Trending news ingestion: per-row check-then-insert vs one bulk upsert.
+
+Usage (from backend/):
+    python benchmarks/bench_trending_ingest.py
+    python benchmarks/bench_trending_ingest.py --sizes 50 500 5000 --article-kb 4
+
+Each size is ingested twice into a fresh temporary database: first into an
+empty table, then again with half the links already present (the usual
+case for a crawl every 30 minutes).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import crud, models  # noqa: E402
+
+WORDS = (
+    "sensex nifty rally banks earnings quarter investors rupee inflation rbi policy "
+    "shares profit guidance outlook exports crude index volatility"
+).split()
+
+
+def make_items(rng: random.Random, start: int, count: int, article_kb: int) -> list[dict]:
+    def text(n_words):
+        return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+    return [
+        {
+            "headline": text(10),
+            "link": f"https://news.example.com/markets/{i}",
+            "snippet": text(30),
+            "article": text(article_kb * 1024 // 7),
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def legacy_ingest(db, items: list[dict]) -> int:
+    """The pre-refactor loop: one lookup plus one commit per article."""
+    stored = 0
+    for item in items:
+        if not crud.get_trending_news_by_link(db, item["link"]):
+            crud.create_trending_news(
+                db=db,
+                headline=item["headline"],
+                link=item["link"],
+                snippet=item["snippet"] or "",
+                article=item["article"] or "",
+            )
+            stored += 1
+    return stored
+
+
+def bulk_ingest(db, items: list[dict]) -> int:
+    return crud.bulk_upsert_trending_news(db, items)["inserted"]
+
+
+def run(ingest, size: int, article_kb: int) -> tuple[float, float, int]:
+    rng = random.Random(size)
+    first = make_items(rng, 0, size, article_kb)
+    second = make_items(rng, size // 2, size, article_kb)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        event.listen(engine, "connect", models._set_sqlite_pragmas)
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine, autoflush=False)()
+        try:
+            start = time.perf_counter()
+            ingest(db, first)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            stored = ingest(db, second)
+            warm = time.perf_counter() - start
+        finally:
+            db.close()
+            engine.dispose()
+    return cold * 1000, warm * 1000, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--article-kb", type=int, default=4, help="approximate article body size")
+    args = parser.parse_args()
+
+    print(f"{'rows':>6}  {'path':<10}{'empty ms':>11}{'half-dup ms':>13}{'new rows':>10}{'speedup':>9}")
+    for size in args.sizes:
+        legacy_cold, legacy_warm, legacy_new = run(legacy_ingest, size, args.article_kb)
+        bulk_cold, bulk_warm, bulk_new = run(bulk_ingest, size, args.article_kb)
+        print(f"{size:>6}  {'legacy':<10}{legacy_cold:>11.1f}{legacy_warm:>13.1f}{legacy_new:>10}")
+        print(
+            f"{size:>6}  {'bulk':<10}{bulk_cold:>11.1f}{bulk_warm:>13.1f}{bulk_new:>10}"
+            f"{(legacy_cold + legacy_warm) / (bulk_cold + bulk_warm):>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+trending_news over months of ingestion: database size and headline listing
+latency, with and without the retention/compaction job.
+
+Usage (from backend/):
+    python benchmarks/bench_trending_retention.py
+    python benchmarks/bench_trending_retention.py --days 120 --crawls-per-day 48 --max-rows 5000
+
+Each simulated day runs the crawls through bulk_upsert_trending_news, then
+ages every row by one day; compaction runs once a day like the job would.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import crud, models  # noqa: E402
+
+WORDS = (
+    "sensex nifty rally banks earnings quarter investors rupee inflation rbi policy "
+    "shares profit guidance outlook exports crude index volatility"
+).split()
+
+
+def listing_ms(db, repeat: int = 50) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        crud.get_latest_trending_news(db, limit=20)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.expunge_all()
+    return statistics.median(timings)
+
+
+def simulate(args, retention: bool):
+    rng = random.Random(3)
+    next_link = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/bench.db"
+        engine = create_engine(f"sqlite:///{path}")
+        event.listen(engine, "connect", models._set_sqlite_pragmas)
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine, autoflush=False)()
+        rows = []
+        try:
+            for day in range(1, args.days + 1):
+                for _ in range(args.crawls_per_day):
+                    items = []
+                    for _ in range(args.items):
+                        if rng.random() < args.new_ratio or next_link == 0:
+                            link, next_link = next_link, next_link + 1
+                        else:
+                            link = rng.randrange(max(0, next_link - args.items), next_link)
+                        items.append({
+                            "headline": f"headline {link}",
+                            "link": f"https://news.example.com/{link}",
+                            "snippet": " ".join(rng.choice(WORDS) for _ in range(30)),
+                            "article": " ".join(rng.choice(WORDS) for _ in range(args.article_kb * 1024 // 7)),
+                        })
+                    crud.bulk_upsert_trending_news(db, items)
+                db.execute(text("UPDATE trending_news SET fetched_at = datetime(fetched_at, '-1 day')"))
+                db.commit()
+                if retention:
+                    crud.compact_trending_news(db, args.retention_days * 86400, args.max_rows)
+                if day % args.report_every == 0:
+                    db.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+                    count = db.execute(text("SELECT count(*) FROM trending_news")).scalar()
+                    rows.append((day, count, os.path.getsize(path) / 2**20, listing_ms(db)))
+        finally:
+            db.close()
+            engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--crawls-per-day", type=int, default=48)
+    parser.add_argument("--items", type=int, default=20, help="articles per crawl")
+    parser.add_argument("--new-ratio", type=float, default=0.3, help="share of links not seen before")
+    parser.add_argument("--article-kb", type=int, default=4)
+    parser.add_argument("--retention-days", type=float, default=30)
+    parser.add_argument("--max-rows", type=int, default=5000)
+    parser.add_argument("--report-every", type=int, default=15)
+    args = parser.parse_args()
+
+    for retention in (False, True):
+        label = f"retention {args.retention_days:g} days / {args.max_rows} rows" if retention else "no retention"
+        print(f"\n{label}")
+        print(f"{'day':>5}{'rows':>9}{'db MiB':>10}{'list p50 ms':>14}")
+        for day, count, size, ms in simulate(args, retention):
+            print(f"{day:>5}{count:>9}{size:>10.1f}{ms:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
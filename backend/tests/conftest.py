@@ -0,0 +1,62 @@
+"""
+Unit tests for the backend (no network, no server; databases are SQLite
+files in a temporary directory).
+
+Run from backend/:
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+# Some modules open ./stock_gist.db and ./quote_history on import; keep those
+# out of the working tree
+os.chdir(tempfile.mkdtemp(prefix="stockgist-tests-"))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A fresh database file with the app's schema and pragmas."""
+    from database import models
+
+    path = tmp_path / "test.db"
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", models._set_sqlite_pragmas)
+    models.Base.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    from database import models
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    event.listen(engine, "connect", models._set_sqlite_pragmas)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def async_sessions(db_path):
+    """
+    AsyncSession factory on the test database. NullPool: every test drives
+    its own event loop with asyncio.run(), and pooled aiosqlite connections
+    would outlive it.
+    """
+    from database import models
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    event.listen(engine.sync_engine, "connect", models._set_sqlite_pragmas)
+    return async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
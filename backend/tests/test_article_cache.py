@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from api import scraper
+from api.fanout import DomainLatencyTracker
+from database import crud, models
+
+
+def add_articles(db, ages_in_days: dict[str, float]):
+    crud.ensure_news_fts(db)
+    for url, age in ages_in_days.items():
+        cached = crud.upsert_cached_article(db, url, f"Article body for {url} about quarterly results")
+        cached.fetched_at = datetime.utcnow() - timedelta(days=age)
+    db.commit()
+
+
+def cached_urls(db) -> set[str]:
+    return {row.url for row in db.query(models.ArticleCache)}
+
+
+def indexed_urls(db) -> set[str]:
+    return {row.link for row in db.execute(text("SELECT link FROM news_fts WHERE rowid < 0"))}
+
+
+def test_prune_drops_articles_past_retention_with_their_index_rows(db):
+    add_articles(db, {"https://a.example/1": 1, "https://a.example/2": 20, "https://a.example/3": 40})
+    counts = crud.prune_article_cache(db, max_age_seconds=14 * 86400, max_rows=100)
+    assert counts == {"expired": 2, "over_limit": 0}
+    assert cached_urls(db) == {"https://a.example/1"}
+    assert indexed_urls(db) == {"https://a.example/1"}
+
+
+def test_prune_keeps_the_most_recently_validated_rows(db):
+    add_articles(db, {f"https://a.example/{i}": i for i in range(5)})
+    # Revalidating an old article makes it recent again
+    crud.touch_cached_article(db, "https://a.example/4")
+    counts = crud.prune_article_cache(db, max_age_seconds=30 * 86400, max_rows=2)
+    assert counts == {"expired": 0, "over_limit": 3}
+    assert cached_urls(db) == {"https://a.example/0", "https://a.example/4"}
+    assert indexed_urls(db) == cached_urls(db)
+
+
+# --- scrape_article_clean ---
+URL = "https://a.example/story"
+PAGE = "<article>" + "".join(f"<p>Paragraph {n} of a story about quarterly results.</p>" for n in range(5)) + "</article>"
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code, self.text, self.headers = status_code, text, headers or {}
+
+
+@pytest.fixture
+def publisher(async_sessions, monkeypatch):
+    """Serves queued responses to scrape_article_clean and records the request headers."""
+    requests, responses = [], []
+
+    async def hedged_get(url, headers=None, timeout=None):
+        requests.append(dict(headers))
+        return responses.pop(0)
+
+    monkeypatch.setattr(scraper, "hedged_get", hedged_get)
+    monkeypatch.setattr(scraper, "AsyncSessionLocal", async_sessions)
+    monkeypatch.setattr(scraper, "latency_tracker", DomainLatencyTracker())
+    monkeypatch.setattr(scraper, "article_cache_stats", {"fresh_hits": 0, "revalidated": 0, "misses": 0})
+    return requests, responses
+
+
+def scrape(url=URL) -> str:
+    return asyncio.run(scraper.scrape_article_clean(url))
+
+
+def test_fresh_copies_skip_the_fetch_and_stale_ones_are_revalidated(publisher, monkeypatch, db):
+    requests, responses = publisher
+    responses.append(FakeResponse(200, PAGE, {"etag": '"v1"', "last-modified": "Mon, 05 Oct 2026 10:00:00 GMT"}))
+    article = scrape()
+    assert article.startswith("Paragraph 0")
+    assert scrape() == article
+    assert len(requests) == 1 and "If-None-Match" not in requests[0]
+
+    monkeypatch.setattr(scraper, "ARTICLE_CACHE_TTL", 0)
+    responses.append(FakeResponse(304, headers={"etag": '"v1"'}))
+    assert scrape() == article
+    assert requests[1]["If-None-Match"] == '"v1"'
+    assert requests[1]["If-Modified-Since"] == "Mon, 05 Oct 2026 10:00:00 GMT"
+    assert scraper.article_cache_stats == {"fresh_hits": 1, "revalidated": 1, "misses": 1}
+    assert cached_urls(db) == {URL}
+
+
+def test_changed_articles_replace_the_cached_copy(publisher, monkeypatch, db):
+    requests, responses = publisher
+    responses.append(FakeResponse(200, PAGE, {"etag": '"v1"'}))
+    scrape()
+    monkeypatch.setattr(scraper, "ARTICLE_CACHE_TTL", 0)
+    responses.append(FakeResponse(200, PAGE.replace("quarterly", "annual"), {"etag": '"v2"'}))
+    assert "annual" in scrape()
+    cached = crud.get_cached_article(db, URL)
+    assert cached.etag == '"v2"' and "annual" in cached.content
+
+
+def test_failed_extractions_are_not_cached(publisher, db):
+    requests, responses = publisher
+    responses.extend([FakeResponse(200, "<p>Access denied</p>"), FakeResponse(200, PAGE)])
+    assert scrape() == "No article content found."
+    assert scrape().startswith("Paragraph 0")
+    assert len(requests) == 2
+
+
+def test_text_saved_with_trending_news_counts_as_cached(publisher, db):
+    requests, _ = publisher
+    crud.create_trending_news(db, "Story", URL, "", "Paragraph text already stored by the trending crawl.")
+    assert scrape() == "Paragraph text already stored by the trending crawl."
+    assert requests == []
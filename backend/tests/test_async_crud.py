@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text, update
+from sqlalchemy.exc import InvalidRequestError
+
+from database import async_crud, models
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_connections_get_the_tuned_pragmas(async_sessions):
+    async def main():
+        async with async_sessions() as db:
+            return [
+                (await db.execute(text(f"PRAGMA {name}"))).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout")
+            ]
+
+    assert run(main()) == ["wal", 1, models.SQLITE_BUSY_TIMEOUT_MS]  # 1 = NORMAL
+
+
+def test_users(async_sessions):
+    async def main():
+        async with async_sessions() as db:
+            await async_crud.create_user(db, "asha", "asha@example.com", "hash")
+        async with async_sessions() as db:
+            by_name = await async_crud.get_user_by_username(db, "asha")
+            by_email = await async_crud.get_user_by_email(db, "asha@example.com")
+            missing = await async_crud.get_user_by_username(db, "ravi")
+        return by_name, by_email, missing
+
+    by_name, by_email, missing = run(main())
+    assert by_name.id == by_email.id and missing is None
+
+
+def test_trending_listing_never_loads_article_text(async_sessions):
+    async def main():
+        async with async_sessions() as db:
+            await async_crud.bulk_upsert_trending_news(db, [
+                {"link": f"https://n.example/{n}", "headline": f"Headline {n}", "article": f"Article {n}"}
+                for n in range(3)
+            ])
+            await db.execute(
+                update(models.TrendingNews).where(models.TrendingNews.link == "https://n.example/0")
+                .values(fetched_at=datetime.utcnow() + timedelta(minutes=1))
+            )
+            await db.commit()
+        async with async_sessions() as db:
+            latest = await async_crud.get_latest_trending_news(db, limit=2)
+            with pytest.raises(InvalidRequestError):
+                latest[0].article  # raiseload: a listing must not pull the text in
+            articles = await async_crud.get_trending_articles(db, [news.id for news in latest])
+        return latest, articles
+
+    latest, articles = run(main())
+    assert [news.headline for news in latest] == ["Headline 0", latest[1].headline]
+    assert articles[latest[0].id] == "Article 0"
+
+
+def test_summary_cache_expires_and_prunes_old_rows(async_sessions):
+    async def main():
+        async with async_sessions() as db:
+            await async_crud.store_cached_summary(db, "old", "Old answer", max_age_seconds=3600)
+            await db.execute(
+                update(models.SummaryCache).where(models.SummaryCache.prompt_hash == "old")
+                .values(created_at=datetime.utcnow() - timedelta(hours=2))
+            )
+            await db.commit()
+            assert await async_crud.get_cached_summary(db, "old", 3600) is None
+            await async_crud.store_cached_summary(db, "new", "New answer", max_age_seconds=3600)
+            fresh = await async_crud.get_cached_summary(db, "new", 3600)
+            remaining = (await db.execute(text("SELECT prompt_hash FROM summary_cache"))).scalars().all()
+        return fresh, remaining
+
+    fresh, remaining = run(main())
+    assert fresh.summary == "New answer"
+    assert remaining == ["new"]
+
+
+def test_readers_and_a_writer_run_concurrently(async_sessions):
+    async def write():
+        async with async_sessions() as db:
+            return await async_crud.bulk_upsert_trending_news(db, [
+                {"link": f"https://n.example/{n}", "headline": f"Headline {n}"} for n in range(200)
+            ])
+
+    async def read():
+        async with async_sessions() as db:
+            return len(await async_crud.get_latest_trending_news(db, limit=500))
+
+    async def main():
+        return await asyncio.gather(write(), *(read() for _ in range(4)))
+
+    counts, *reads = run(main())
+    assert counts["inserted"] == 200
+    assert all(n in (0, 200) for n in reads)  # each reader sees a consistent snapshot
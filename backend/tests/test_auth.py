@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from api import auth
+from api.auth import UserCreate, authenticate_user, create_access_token, get_current_user, register
+from api.cache import TTLCache
+from database import async_crud
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def fresh_auth(monkeypatch):
+    # What is under test is where hashing runs and the user cache, not bcrypt
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(schemes=["sha256_crypt"], sha256_crypt__rounds=1000))
+    monkeypatch.setattr(auth, "user_cache", TTLCache(maxsize=16, ttl=60))
+
+
+async def call(sessions, func, *args, **kwargs):
+    async with sessions() as db:
+        return await func(*args, db=db, **kwargs)
+
+
+def register_user(sessions, username="asha", password="s3cret"):
+    run(call(sessions, register, UserCreate(username=username, email=f"{username}@example.com", password=password)))
+
+
+def test_register_and_authenticate(async_sessions):
+    register_user(async_sessions)
+    user = run(call(async_sessions, authenticate_user, username="asha", password="s3cret"))
+    assert user.username == "asha" and user.hashed_password != "s3cret"
+    assert run(call(async_sessions, authenticate_user, username="asha", password="wrong")) is False
+    assert run(call(async_sessions, authenticate_user, username="nobody", password="s3cret")) is False
+    with pytest.raises(HTTPException) as exc:
+        register_user(async_sessions)
+    assert exc.value.detail == "Username already registered"
+
+
+def test_hashing_runs_on_the_bcrypt_pool(async_sessions, monkeypatch):
+    threads = []
+    verify = auth.verify_password
+
+    def recording_verify(plain, hashed):
+        threads.append(threading.current_thread().name)
+        return verify(plain, hashed)
+
+    monkeypatch.setattr(auth, "verify_password", recording_verify)
+    register_user(async_sessions)
+    assert run(call(async_sessions, authenticate_user, username="asha", password="s3cret"))
+    assert len(threads) == 1 and threads[0].startswith("bcrypt")
+
+
+def test_token_resolution_is_cached(async_sessions, monkeypatch):
+    register_user(async_sessions)
+    lookups = []
+    get_user = async_crud.get_user_by_username
+
+    async def counting_get_user(db, username):
+        lookups.append(username)
+        return await get_user(db, username)
+
+    monkeypatch.setattr(auth.crud, "get_user_by_username", counting_get_user)
+    token = create_access_token({"sub": "asha"}, timedelta(minutes=5))
+    first = run(call(async_sessions, get_current_user, token=token))
+    second = run(call(async_sessions, get_current_user, token=token))
+    assert first.username == second.username == "asha"
+    assert lookups == ["asha"]
+    # The cached row was detached from its session and is still readable
+    assert second.email == "asha@example.com"
+
+    auth.invalidate_cached_user("asha")
+    run(call(async_sessions, get_current_user, token=token))
+    assert lookups == ["asha", "asha"]
+
+
+@pytest.mark.parametrize("claims, expires", [
+    ({"sub": "ghost"}, timedelta(minutes=5)),  # no such user
+    ({"role": "x"}, timedelta(minutes=5)),  # no subject
+    ({"sub": "asha"}, timedelta(minutes=-1)),  # expired
+])
+def test_bad_tokens_are_rejected(async_sessions, claims, expires):
+    register_user(async_sessions)
+    with pytest.raises(HTTPException) as exc:
+        run(call(async_sessions, get_current_user, token=create_access_token(claims, expires)))
+    assert exc.value.status_code == 401
+    assert auth.user_cache.lookup("ghost") is None
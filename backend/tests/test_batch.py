@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from api import scraper
+from api.extractors import QuotePage
+from api.quote_model import Quote
+from api.scraper import BatchSymbols, get_stock_data_batch
+from api.upstream import UpstreamNotFound
+
+
+@pytest.fixture
+def quotes(monkeypatch):
+    calls, in_flight, peak = [], [0], [0]
+
+    async def get_quote(symbol):
+        calls.append(symbol)
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01 if symbol != "SLOW" else 0.1)
+        in_flight[0] -= 1
+        if symbol == "GONE":
+            raise UpstreamNotFound("GONE is not listed on Google Finance")
+        price = float(len(symbol))
+        return QuotePage(stock_data={"price": f"₹{price}"}, quote=Quote(symbol, price=price))
+
+    monkeypatch.setattr(scraper, "get_quote", get_quote)
+    monkeypatch.setattr(scraper, "batch_quote_slots", asyncio.Semaphore(2))
+    return calls, peak
+
+
+def request(symbols, format="json") -> str:
+    async def main():
+        response = await get_stock_data_batch(BatchSymbols(symbols=symbols), format=format)
+        if format == "ndjson":
+            return "".join([chunk async for chunk in response.body_iterator])
+        return response.body.decode()
+
+    return asyncio.run(main())
+
+
+def test_json_results_and_errors_by_symbol(quotes):
+    calls, peak = quotes
+    body = json.loads(request(["tcs", "TCS ", "INFY", "GONE", "bad symbol!", "ITC", "SLOW"]))
+    assert body["requested"] == 6 and body["succeeded"] == 4
+    assert body["results"]["TCS"] == {"price": "₹3.0"}
+    assert body["errors"] == {"GONE": "GONE is not listed on Google Finance", "BAD SYMBOL!": "Invalid symbol"}
+    assert sorted(calls) == ["GONE", "INFY", "ITC", "SLOW", "TCS"]  # each symbol fetched once
+    assert peak[0] == 2
+
+
+def test_ndjson_streams_in_completion_order(quotes):
+    events = [json.loads(line) for line in request(["SLOW", "TCS", "GONE"], "ndjson").splitlines()]
+    assert [(e["event"], e["data"]["symbol"]) for e in events[:-1]] == [
+        ("result", "TCS"), ("error", "GONE"), ("result", "SLOW"),
+    ]
+    assert events[-1] == {"event": "done", "data": {"requested": 3, "succeeded": 2}}
+
+
+def test_columns_format(quotes):
+    body = json.loads(request(["TCS", "INFY"], "columns"))
+    assert body["results"]["symbol"] == ["TCS", "INFY"]
+    assert body["results"]["price"] == [3.0, 4.0]
+
+
+def test_watchlist_size_is_capped():
+    with pytest.raises(ValidationError):
+        BatchSymbols(symbols=[])
+    with pytest.raises(ValidationError):
+        BatchSymbols(symbols=[f"S{n}" for n in range(scraper.BATCH_MAX_SYMBOLS + 1)])
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from api.cache import TTLCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_get_set_and_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("api.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 10
+    assert cache.get("a") is None
+    assert "a" not in cache._data
+
+
+def test_callable_ttl_is_read_at_set_time(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("api.cache.time.monotonic", lambda: now[0])
+    ttl = [5.0]
+    cache = TTLCache(ttl=lambda: ttl[0])
+    ttl[0] = 30.0
+    cache.set("a", 1)
+    now[0] = 29.0
+    assert cache.get("a") == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl=60)
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load("k", load) for _ in range(5)))
+
+    assert run(main()) == ["value"] * 5
+    assert calls == 1
+    assert (cache.misses, cache.coalesced) == (1, 4)
+    assert cache.get("k") == "value"
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = TTLCache(ttl=60)
+
+    async def load():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load("k", load) for _ in range(3)), return_exceptions=True)
+
+    results = run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert cache.get("k") is None
+    assert not cache._inflight
+
+
+def test_leader_cancellation_does_not_fail_waiters():
+    cache = TTLCache(ttl=60)
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_load("k", load))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(cache.get_or_load("k", load)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+
+    # One waiter takes over the load; the others coalesce onto it
+    assert run(main()) == [2, 2, 2]
+    assert calls == 2
+
+
+def test_lookup_counts_hits_and_misses():
+    cache = TTLCache(ttl=60)
+    assert cache.lookup("a") is None
+    cache.set("a", 1)
+    assert cache.lookup("a") == 1
+    cache.get("a")  # plain get() is not counted
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
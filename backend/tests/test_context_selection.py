@@ -0,0 +1,69 @@
+from api.context_selection import (
+    RelevanceScorer,
+    estimate_tokens,
+    select_context,
+    split_passages,
+    truncate_to_tokens,
+)
+
+RELEVANT = "Tata Motors reported a 20% rise in quarterly profit as JLR margins improved sharply."
+FILLER = "The weather in Mumbai stayed pleasant through the weekend with light evening showers."
+
+
+def paragraphs(*texts) -> str:
+    return "\n\n".join(texts)
+
+
+def test_scorer_matches_ticker_and_name_without_suffixes():
+    scorer = RelevanceScorer("TATAMOTORS", "Tata Motors Ltd")
+    assert scorer.name_phrase == "tata motors"
+    assert scorer.score(RELEVANT) > scorer.score(FILLER)
+    assert scorer.score("TATAMOTORS shares") > scorer.score("shares")
+    # Filler words are not name terms: "Coal India" is about coal, not India
+    assert RelevanceScorer("COALINDIA", "Coal India Limited").name_terms == {"coal"}
+
+
+def test_split_keeps_real_paragraphs_or_falls_back_to_one_passage():
+    passages = split_passages(paragraphs(RELEVANT, "short", FILLER), doc=3)
+    assert [(p.doc, p.position) for p in passages] == [(3, 0), (3, 2)]
+    assert [p.text for p in split_passages("- up 2%\n- volume high", 0)] == ["- up 2% - volume high"]
+
+
+def test_truncate_cuts_at_a_word_boundary():
+    text = "word " * 100
+    cut = truncate_to_tokens(text, 10)
+    assert cut.endswith("…") and len(cut) <= 40
+    assert truncate_to_tokens("short", 10) == "short"
+
+
+def test_relevant_paragraphs_win_and_reading_order_is_kept():
+    article = paragraphs(FILLER, RELEVANT, FILLER.replace("Mumbai", "Delhi"))
+    selection = select_context([article], [], "TATAMOTORS", "Tata Motors Ltd", budget=30)
+    assert selection.articles == [RELEVANT]
+    assert selection.tokens_used <= 30
+    assert selection.dropped["over_budget"] >= 1
+
+
+def test_near_duplicates_are_dropped():
+    echo = RELEVANT.replace("sharply", "sharply, analysts said")
+    selection = select_context([RELEVANT, echo], [], "TATAMOTORS", "Tata Motors Ltd", budget=500)
+    assert len(selection.articles) == 1
+    assert selection.dropped["duplicates"] == 1
+
+
+def test_stored_news_is_capped_at_its_share():
+    stored = [{"headline": f"Tata Motors order win {n}", "snippet": RELEVANT, "link": f"https://n.example/{n}"}
+              for n in range(10)]
+    selection = select_context([FILLER], stored, "TATAMOTORS", "Tata Motors Ltd", budget=200)
+    stored_tokens = sum(p.tokens for p in selection.included if p.source == "stored")
+    assert 0 < stored_tokens <= 200 * 0.25
+    assert selection.articles == [FILLER]
+    assert selection.debug_view()["included"][-1]["source"] == "stored"
+
+
+def test_an_oversized_article_is_truncated_not_dropped():
+    long_article = " ".join([RELEVANT] * 40)
+    selection = select_context([long_article], [], "TATAMOTORS", "Tata Motors Ltd", budget=50)
+    assert len(selection.articles) == 1 and selection.articles[0].endswith("…")
+    assert estimate_tokens(selection.articles[0]) <= 50
+    assert selection.dropped["truncated"] == 1
@@ -0,0 +1,62 @@
+from api.extractors import extract_quote_page, is_blocked_page, parse_google_finance_data, parse_yahoo_news
+
+
+def summary_row(label, value):
+    return f'<div class="gyFHrc"><div class="mfs7Fc">{label}</div><div class="P6K39c">{value}</div></div>'
+
+
+def news_item(headline, href):
+    return f'<div class="yY3Lee"><a href="{href}"><div class="Yfwt5">{headline}</div></a></div>'
+
+
+QUOTE_PAGE = (
+    "<html><head><title>Infosys Ltd (INFY) Stock Price &amp; News - Google Finance</title></head><body>"
+    '<div class="YMlKec fxKbKc">₹1,520.40</div>'
+    + summary_row("Previous close", "₹1,498.00")
+    + summary_row("Market cap", "6.31T INR")
+    + summary_row("P/E ratio", "24.10")
+    + summary_row("Dividend yield", "2.78%")
+    + news_item("Infosys wins deal", "./articles/1")
+    + news_item("Infosys Q2 preview", "/url?q=https://news.example/2")
+    + news_item("Sector outlook", "https://news.example/3")
+    + "</body></html>"
+)
+
+
+def test_one_parse_yields_metrics_numbers_and_news():
+    page = extract_quote_page(QUOTE_PAGE, news_limit=2, symbol="INFY")
+    assert page.status == "ok"
+    assert page.stock_data["price"] == "₹1,520.40"
+    assert page.stock_data["market_cap"] == "6.31T INR"
+    assert page.stock_data["revenue"] == "N/A"
+    assert page.quote.symbol == "INFY" and page.quote.price == 1520.40
+    assert page.news == [
+        {"headline": "Infosys wins deal", "link": "./articles/1"},
+        {"headline": "Infosys Q2 preview", "link": "https://www.google.com/url?q=https://news.example/2"},
+    ]
+    assert parse_google_finance_data(QUOTE_PAGE) == page.stock_data
+
+
+def test_pages_without_figures():
+    unknown = extract_quote_page("<html><head><title>Google Finance</title></head><body></body></html>")
+    assert unknown.status == "not_found" and unknown.news == []
+    changed = extract_quote_page("<html><head><title>Something else</title></head><body></body></html>")
+    assert changed.status == "unrecognized"
+    assert is_blocked_page("<p>Our systems have detected unusual traffic from your computer network.</p>")
+    assert not is_blocked_page(QUOTE_PAGE)
+
+
+def test_yahoo_results_unwrap_redirects_and_skip_ads():
+    redirect = "https://r.search.yahoo.com/_ylt=x/RV=2/RE=1/RO=10/RU=https%3a%2f%2fnews.example%2fstory/RK=2/RS=y"
+    html = (
+        "<ul>"
+        f'<li><h4 class="s-title"><a href="{redirect}">Nifty hits record</a></h4><p class="s-desc">Index up 1%</p></li>'
+        '<li><h4 class="s-title"><a href="https://direct.example/a">Direct link</a></h4></li>'
+        '<li class="ad-item"><h4 class="s-title"><a href="https://ads.example/">Sponsored</a></h4></li>'
+        "<li>Not a result</li>"
+        "</ul>"
+    )
+    assert parse_yahoo_news(html) == [
+        {"headline": "Nifty hits record", "link": "https://news.example/story", "snippet": "Index up 1%", "article": None},
+        {"headline": "Direct link", "link": "https://direct.example/a", "snippet": None, "article": None},
+    ]
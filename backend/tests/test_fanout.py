@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+
+from api import fanout
+from api.fanout import TIMED_OUT, DomainLatencyTracker, gather_with_deadline, hedged_get
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    monkeypatch.setattr(fanout, "fanout_stats", {"hedges_sent": 0, "hedges_won": 0, "timed_out": 0})
+    return fanout.fanout_stats
+
+
+# --- gather_with_deadline ---
+def test_deadline_returns_results_in_order_and_cancels_stragglers(stats):
+    cancelled = []
+
+    async def job(value, delay):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(value)
+            raise
+        return value
+
+    async def failing():
+        raise ValueError("boom")
+
+    results = run(gather_with_deadline([job("a", 0), job("slow", 5), failing(), job("b", 0.01)], deadline=0.2))
+    assert results == ["a", TIMED_OUT, "Error scraping article: boom", "b"]
+    assert cancelled == ["slow"]
+    assert stats["timed_out"] == 1
+
+
+def test_cancelling_the_caller_cancels_every_task(stats):
+    cancelled = []
+
+    async def job(value):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(value)
+            raise
+
+    async def main():
+        caller = asyncio.ensure_future(gather_with_deadline([job(1), job(2)], deadline=10))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)  # let the children see their cancellation
+        # Checked here: asyncio.run() cancels leftover tasks on the way out
+        assert sorted(cancelled) == [1, 2]
+
+    run(main())
+
+
+# --- hedged_get ---
+class FakeClient:
+    """Stands in for http_client: each get() takes the next (delay, result) in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def get(self, url, **kwargs):
+        delay, result = self.responses[self.calls]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(fanout, "latency_tracker", DomainLatencyTracker())
+    monkeypatch.setattr(fanout, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(fanout, "HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(fanout, "SLOW_DOMAIN_THRESHOLD", 0.05)  # hedge delay for unknown domains
+
+    def install(*responses):
+        fake = FakeClient(*responses)
+        monkeypatch.setattr(fanout, "http_client", fake)
+        return fake
+
+    return install
+
+
+def test_fast_primary_is_not_hedged(client, stats):
+    fake = client((0, "primary"))
+    assert run(hedged_get("https://news.example/a")) == "primary"
+    assert fake.calls == 1 and stats["hedges_sent"] == 0
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled(client, stats):
+    fake = client((5, "primary"), (0, "hedge"))
+    assert run(hedged_get("https://news.example/a")) == "hedge"
+    assert fake.calls == 2 and fake.cancelled == 1
+    assert stats == {"hedges_sent": 1, "hedges_won": 1, "timed_out": 0}
+
+
+def test_failed_hedge_waits_for_the_primary(client, stats):
+    fake = client((0.2, "primary"), (0, ConnectionError("reset")))
+    assert run(hedged_get("https://news.example/a")) == "primary"
+    assert fake.calls == 2 and stats["hedges_won"] == 0
+
+
+def test_both_failing_raises_the_primary_error(client):
+    client((0.1, ValueError("primary")), (0, ConnectionError("hedge")))
+    with pytest.raises(ValueError, match="primary"):
+        run(hedged_get("https://news.example/a"))
+
+
+def test_cancelling_the_caller_cancels_the_primary_before_the_hedge(client, stats):
+    fake = client((5, "primary"))
+
+    async def main():
+        caller = asyncio.ensure_future(hedged_get("https://news.example/a"))
+        await asyncio.sleep(0.01)  # inside the hedge delay
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        assert fake.cancelled == 1
+
+    run(main())
+    assert fake.calls == 1 and stats["hedges_sent"] == 0
+
+
+def test_guarded_hosts_are_never_hedged(client, monkeypatch):
+    fake = client((5, "direct"))
+    calls = []
+
+    async def guarded_get(url, **kwargs):
+        calls.append(url)
+        return "guarded"
+
+    monkeypatch.setattr(fanout, "guarded_get", guarded_get)
+    assert run(hedged_get("https://www.google.com/url?q=x")) == "guarded"
+    assert calls == ["https://www.google.com/url?q=x"] and fake.calls == 0
+
+
+# --- DomainLatencyTracker ---
+def test_slow_domains_get_the_reduced_budget_after_enough_samples():
+    tracker = DomainLatencyTracker()
+    url = "https://slow.example/story"
+    for _ in range(fanout.MIN_SAMPLES - 1):
+        tracker.record(url, 10.0)
+    assert tracker.budget(url) == fanout.ARTICLE_FETCH_BUDGET
+    tracker.record(url, 10.0, timed_out=True)
+    assert tracker.is_slow(url)
+    assert tracker.budget(url) == fanout.SLOW_DOMAIN_BUDGET
+    assert tracker.budget("https://fast.example/") == fanout.ARTICLE_FETCH_BUDGET
+    assert tracker.stats()["slow.example"]["timeouts"] == 1
+
+
+def test_hedge_delay_follows_the_domain_latency():
+    tracker = DomainLatencyTracker()
+    url = "https://news.example/a"
+    for _ in range(fanout.MIN_SAMPLES):
+        tracker.record(url, 2.0)
+    assert tracker.hedge_delay(url) == pytest.approx(2.0 * fanout.HEDGE_MULTIPLIER)
@@ -0,0 +1,49 @@
+import pytest
+
+from api.html_parser import available_backends, extract_article_text, resolve_backend
+
+PARAGRAPHS = [
+    "Shares of the company rose four percent in early trade on Monday.",
+    "The board approved an interim dividend of eight rupees per share.",
+    "Analysts expect margins to improve over the next two quarters.",
+    "Net profit for the quarter came in ahead of street estimates.",
+    "Management reiterated its full-year revenue growth guidance today.",
+    "The stock has gained nearly thirty percent over the past year.",
+    "Trading volumes were more than double the thirty-day average.",
+    "Foreign institutional investors raised their stake marginally.",
+]
+BODY = "".join(f"<p>{p}</p>" for p in PARAGRAPHS)
+CHROME = (
+    "<nav>Markets Home Portfolio Watchlist Screener Alerts</nav>"
+    "<script>var tracking = 'this line is long enough to be kept';</script>"
+)
+EXPECTED = "\n".join(PARAGRAPHS)
+
+PAGES = {
+    "article tag": f"<html><body>{CHROME}<article>{BODY}</article></body></html>",
+    "known class": f"<html><body>{CHROME}<div class='story-body'>{BODY}</div></body></html>",
+    "heuristic": (
+        f"<html><body>{CHROME}<div><div class='x'>{BODY}</div>"
+        f"<div>Related stories you may like: copyright notice and other long boilerplate</div></div></body></html>"
+    ),
+}
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("page", sorted(PAGES))
+def test_backends_extract_the_same_article(backend, page):
+    assert extract_article_text(PAGES[page], backend) == EXPECTED
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_pages_without_an_article(backend):
+    assert extract_article_text("<html><body><div>Too short</div></body></html>", backend) == "No article content found."
+    # A text block mentioning boilerplate words is not taken for the article
+    footer = "<div>" + "".join(f"<p>{p} Copyright reserved.</p>" for p in PARAGRAPHS) + "</div>"
+    assert extract_article_text(f"<html><body>{footer}</body></html>", backend) == "No article content found."
+
+
+def test_unknown_backend_falls_back_to_the_best_installed():
+    assert resolve_backend("auto") == available_backends()[0]
+    assert resolve_backend("no-such-parser") == available_backends()[0]
+    assert resolve_backend("html.parser") == "html.parser"
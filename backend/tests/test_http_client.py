@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from api import http_client as http_client_module
+from api.http_client import SharedHttpClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(float(self.path.rsplit("/", 1)[-1] or 0))
+        with server.lock:
+            server.active -= 1
+        body = self.headers.get("User-Agent", "").encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.lock, server.active, server.peak = threading.Lock(), 0, 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(http_client_module, "HTTP_ENABLE_HTTP2", False)
+    return SharedHttpClient()
+
+
+def test_sequential_requests_reuse_one_connection(server, client):
+    _, base = server
+
+    async def main():
+        try:
+            return [await client.get(f"{base}/0") for _ in range(3)], client.stats()
+        finally:
+            await client.close()
+
+    responses, stats = asyncio.run(main())
+    assert [r.text for r in responses] == ["Mozilla/5.0"] * 3  # started lazily with the default headers
+    assert stats["requests"] == 3 and stats["new_connections"] == 1
+    assert stats["reused_connections"] == 2 and stats["open_connections"] == 1
+
+
+def test_per_host_limit_caps_concurrency(server, client, monkeypatch):
+    monkeypatch.setattr(http_client_module, "HTTP_PER_HOST_LIMIT", 2)
+    httpd, base = server
+
+    async def main():
+        try:
+            await asyncio.gather(*(client.get(f"{base}/0.05") for _ in range(6)))
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+    assert httpd.peak == 2
+    assert client.stats()["in_flight"] == 0
+
+
+def test_errors_are_counted_and_streams_share_the_pool(server, client):
+    _, base = server
+
+    async def main():
+        try:
+            async with client.stream("GET", f"{base}/0", headers={"User-Agent": "stream"}) as response:
+                body = await response.aread()
+            with pytest.raises(httpx.ConnectError):
+                await client.get("http://127.0.0.1:1/")
+            return body
+        finally:
+            await client.close()
+
+    assert asyncio.run(main()) == b"stream"
+    assert client.requests == 2 and client.errors == 1
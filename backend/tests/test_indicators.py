@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from api.indicators import SMA_PERIODS, WINDOW, IndicatorEngine, IndicatorState, compute_indicators, stack_bars
+from api.quote_history import BAR_DTYPE, IST_OFFSET
+
+
+def random_bars(symbols: int, bars: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (symbols, bars)), axis=1))
+    high = close * (1 + rng.uniform(0, 0.02, close.shape))
+    low = close * (1 - rng.uniform(0, 0.02, close.shape))
+    return close, high, low
+
+
+def assert_same(left: dict, right: dict):
+    assert left.keys() == right.keys()
+    for name in left:
+        np.testing.assert_allclose(left[name], right[name], rtol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_push_matches_full_recompute():
+    close, high, low = random_bars(4, WINDOW + 60)
+    # Shorter histories are NaN-padded on the left
+    close[1, :-30] = high[1, :-30] = low[1, :-30] = np.nan
+    close[2, :-5] = high[2, :-5] = low[2, :-5] = np.nan
+
+    state = IndicatorState.from_bars(close[:, :-3], high[:, :-3], low[:, :-3])
+    for t in range(-3, 0):
+        state.push(close[:, t], high[:, t], low[:, t])
+    assert_same(state.latest(), compute_indicators(close, high, low))
+
+
+def test_push_leaves_nan_symbols_unchanged():
+    close, high, low = random_bars(3, 80)
+    state = IndicatorState.from_bars(close, high, low)
+    before = state.latest()
+    bar = np.array([101.0, np.nan, 99.0])
+    after = state.copy().push(bar, bar * 1.01, bar * 0.99).latest()
+    for name in before:
+        np.testing.assert_allclose(after[name][1], before[name][1], equal_nan=True, err_msg=name)
+    assert after["bars"].tolist() == [81, 80, 81]
+    assert after["close"][0] == 101.0
+    # copy() must not share arrays with the original
+    assert state.latest()["bars"].tolist() == [80, 80, 80]
+
+
+def test_simple_averages_and_52_week_range():
+    close, high, low = random_bars(2, WINDOW + 10)
+    values = compute_indicators(close, high, low)
+    for period in SMA_PERIODS:
+        np.testing.assert_allclose(values[f"sma_{period}"], close[:, -period:].mean(axis=1))
+    np.testing.assert_allclose(values["high_52w"], high[:, -WINDOW:].max(axis=1))
+    np.testing.assert_allclose(values["low_52w"], low[:, -WINDOW:].min(axis=1))
+    assert ((values["rsi_14"] >= 0) & (values["rsi_14"] <= 100)).all()
+
+
+def test_short_history_reports_nan_not_partial_windows():
+    close = np.linspace(10, 20, 25)
+    values = compute_indicators(close)
+    assert values["bars"][0] == 25
+    assert values["sma_20"][0] == pytest.approx(close[-20:].mean())
+    assert np.isnan(values["sma_50"][0]) and np.isnan(values["sma_200"][0])
+    assert np.isnan(values["macd_signal"][0])
+    # A steady rise has no losses
+    assert values["rsi_14"][0] == 100.0
+
+
+def test_stack_bars_right_aligns():
+    long = np.zeros(3, dtype=BAR_DTYPE)
+    long["close"] = long["high"] = long["low"] = [1.0, 2.0, 3.0]
+    short = np.zeros(1, dtype=BAR_DTYPE)
+    short["close"] = short["high"] = short["low"] = [5.0]
+    close, high, low = stack_bars([long, short, np.zeros(0, dtype=BAR_DTYPE)])
+    np.testing.assert_array_equal(close, [[1, 2, 3], [np.nan, np.nan, 5], [np.nan] * 3])
+    np.testing.assert_array_equal(high, close)
+
+
+# --- IndicatorEngine ---
+DAY = 86400
+TODAY = 20_000 * DAY - IST_OFFSET  # an IST midnight
+
+
+class BarStore:
+    """Stands in for quote_history: fixed daily bars per symbol."""
+
+    def __init__(self, bars: dict[str, np.ndarray]):
+        self.data = bars
+
+    def bars(self, symbol, start, end, interval):
+        bars = self.data.get(symbol, np.zeros(0, dtype=BAR_DTYPE))
+        return bars[(bars["ts"] >= start) & (bars["ts"] < end)]
+
+
+def daily_bars(closes, last_day: int) -> np.ndarray:
+    bars = np.zeros(len(closes), dtype=BAR_DTYPE)
+    bars["ts"] = last_day - DAY * np.arange(len(closes))[::-1]
+    bars["open"] = bars["close"] = bars["high"] = bars["low"] = closes
+    return bars
+
+
+def test_engine_keeps_an_earlier_last_bar_as_completed():
+    closes = np.linspace(100, 130, 30)
+    engine = IndicatorEngine(BarStore({"TCS": daily_bars(closes, TODAY - DAY)}))
+    for include_today in (False, True):
+        values = engine.latest(["TCS"], now=TODAY + 10 * 3600, include_today=include_today)["TCS"]
+        assert values["bars"] == 30
+        assert values["close"] == 130.0
+        assert values["sma_20"] == pytest.approx(closes[-20:].mean())
+
+
+def test_engine_pushes_todays_bar_only_onto_the_live_view():
+    closes = np.linspace(100, 130, 30)
+    store = BarStore({"TCS": daily_bars(closes, TODAY), "INFY": daily_bars(closes[:-1], TODAY - DAY)})
+    engine = IndicatorEngine(store)
+    now = TODAY + 10 * 3600
+    committed = engine.latest(["TCS", "INFY"], now=now, include_today=False)
+    live = engine.latest(["TCS", "INFY"], now=now)
+    assert engine.live_and_committed(["TCS", "INFY"], now=now) == (live, committed)
+    assert committed["TCS"]["bars"] == 29 and committed["TCS"]["close"] == pytest.approx(closes[-2])
+    assert live["TCS"]["bars"] == 30 and live["TCS"]["close"] == 130.0
+    # No bar today: the live view is the committed one
+    assert live["INFY"] == committed["INFY"]
+
+
+def test_engine_incremental_update_matches_full_recompute():
+    closes = 100 + np.sin(np.arange(80)) * 5
+    store = BarStore({"TCS": daily_bars(closes[:-3], TODAY - 3 * DAY)})
+    engine = IndicatorEngine(store)
+    engine.latest(["TCS"], now=TODAY - 3 * DAY + 10 * 3600)
+    store.data["TCS"] = daily_bars(closes, TODAY)
+    values = engine.latest(["TCS"], now=TODAY + 10 * 3600)["TCS"]
+    assert engine.incremental == 1
+    expected = IndicatorEngine(store).latest(["TCS"], now=TODAY + 10 * 3600)["TCS"]
+    assert values == expected
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from api import metrics
+from api.metrics import Counter, Histogram, MetricsMiddleware, metrics_router, stage
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(("fetch",), value)
+    assert histogram.render() == [
+        'stockgist_test_seconds_bucket{stage="fetch",le="0.1"} 1',
+        'stockgist_test_seconds_bucket{stage="fetch",le="1"} 3',
+        'stockgist_test_seconds_bucket{stage="fetch",le="+Inf"} 4',
+        'stockgist_test_seconds_sum{stage="fetch"} 4.25',
+        'stockgist_test_seconds_count{stage="fetch"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_total", "Test", ("route",))
+    counter.inc(('/a"b\\c',), 2)
+    assert counter.render() == ['stockgist_test_total{route="/a\\"b\\\\c"} 2']
+
+
+def stage_count(name: str) -> int:
+    series = metrics.stage_seconds.values.get((name,))
+    return sum(series[:-1]) if series else 0  # bucket counts; the last entry is the sum
+
+
+def test_stage_counts_errors_but_not_cancellation():
+    errors = metrics.stage_errors.values.get(("test_stage",), 0)
+    with stage("test_stage"):
+        pass
+    with pytest.raises(ValueError):
+        with stage("test_stage"):
+            raise ValueError("boom")
+    with pytest.raises(asyncio.CancelledError):
+        with stage("test_stage"):
+            raise asyncio.CancelledError()
+    assert stage_count("test_stage") == 3
+    assert metrics.stage_errors.values[("test_stage",)] == errors + 1
+    assert metrics.stage_in_flight.values[("test_stage",)] == 0
+
+
+def test_a_failing_collector_does_not_break_the_scrape(monkeypatch):
+    monkeypatch.setattr(metrics, "_collectors", [
+        lambda: 1 / 0,
+        lambda: [("queue_depth", "gauge", "Jobs queued", {"pool": "parse"}, 3)],
+    ])
+    text = metrics.render()
+    assert "# TYPE stockgist_queue_depth gauge" in text
+    assert 'stockgist_queue_depth{pool="parse"} 3' in text
+
+
+# --- Middleware and endpoint ---
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(metrics, "SERVER_TIMING_ENABLED", True)
+    monkeypatch.setattr(metrics, "TRACING_ENABLED", True)
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "secret")
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        with stage("test_lookup"):
+            await asyncio.sleep(0.01)
+        return {"id": item_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            yield "a"
+            await asyncio.sleep(0.05)
+            yield "b"
+        return StreamingResponse(body())
+
+    return TestClient(app)
+
+
+def requests_for(route: str, status: str) -> float:
+    return metrics.http_requests.values.get(("GET", route, status), 0)
+
+
+def test_requests_are_labelled_by_route_template_with_server_timing(client):
+    before = requests_for("/items/{item_id}", "200")
+    response = client.get("/items/7")
+    assert response.json() == {"id": 7}
+    assert response.headers["server-timing"].startswith('test_lookup;dur=')
+    assert 'desc="1x"' in response.headers["server-timing"]
+    assert requests_for("/items/{item_id}", "200") == before + 1
+    client.get("/items/not-a-number")
+    assert requests_for("/items/{item_id}", "422") >= 1
+
+
+def test_streamed_responses_are_timed_to_the_last_chunk(client):
+    series = metrics.http_seconds.values.get(("GET", "/stream"))
+    total_before = series[-1] if series else 0.0
+    response = client.get("/stream")
+    assert response.text == "ab" and "server-timing" not in response.headers
+    assert metrics.http_seconds.values[("GET", "/stream")][-1] - total_before >= 0.05
+
+
+def test_metrics_endpoint_requires_the_token(client):
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert "# TYPE stockgist_http_requests_total counter" in response.text
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from api.news_search import build_match_query
+from database import crud
+
+
+def add_news(db, link, headline, article="", snippet="", age_days=0):
+    news = crud.create_trending_news(db, headline, link, snippet, article)
+    news.fetched_at = datetime.utcnow() - timedelta(days=age_days)
+    db.commit()
+    crud.index_news(db, [crud.trending_fts_row(news.id, headline, snippet, article, link, news.fetched_at)])
+    db.commit()
+    return news
+
+
+def search(db, query, **kwargs):
+    return crud.search_news(db, build_match_query(query), **kwargs)
+
+
+def links(results) -> list[str]:
+    return [hit["link"] for hit in results]
+
+
+def test_ensure_backfills_news_stored_before_the_index_existed(db):
+    crud.create_trending_news(db, "Infosys wins large deal", "https://n.example/1", "", "Body about Infosys")
+    crud.upsert_cached_article(db, "https://n.example/2", "Cached story on Infosys margins")
+    assert crud.news_fts_ready(db) is False
+    assert crud.ensure_news_fts(db) is True
+    total, results = search(db, "infosys")
+    assert total == 2 and set(links(results)) == {"https://n.example/1", "https://n.example/2"}
+    # Second call is a no-op, not a second backfill
+    assert crud.ensure_news_fts(db) is True
+    assert search(db, "infosys")[0] == 2
+
+
+def test_headline_matches_rank_first_and_each_link_appears_once(db):
+    crud.ensure_news_fts(db)
+    add_news(db, "https://n.example/body", "Markets close flat", article="Tata Motors rose in late trade")
+    add_news(db, "https://n.example/head", "Tata Motors hits record", article="Shares rallied")
+    # The same story cached as an article
+    crud.upsert_cached_article(db, "https://n.example/head", "Tata Motors hits record high on EV sales")
+    total, results = search(db, "tata motors")
+    assert total == 2
+    assert links(results) == ["https://n.example/head", "https://n.example/body"]
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_date_window_and_paging(db):
+    crud.ensure_news_fts(db)
+    for age in (1, 5, 10, 20):
+        add_news(db, f"https://n.example/{age}", f"Reliance update day {age}", age_days=age)
+    now = datetime.utcnow()
+    total, results = search(db, "reliance", since=now - timedelta(days=12), until=now - timedelta(days=2))
+    assert total == 2 and set(links(results)) == {"https://n.example/5", "https://n.example/10"}
+    total, page = search(db, "reliance", limit=3, offset=3)
+    assert total == 4 and len(page) == 1
+    assert search(db, "reliance", offset=10) == (4, [])
+
+
+def test_highlight_markers(db):
+    crud.ensure_news_fts(db)
+    add_news(db, "https://n.example/1", "Wipro beats estimates", article="Wipro reported strong growth")
+    _, [hit] = search(db, "wipro")
+    assert hit["headline"] == "<mark>Wipro</mark> beats estimates"
+    assert "<mark>Wipro</mark>" in hit["snippet"]
+    _, [plain] = search(db, "wipro", highlight=("", ""))
+    assert plain["headline"] == "Wipro beats estimates"
+
+
+# --- build_match_query ---
+@pytest.mark.parametrize("query, mode, expression", [
+    ("tata motors", "all", '"tata" "motors"'),
+    ("tata motors", "any", '"tata" OR "motors"'),
+    ('M&M AND "NEAR"', "all", '"M&M" "AND" "NEAR"'),
+    ('say "hi', "all", '"say" "hi"'),
+    ('  " ', "all", None),
+])
+def test_build_match_query_quotes_every_term(query, mode, expression):
+    assert build_match_query(query, mode) == expression
+
+
+def test_query_syntax_words_are_searched_literally(db):
+    crud.ensure_news_fts(db)
+    add_news(db, "https://n.example/1", "M&M and Bajaj Auto report sales")
+    assert search(db, "M&M")[0] == 1
+    assert search(db, "NOT bajaj")[0] == 0  # "not" is a term, not an operator
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api import parse_pool as parse_pool_module
+from api.html_parser import extract_article_text
+from api.parse_pool import ParsePool
+
+ARTICLE = "<article>" + "".join(f"<p>Paragraph number {n} of the quarterly results story.</p>" for n in range(5)) + "</article>"
+
+
+def thread_name(_):
+    return threading.current_thread().name
+
+
+def slow(value):
+    time.sleep(0.05)
+    return value
+
+
+def fail():
+    raise ValueError("bad page")
+
+
+def start_pool(monkeypatch, kind, workers=2, max_pending=64) -> ParsePool:
+    monkeypatch.setattr(parse_pool_module, "PARSE_POOL_KIND", kind)
+    monkeypatch.setattr(parse_pool_module, "PARSE_POOL_WORKERS", workers)
+    monkeypatch.setattr(parse_pool_module, "PARSE_POOL_MAX_PENDING", max_pending)
+    pool = ParsePool()
+    pool.start()
+    return pool
+
+
+def test_without_a_pool_jobs_run_inline(monkeypatch):
+    pool = start_pool(monkeypatch, "inline")
+    assert asyncio.run(pool.run(thread_name, None)) == threading.current_thread().name
+    assert pool.stats()["kind"] == "inline" and pool.submitted == 0
+
+
+def test_process_pool_extracts_off_the_event_loop(monkeypatch):
+    async def main():
+        pool = start_pool(monkeypatch, "process")
+        try:
+            return await asyncio.gather(*(pool.run(extract_article_text, ARTICLE) for _ in range(4))), pool
+        finally:
+            pool.close()
+
+    results, pool = asyncio.run(main())
+    assert results == [extract_article_text(ARTICLE)] * 4
+    assert pool.stats()["completed"] == 4 and pool.kind == "inline"  # closed
+
+
+def test_pending_limit_queues_callers_and_failures_are_counted(monkeypatch):
+    async def main():
+        pool = start_pool(monkeypatch, "thread", workers=4, max_pending=1)
+        try:
+            jobs = [asyncio.ensure_future(pool.run(slow, n)) for n in range(3)]
+            await asyncio.sleep(0.01)
+            depth = (pool.pending, pool.waiting)
+            results = await asyncio.gather(*jobs)
+            with pytest.raises(ValueError):
+                await pool.run(fail)
+            return pool, depth, results
+        finally:
+            pool.close()
+
+    pool, depth, results = asyncio.run(main())
+    assert depth == (1, 2)
+    assert results == [0, 1, 2]
+    stats = pool.stats()
+    assert (stats["completed"], stats["failed"], stats["queue_depth"]) == (3, 1, 0)
+    assert stats["avg_backpressure_wait_ms"] > 0
+
+
+def test_a_cancelled_caller_keeps_its_slot_until_the_job_finishes(monkeypatch):
+    gate = threading.Event()
+
+    def blocked(value):
+        gate.wait(1)
+        return value
+
+    async def main():
+        pool = start_pool(monkeypatch, "thread", workers=2, max_pending=1)
+        try:
+            first = asyncio.ensure_future(pool.run(blocked, 1))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            second = asyncio.ensure_future(pool.run(slow, 2))
+            await asyncio.sleep(0.01)
+            # The cancelled job is still running, so the next caller waits
+            held = (pool.pending, pool.waiting, pool.submitted)
+            gate.set()
+            result = await second
+            await asyncio.sleep(0)
+            return held, result, pool, pool._slots.locked()
+        finally:
+            pool.close()
+
+    held, result, pool, locked = asyncio.run(main())
+    assert held == (1, 1, 1)
+    assert result == 2 and (pool.pending, pool.waiting) == (0, 0) and not locked
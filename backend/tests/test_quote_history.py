@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from api.quote_history import QuoteHistoryStore
+from api.quote_model import Quote
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def ist(day: str, clock: str = "12:00") -> int:
+    return int(datetime.fromisoformat(f"{day}T{clock}").replace(tzinfo=IST).timestamp())
+
+
+@pytest.fixture
+def store(tmp_path):
+    return QuoteHistoryStore(root=str(tmp_path), retention_months=0)
+
+
+def record(store, ts, price, previous_close=None):
+    store.append(Quote(symbol="TCS", price=price, previous_close=previous_close), ts=ts)
+
+
+def daily(store, start="2026-02-01", end="2026-05-01"):
+    bars = store.bars("TCS", ist(start, "00:00"), ist(end, "00:00"), "1d")
+    days = [datetime.fromtimestamp(ts, IST).strftime("%a %m-%d") for ts in bars["ts"].tolist()]
+    return days, bars
+
+
+def test_daily_bars_roll_up_each_session(store):
+    record(store, ist("2026-03-05", "10:00"), 100.0, 98.0)
+    record(store, ist("2026-03-05", "14:00"), 99.0, 98.0)
+    record(store, ist("2026-03-06", "11:00"), 103.0, 99.0)
+    days, bars = daily(store)
+    assert days == ["Thu 03-05", "Fri 03-06"]
+    assert bars["open"].tolist() == [100.0, 103.0]
+    assert bars["close"].tolist() == [99.0, 103.0]
+    assert bars["count"].tolist() == [2, 1]
+
+
+def test_weekend_lookups_fold_into_friday(store):
+    record(store, ist("2026-03-06", "10:00"), 100.0, 95.0)
+    record(store, ist("2026-03-06", "16:00"), 101.0, 95.0)  # settled close
+    record(store, ist("2026-03-07"), 101.0, 95.0)
+    record(store, ist("2026-03-08"), 101.0, 95.0)
+    record(store, ist("2026-03-09", "08:00"), 101.0, 95.0)  # pre-open
+    record(store, ist("2026-03-09", "10:00"), 103.0, 101.0)
+    days, bars = daily(store)
+    assert days == ["Fri 03-06", "Mon 03-09"]
+    assert bars["open"].tolist() == [100.0, 103.0]
+    assert bars["close"].tolist() == [101.0, 103.0]
+    assert bars["count"].tolist() == [5, 1]
+
+
+def test_holiday_lookups_fold_into_previous_session(store):
+    record(store, ist("2026-03-03", "11:00"), 50.0, 48.0)
+    record(store, ist("2026-03-04", "11:00"), 50.0, 48.0)  # holiday: page unchanged
+    record(store, ist("2026-03-05", "11:00"), 52.0, 50.0)
+    days, bars = daily(store)
+    assert days == ["Tue 03-03", "Thu 03-05"]
+    assert bars["count"].tolist() == [2, 1]
+
+
+def test_weekend_lookup_of_an_unseen_session_is_dated_friday(store):
+    record(store, ist("2026-03-05", "11:00"), 95.0, 90.0)
+    record(store, ist("2026-03-07"), 97.0, 95.0)  # shows Friday's session
+    days, bars = daily(store)
+    assert days == ["Thu 03-05", "Fri 03-06"]
+    assert bars["close"].tolist() == [95.0, 97.0]
+
+
+def test_weekend_without_previous_close_is_folded(store):
+    record(store, ist("2026-03-06", "11:00"), 10.0)
+    record(store, ist("2026-03-07"), 11.0)
+    record(store, ist("2026-03-09", "11:00"), 12.0)
+    days, bars = daily(store)
+    assert days == ["Fri 03-06", "Mon 03-09"]
+    assert bars["close"].tolist() == [11.0, 12.0]
+
+
+def test_session_overnight_snapshots_cross_month_files(store):
+    record(store, ist("2026-03-31", "10:00"), 20.0, 19.0)
+    record(store, ist("2026-04-01", "06:00"), 21.0, 19.0)  # 00:30 UTC: the April file
+    record(store, ist("2026-04-01", "10:00"), 22.0, 21.0)
+    days, bars = daily(store)
+    assert days == ["Tue 03-31", "Wed 04-01"]
+    assert bars["close"].tolist() == [21.0, 22.0]
+    assert bars["count"].tolist() == [2, 1]
+
+
+def test_leading_weekend_in_range_is_dropped(store):
+    record(store, ist("2026-03-06", "11:00"), 10.0, 9.0)
+    record(store, ist("2026-03-07"), 10.5, 9.0)
+    record(store, ist("2026-03-09", "11:00"), 12.0, 10.5)
+    days, _ = daily(store, start="2026-03-07")
+    assert days == ["Mon 03-09"]
+
+
+def test_minute_bars_keep_every_snapshot(store):
+    record(store, ist("2026-03-07", "12:00"), 10.0, 9.0)
+    record(store, ist("2026-03-07", "12:00") + 30, 11.0, 9.0)
+    bars = store.bars("TCS", ist("2026-03-07", "00:00"), ist("2026-03-08", "00:00"), "1m")
+    assert bars["count"].tolist() == [2]
+    assert (bars["open"][0], bars["close"][0]) == (10.0, 11.0)
@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+import pytest
+
+from api.quote_model import (
+    Quote,
+    parse_currency,
+    parse_decimal,
+    parse_float,
+    parse_range,
+    parse_scaled_int,
+    quotes_from_columns,
+    quotes_to_columns,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("₹2,945.10", Decimal("2945.10")),
+    ("$187.44", Decimal("187.44")),
+    ("−1.25%", Decimal("-1.25")),
+    ("21.36", Decimal("21.36")),
+    ("N/A", None),
+    ("-", None),
+    ("", None),
+    (None, None),
+    ("no digits", None),
+])
+def test_parse_decimal(text, expected):
+    assert parse_decimal(text) == expected
+
+
+def test_parse_float():
+    assert parse_float("0.52%") == 0.52
+    assert parse_float("—") is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("19.5T INR", 19_500_000_000_000),
+    ("2.3M", 2_300_000),
+    ("850K", 850_000),
+    ("1.2B USD", 1_200_000_000),
+    ("4.5L", 450_000),
+    ("12.5 Cr", 125_000_000),
+    ("1,234", 1234),
+    ("N/A", None),
+    (None, None),
+])
+def test_parse_scaled_int(text, expected):
+    assert parse_scaled_int(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("₹2,900.00 - ₹2,960.50", (2900.0, 2960.5)),
+    ("$120.5 – $130", (120.5, 130.0)),
+    ("-5.00 - -1.00", (-5.0, -1.0)),
+    ("2,900.00", (None, None)),
+    ("N/A", (None, None)),
+    (None, (None, None)),
+])
+def test_parse_range(text, expected):
+    assert parse_range(text) == expected
+
+
+def test_parse_currency_prefers_symbol_then_code():
+    assert parse_currency("₹2,945.10", "19.5T INR") == "INR"
+    assert parse_currency("2,945.10", "1.2B USD") == "USD"
+    assert parse_currency(None, "") is None
+
+
+def test_quote_from_display():
+    quote = Quote.from_display({
+        "price": "₹2,945.10",
+        "previous_close": "₹2,930.00",
+        "day_range": "₹2,900.00 - ₹2,960.50",
+        "year_range": "₹2,220.30 - ₹3,217.90",
+        "market_cap": "19.5T INR",
+        "avg_volume": "6.2M",
+        "pe_ratio": "28.41",
+        "dividend_yield": "0.34%",
+        "primary_exchange": "NSE",
+    }, symbol="RELIANCE")
+    assert quote.symbol == "RELIANCE"
+    assert (quote.price, quote.currency, quote.previous_close) == (2945.10, "INR", 2930.0)
+    assert (quote.day_low, quote.day_high) == (2900.0, 2960.5)
+    assert (quote.year_low, quote.year_high) == (2220.3, 3217.9)
+    assert quote.market_cap == 19_500_000_000_000
+    assert quote.avg_volume == 6_200_000
+    assert (quote.pe_ratio, quote.dividend_yield) == (28.41, 0.34)
+    assert quote.primary_exchange == "NSE"
+    assert quote.raw["price"] == "₹2,945.10"
+    assert not quote.is_empty
+
+
+def test_quote_is_empty_when_nothing_parses():
+    quote = Quote.from_display({"price": "N/A", "market_cap": "-", "primary_exchange": "NSE"}, symbol="X")
+    assert quote.is_empty
+    assert "raw" not in quote.to_dict()
+
+
+def test_columns_round_trip():
+    quotes = [
+        Quote.from_display({"price": "₹10.50", "market_cap": "1.2B INR"}, symbol="A"),
+        Quote.from_display({"price": "N/A"}, symbol="B"),
+    ]
+    columns = quotes_to_columns(quotes, include_raw=True)
+    assert columns["symbol"] == ["A", "B"]
+    assert columns["price"] == [10.5, None]
+    assert quotes_from_columns(columns) == quotes
+    # Without raw the display strings are dropped but the numbers survive
+    restored = quotes_from_columns(quotes_to_columns(quotes))
+    assert [q.to_dict() for q in restored] == [q.to_dict() for q in quotes]
+    assert quotes_from_columns({}) == []
@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from api import scheduler
+from api.scheduler import PeriodicJob
+from database import models
+from database.async_crud import acquire_job_lease, release_job_lease
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def acquire(sessions, owner, lease_seconds=60.0, name="refresh"):
+    async with sessions() as db:
+        return await acquire_job_lease(db, name, owner, lease_seconds)
+
+
+async def release(sessions, owner, name="refresh"):
+    async with sessions() as db:
+        await release_job_lease(db, name, owner)
+
+
+async def lease_row(sessions, name="refresh"):
+    async with sessions() as db:
+        return (await db.execute(select(models.JobLease).where(models.JobLease.name == name))).scalar_one()
+
+
+# --- Job leases ---
+def test_lease_is_exclusive_until_released(async_sessions):
+    async def main():
+        assert await acquire(async_sessions, "worker-a")
+        assert not await acquire(async_sessions, "worker-b")
+        await release(async_sessions, "worker-b")  # not the holder: no effect
+        assert not await acquire(async_sessions, "worker-b")
+        await release(async_sessions, "worker-a")
+        assert await acquire(async_sessions, "worker-b")
+        assert (await lease_row(async_sessions)).owner == "worker-b"
+
+    run(main())
+
+
+def test_holder_renews_and_expired_leases_are_taken_over(async_sessions):
+    async def main():
+        assert await acquire(async_sessions, "worker-a", lease_seconds=1)
+        first = (await lease_row(async_sessions)).locked_until
+        assert await acquire(async_sessions, "worker-a", lease_seconds=60)
+        assert (await lease_row(async_sessions)).locked_until > first
+        # A lease left behind by a crashed worker
+        assert await acquire(async_sessions, "worker-a", lease_seconds=-1)
+        assert await acquire(async_sessions, "worker-b")
+
+    run(main())
+
+
+def test_leases_are_per_job(async_sessions):
+    async def main():
+        assert await acquire(async_sessions, "worker-a", name="refresh")
+        assert await acquire(async_sessions, "worker-b", name="compact")
+
+    run(main())
+
+
+def test_concurrent_first_acquire_has_one_winner(async_sessions):
+    async def main():
+        return await asyncio.gather(*(acquire(async_sessions, f"worker-{i}") for i in range(4)))
+
+    assert sorted(run(main())) == [False, False, False, True]
+
+
+# --- PeriodicJob ---
+@pytest.fixture
+def job_sessions(async_sessions, monkeypatch):
+    monkeypatch.setattr(scheduler, "AsyncSessionLocal", async_sessions)
+    return async_sessions
+
+
+def test_overlapping_runs_share_one_execution(job_sessions):
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"n": len(calls)}
+
+    job = PeriodicJob("refresh", work, interval=60)
+
+    async def main():
+        return await asyncio.gather(job.run_once(), job.run_once())
+
+    assert run(main()) == [{"n": 1}, {"n": 1}]
+    assert calls == [1] and job.runs == 1 and job.skipped == 1
+    # The lease is released once the run is over
+    assert run(acquire(job_sessions, "another-worker"))
+
+
+def test_another_workers_lease_skips_the_run_unless_forced(job_sessions):
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return {"ok": True}
+
+    job = PeriodicJob("refresh", work, interval=60)
+    run(acquire(job_sessions, "another-worker"))
+    assert run(job.run_once()) is None
+    assert calls == [] and job.skipped == 1
+    assert run(job.run_once(force=True)) == {"ok": True}
+    assert calls == [1]
+
+
+def test_failures_are_recorded_and_release_the_lease(job_sessions):
+    async def work():
+        raise RuntimeError("upstream down")
+
+    job = PeriodicJob("refresh", work, interval=60)
+    assert run(job.run_once()) is None
+    stats = job.stats()
+    assert stats["failures"] == 1 and stats["runs"] == 0
+    assert stats["last_error"] == "upstream down" and not stats["running"]
+    assert run(acquire(job_sessions, "another-worker"))
+
+
+def test_a_failed_lease_acquire_skips_the_run_and_the_loop_goes_on(job_sessions, monkeypatch):
+    calls, attempts = [], []
+
+    async def work():
+        calls.append(1)
+        return {"ok": True}
+
+    async def flaky_acquire(db, name, owner, lease_seconds):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        return await acquire_job_lease(db, name, owner, lease_seconds)
+
+    monkeypatch.setattr(scheduler, "acquire_job_lease", flaky_acquire)
+    job = PeriodicJob("refresh", work, interval=60)
+    job._next_delay = lambda: 0.01
+
+    async def main():
+        job.start()
+        for _ in range(100):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+        await job.stop()
+
+    run(main())
+    assert calls
+    stats = job.stats()
+    assert stats["skipped"] == 1 and stats["failures"] == 1 and stats["runs"] >= 1
+    assert stats["last_error"] is None  # cleared by the run that followed
+
+
+def test_stop_cancels_the_loop():
+    started = []
+
+    async def work():
+        started.append(1)
+        return {}
+
+    async def main():
+        job = PeriodicJob("refresh", work, interval=3600, run_on_start=False)
+        job.start()
+        await asyncio.sleep(0)
+        await job.stop()
+        return job
+
+    job = run(main())
+    assert started == [] and job._task is None
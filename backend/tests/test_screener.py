@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from api.quote_model import Quote
+from api.screener import ScreenerTable, crawl, parse_conditions
+from api.upstream import UpstreamNotFound
+
+
+# --- parse_conditions ---
+def test_parse_conditions_and_or_commas():
+    assert parse_conditions("pe_ratio < 15 AND dividend_yield >= 2%, change_pct != -1.5") == [
+        ("pe_ratio", "<", 15.0), ("dividend_yield", ">=", 2.0), ("change_pct", "!=", -1.5),
+    ]
+    assert parse_conditions(None) == [] and parse_conditions("  ") == []
+
+
+@pytest.mark.parametrize("where, value", [
+    ("market_cap > 1,000", 1000.0),
+    ("market_cap > 1,00,000", 100000.0),  # lakh grouping
+    ("avg_volume>2,500,000.5", 2500000.5),
+])
+def test_parse_conditions_thousands_separators(where, value):
+    assert parse_conditions(where) == [(where.split(">")[0].strip(), ">", value)]
+
+
+def test_parse_conditions_separator_comma_after_a_number():
+    assert parse_conditions("pe_ratio<15,dividend_yield>2") == [("pe_ratio", "<", 15.0), ("dividend_yield", ">", 2.0)]
+
+
+@pytest.mark.parametrize("where, message", [
+    ("pe_ratio <", "Can't parse condition"),
+    ("pe_ratio ~ 3", "Can't parse condition"),
+    ("price_to_book < 3", "Unknown column"),
+])
+def test_parse_conditions_rejects(where, message):
+    with pytest.raises(ValueError, match=message):
+        parse_conditions(where)
+
+
+# --- ScreenerTable ---
+@pytest.fixture
+def table():
+    table = ScreenerTable(["TCS", "INFY", "ITC", "NEW"], ["Tata", "Infosys", "ITC", "Not crawled"])
+    table.update(Quote("TCS", price=110.0, previous_close=100.0, year_low=90.0, year_high=130.0,
+                       market_cap=15 * 10**12, pe_ratio=30.0, dividend_yield=1.2), updated_at=1.0)
+    table.update(Quote("INFY", price=95.0, previous_close=100.0, market_cap=6 * 10**12,
+                       pe_ratio=22.0, dividend_yield=2.8), updated_at=1.0)
+    table.update(Quote("ITC", price=400.0, previous_close=400.0, pe_ratio=None, dividend_yield=3.5), updated_at=1.0)
+    return table
+
+
+def test_update_derives_change_and_52_week_position(table):
+    row = table.query([("change_pct", ">", 5)])[1][0]
+    assert row["symbol"] == "TCS" and row["change_pct"] == 10.0 and row["pos_52w"] == 0.5
+    assert table.update(Quote("UNLISTED", price=1.0)) is False
+    assert table.populated == 3
+
+
+def test_query_filters_sorts_and_puts_unknown_values_last(table):
+    total, rows = table.query([("dividend_yield", ">", 1)], sort="market_cap", descending=True)
+    assert total == 3
+    assert [r["symbol"] for r in rows] == ["TCS", "INFY", "ITC"]  # ITC has no market cap
+    total, rows = table.query([("dividend_yield", ">", 1)], sort="market_cap", descending=False)
+    assert [r["symbol"] for r in rows] == ["INFY", "TCS", "ITC"]
+
+
+def test_query_unknown_values_never_match_and_uncrawled_rows_are_skipped(table):
+    total, rows = table.query([("pe_ratio", ">", 0)], sort="pe_ratio", descending=False)
+    assert (total, [r["symbol"] for r in rows]) == (2, ["INFY", "TCS"])
+    total, _ = table.query([("pe_ratio", "!=", 1)])
+    assert total == 2  # NaN != 1 would be True in NumPy; the row has no P/E
+    assert table.query([])[0] == 3  # NEW has never been crawled
+
+
+def test_query_pages(table):
+    total, rows = table.query([], sort="dividend_yield", descending=True, offset=1, limit=1)
+    assert total == 3 and [r["symbol"] for r in rows] == ["INFY"]
+
+
+def test_reindex_keeps_rows_for_surviving_symbols(table):
+    moved = table.reindex(["ITC", "TCS", "HDFC"], ["ITC", "Tata", "HDFC Bank"])
+    assert moved.populated == 2
+    assert [r["symbol"] for r in moved.query([], sort="price")[1]] == ["ITC", "TCS"]
+
+
+def test_snapshot_round_trip(table, tmp_path):
+    path = str(tmp_path / "snapshot.npz")
+    table.save(path)
+    loaded = ScreenerTable.load(path)
+    assert loaded.symbols == table.symbols and loaded.names == table.names
+    assert loaded.query([("pe_ratio", "<", 25)]) == table.query([("pe_ratio", "<", 25)])
+
+
+# --- crawl ---
+def test_crawl_counts_outcomes_and_respects_concurrency():
+    in_flight, peak, seen = [0], [0], {}
+
+    async def fetch(symbol):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        if symbol == "GONE":
+            raise UpstreamNotFound(symbol)
+        if symbol == "BAD":
+            raise RuntimeError("captcha")
+        return symbol.lower()
+
+    symbols = ["A", "B", "GONE", "C", "BAD", "D"]
+    stats = asyncio.run(crawl(symbols, fetch, seen.__setitem__, concurrency=2, rate=0))
+    assert (stats["fetched"], stats["not_found"], stats["failed"]) == (4, 1, 1)
+    assert seen == {"A": "a", "B": "b", "C": "c", "D": "d"}
+    assert peak[0] == 2
@@ -0,0 +1,133 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from api import scraper, summarizer
+from api.cache import TTLCache
+from api.extractors import QuotePage
+from api.summarizer import stream_content
+
+NEWS = [
+    {"headline": "Slow story", "link": "https://n.example/slow"},
+    {"headline": "Fast story", "link": "https://n.example/fast"},
+    {"headline": "Stuck story", "link": "https://n.example/stuck"},
+]
+DELAYS = {"https://n.example/slow": 0.1, "https://n.example/fast": 0.0, "https://n.example/stuck": 10.0}
+
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.fixture
+def analysis(async_sessions, monkeypatch):
+    prompts = []
+
+    async def get_quote(symbol):
+        return QuotePage(stock_data={"price": "₹1,520.40"}, news=NEWS)
+
+    async def scrape_article_clean(url):
+        await asyncio.sleep(DELAYS[url])
+        return f"Article from {url} about quarterly results."
+
+    async def technicals(symbol, quote):
+        return None, ""
+
+    async def fake_stream_content(prompt, config):
+        prompts.append(prompt)
+        for chunk in ("Hold ", "for now."):
+            yield chunk
+
+    monkeypatch.setattr(scraper, "get_quote", get_quote)
+    monkeypatch.setattr(scraper, "scrape_article_clean", scrape_article_clean)
+    monkeypatch.setattr(scraper, "_technicals", technicals)
+    monkeypatch.setattr(scraper, "stream_content", fake_stream_content)
+    monkeypatch.setattr(scraper, "AsyncSessionLocal", async_sessions)
+    monkeypatch.setattr(scraper, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(scraper, "NEWS_FANOUT_DEADLINE", 0.5)
+    return prompts
+
+
+def stream(format="sse") -> str:
+    async def main():
+        response = await scraper.stream_stock_analysis(symbol="infy", format=format, debug_context=False)
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    return asyncio.run(main())
+
+
+def test_events_arrive_as_each_stage_completes(analysis):
+    events = parse_sse(stream())
+    assert [name for name, _ in events] == [
+        "stock_data", "article", "article", "article_timed_out", "analysis", "analysis", "done",
+    ]
+    assert events[0][1] == {"symbol": "INFY", "price": "₹1,520.40"}
+    # Articles in completion order...
+    assert [data["link"] for name, data in events if name == "article"] == [
+        "https://n.example/fast", "https://n.example/slow",
+    ]
+    assert events[3][1] == {"headline": "Stuck story", "link": "https://n.example/stuck"}
+    assert "".join(data["text"] for name, data in events if name == "analysis") == "Hold for now."
+    # ...but the prompt follows the page's order, so its cache key is stable
+    [prompt] = analysis
+    assert prompt.index("n.example/slow") < prompt.index("n.example/fast")
+    assert "n.example/stuck" not in prompt
+
+
+def test_ndjson_format_and_errors_as_events(analysis, monkeypatch):
+    lines = [json.loads(line) for line in stream("ndjson").splitlines()]
+    assert lines[0]["event"] == "stock_data" and lines[-1]["event"] == "done"
+
+    async def failing_quote(symbol):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(scraper, "get_quote", failing_quote)
+    assert parse_sse(stream()) == [("error", {"detail": "Stock analysis failed: upstream down"})]
+
+
+# --- stream_content ---
+class FakeStreamResponse:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def raise_for_status(self):
+        pass
+
+    async def aiter_lines(self):
+        for chunk in self.chunks:
+            yield "data: " + json.dumps({"candidates": [{"content": {"parts": [{"text": chunk}]}}]})
+            yield ""
+
+
+class FakeGemini:
+    def __init__(self, *chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    @asynccontextmanager
+    async def stream(self, method, url, **kwargs):
+        self.calls += 1
+        yield FakeStreamResponse(self.chunks)
+
+
+def test_streamed_answers_are_memoized(async_sessions, monkeypatch):
+    gemini = FakeGemini("Buy ", "on dips.")
+    monkeypatch.setattr(summarizer, "http_client", gemini)
+    monkeypatch.setattr(summarizer, "AsyncSessionLocal", async_sessions)
+    monkeypatch.setattr(summarizer, "summary_cache", TTLCache(maxsize=16, ttl=60))
+
+    async def collect():
+        return [chunk async for chunk in stream_content("Analyse HDFC", {"temperature": 0.3})]
+
+    assert asyncio.run(collect()) == ["Buy ", "on dips."]
+    # Cached: the whole answer in one piece, no second call
+    assert asyncio.run(collect()) == ["Buy on dips."]
+    monkeypatch.setattr(summarizer, "summary_cache", TTLCache(maxsize=16, ttl=60))
+    assert asyncio.run(collect()) == ["Buy on dips."]  # from the summary_cache table
+    assert gemini.calls == 1
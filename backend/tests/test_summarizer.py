@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from api import summarizer
+from api.cache import TTLCache
+from api.summarizer import generate_content, prompt_cache_key
+
+CONFIG = {"temperature": 0.3, "maxOutputTokens": 100}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeResponse:
+    def __init__(self, text=None, error=None):
+        self.text, self.error = text, error
+
+    def raise_for_status(self):
+        if self.error:
+            raise self.error
+
+    def json(self):
+        return {"candidates": [{"content": {"parts": [{"text": self.text}]}}]}
+
+
+class FakeGemini:
+    """Stands in for http_client: post() answers with the next queued response."""
+
+    def __init__(self):
+        self.responses = []
+        self.calls = 0
+
+    async def post(self, url, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def gemini(async_sessions, monkeypatch):
+    fake = FakeGemini()
+    monkeypatch.setattr(summarizer, "http_client", fake)
+    monkeypatch.setattr(summarizer, "AsyncSessionLocal", async_sessions)
+    monkeypatch.setattr(summarizer, "summary_cache", TTLCache(maxsize=16, ttl=60))
+    return fake
+
+
+def test_identical_prompts_share_one_call(gemini):
+    gemini.responses = [FakeResponse(" Bullish. ")]
+
+    async def main():
+        return await asyncio.gather(*(generate_content("Analyse TCS", CONFIG) for _ in range(3)))
+
+    assert run(main()) == ["Bullish."] * 3
+    assert run(generate_content("Analyse TCS", CONFIG)) == "Bullish."
+    assert gemini.calls == 1
+    assert summarizer.summary_cache.stats()["coalesced"] == 2
+
+
+def test_stored_answers_survive_a_restart(gemini, monkeypatch):
+    gemini.responses = [FakeResponse("Bearish.")]
+    run(generate_content("Analyse INFY", CONFIG))
+    monkeypatch.setattr(summarizer, "summary_cache", TTLCache(maxsize=16, ttl=60))
+    assert run(generate_content("Analyse INFY", CONFIG)) == "Bearish."
+    assert gemini.calls == 1
+
+
+def test_config_is_part_of_the_key_and_errors_are_not_cached(gemini):
+    assert prompt_cache_key("p", CONFIG) != prompt_cache_key("p", {**CONFIG, "temperature": 0.9})
+    gemini.responses = [FakeResponse(error=RuntimeError("429")), FakeResponse("Neutral.")]
+    with pytest.raises(RuntimeError):
+        run(generate_content("Analyse ITC", CONFIG))
+    assert run(generate_content("Analyse ITC", CONFIG)) == "Neutral."
+    assert gemini.calls == 2
@@ -0,0 +1,52 @@
+import pytest
+
+from api.symbol_index import SymbolIndex
+
+PAIRS = [
+    ("TATAMOTORS", "TATA MOTORS LTD"),
+    ("TATASTEEL", "TATA STEEL LTD"),
+    ("TCS", "TATA CONSULTANCY SERVICES LTD"),
+    ("M&M", "MAHINDRA & MAHINDRA LTD"),
+    ("HEROMOTOCO", "HERO MOTOCORP LTD"),
+    ("INFY", "INFOSYS LTD"),
+    ("INFY", "INFOSYS LTD"),  # duplicate row in the CSV
+]
+
+
+@pytest.fixture
+def index():
+    return SymbolIndex(PAIRS)
+
+
+def symbols(results) -> list[str]:
+    return [hit["symbol"] for hit in results]
+
+
+def test_duplicates_are_dropped(index):
+    assert len(index) == 6
+    assert index.name_for(" infy ") == "INFOSYS LTD"
+    assert index.name_for("WIPRO") is None
+
+
+def test_exact_symbol_comes_before_prefix_matches(index):
+    assert symbols(index.search("tcs")) == ["TCS"]
+    assert symbols(index.search("TATA"))[:3] == ["TATAMOTORS", "TATASTEEL", "TCS"]
+
+
+def test_exact_name_and_word_prefix(index):
+    assert symbols(index.search("infosys ltd")) == ["INFY"]
+    # Any word of the name is a prefix key
+    assert symbols(index.search("motors")) == ["TATAMOTORS"]
+    assert symbols(index.search("MAHINDRA &"))[0] == "M&M"
+
+
+def test_typos_fall_back_to_fuzzy_matching(index):
+    assert symbols(index.search("infosis"))[0] == "INFY"
+    assert index.search("zzzzzz") == []
+    assert index.search("   ") == []
+
+
+def test_limit_and_result_cache(index):
+    assert len(index.search("T", limit=2)) == 2
+    first = index.search("tata")
+    assert index.search("TATA ") is first
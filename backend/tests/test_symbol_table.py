@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from api import symbol_table as symbol_table_module
+from api.symbol_table import SymbolTable, read_snapshot, read_symbol_csv, write_snapshot
+
+
+def write_csv(path, rows, mtime=None):
+    path.write_text("SYMBOL,NAME OF COMPANY\n" + "".join(",".join(row) + "\n" for row in rows), encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "symbols.csv"
+    write_csv(path, [("infy", " Infosys Ltd "), ("TCS", "Tata Consultancy Services Ltd"), ("bad-row",)], mtime=1_000)
+    return path
+
+
+def test_csv_rows_are_normalised(csv_path):
+    symbols, names = read_symbol_csv(str(csv_path))
+    assert symbols == ["SYMBOL", "INFY", "TCS"]
+    assert names[1] == "INFOSYS LTD"
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "symbols.snapshot")
+    symbols, names = ["M&M", "NESTLÉ"], ["MAHINDRA & MAHINDRA", "NESTLÉ INDIA"]
+    write_snapshot(path, symbols, names)
+    assert read_snapshot(path) == (symbols, names)
+    (tmp_path / "junk").write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError):
+        read_snapshot(str(tmp_path / "junk"))
+
+
+def test_first_load_writes_a_snapshot_and_later_loads_use_it(csv_path, tmp_path):
+    snapshot = tmp_path / "symbols.snapshot"
+    table = SymbolTable(str(csv_path), str(snapshot))
+    assert table.name_for("infy") == "INFOSYS LTD"
+    assert table.loaded_from == "csv" and snapshot.exists()
+
+    fresh = SymbolTable(str(csv_path), str(snapshot))
+    assert fresh.symbols() == table.symbols()
+    assert fresh.loaded_from == "snapshot"
+
+
+def test_edited_csv_is_reloaded_and_replaces_a_stale_snapshot(csv_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(symbol_table_module, "RELOAD_CHECK_INTERVAL", 0)
+    snapshot = tmp_path / "symbols.snapshot"
+    table = SymbolTable(str(csv_path), str(snapshot))
+    assert table.name_for("WIPRO") is None
+
+    write_csv(csv_path, [("WIPRO", "Wipro Ltd")], mtime=2_000)
+    os.utime(snapshot, (1_500, 1_500))  # older than the CSV now
+    assert table.name_for("WIPRO") == "WIPRO LTD"
+    assert table.loaded_from == "csv"
+    assert read_snapshot(str(snapshot))[0] == ["SYMBOL", "WIPRO"]
+
+
+def test_missing_csv_keeps_serving_the_loaded_index(csv_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(symbol_table_module, "RELOAD_CHECK_INTERVAL", 0)
+    table = SymbolTable(str(csv_path), str(tmp_path / "symbols.snapshot"))
+    index = table.index()
+    csv_path.unlink()
+    assert table.index() is index
+    with pytest.raises(OSError):
+        SymbolTable(str(csv_path), str(tmp_path / "other.snapshot")).index()
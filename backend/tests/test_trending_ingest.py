@@ -0,0 +1,56 @@
+from database import crud, models
+
+
+def item(n, headline=None, article=None, snippet=""):
+    return {
+        "link": f"https://n.example/{n}",
+        "headline": headline or f"Headline {n}",
+        "snippet": snippet,
+        "article": article if article is not None else f"Article text {n}",
+    }
+
+
+def articles_by_link(db) -> dict[str, str]:
+    rows = db.query(models.TrendingNews.id, models.TrendingNews.link).all()
+    texts = crud.get_trending_articles(db, [row.id for row in rows])
+    return {row.link: texts.get(row.id) for row in rows}
+
+
+def test_first_crawl_inserts_one_row_per_link(db):
+    items = [item(1), item(2, headline="Old"), item(2, headline="New"), {"headline": "no link"}]
+    assert crud.bulk_upsert_trending_news(db, items) == {"inserted": 2, "updated": 0, "unchanged": 0}
+    assert db.query(models.TrendingNews).filter_by(link="https://n.example/2").one().headline == "New"
+    assert articles_by_link(db) == {"https://n.example/1": "Article text 1", "https://n.example/2": "Article text 2"}
+    assert crud.bulk_upsert_trending_news(db, []) == {"inserted": 0, "updated": 0, "unchanged": 0}
+
+
+def test_recrawl_only_rewrites_what_changed(db):
+    crud.bulk_upsert_trending_news(db, [item(1), item(2), item(3)])
+    fetched = {row.link: row.fetched_at for row in db.query(models.TrendingNews)}
+    counts = crud.bulk_upsert_trending_news(db, [
+        item(1),  # identical
+        item(2, headline="Headline 2 (updated)"),
+        item(3, article="Rewritten article"),
+        item(4),
+    ])
+    assert counts == {"inserted": 1, "updated": 2, "unchanged": 1}
+    rows = {row.link: row for row in db.query(models.TrendingNews)}
+    assert rows["https://n.example/1"].fetched_at == fetched["https://n.example/1"]
+    assert rows["https://n.example/3"].fetched_at > fetched["https://n.example/3"]
+    assert articles_by_link(db)["https://n.example/3"] == "Rewritten article"
+
+
+def test_insert_only_mode_leaves_existing_rows_alone(db):
+    crud.bulk_upsert_trending_news(db, [item(1)])
+    counts = crud.bulk_upsert_trending_news(db, [item(1, headline="Changed", article="Changed")], update_existing=False)
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 1}
+    assert db.query(models.TrendingNews).one().headline == "Headline 1"
+    assert articles_by_link(db)["https://n.example/1"] == "Article text 1"
+
+
+def test_new_and_changed_rows_are_searchable(db):
+    crud.ensure_news_fts(db)
+    crud.bulk_upsert_trending_news(db, [item(1, headline="Zomato quarterly loss")])
+    crud.bulk_upsert_trending_news(db, [item(1, headline="Zomato turns profitable")])
+    assert crud.search_news(db, '"profitable"')[0] == 1
+    assert crud.search_news(db, '"loss"')[0] == 0
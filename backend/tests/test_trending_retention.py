@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text, update
+
+from database import crud, models
+
+DAY = 86400
+
+
+def store(db, ages_in_days: dict[int, float]):
+    crud.ensure_news_fts(db)
+    crud.bulk_upsert_trending_news(db, [
+        {"link": f"https://n.example/{n}", "headline": f"Headline {n}", "article": f"Article {n}"}
+        for n in ages_in_days
+    ])
+    for n, age in ages_in_days.items():
+        db.execute(
+            update(models.TrendingNews).where(models.TrendingNews.link == f"https://n.example/{n}")
+            .values(fetched_at=datetime.utcnow() - timedelta(days=age))
+        )
+    db.commit()
+
+
+def stored_links(db) -> set[str]:
+    return {row.link for row in db.query(models.TrendingNews)}
+
+
+def indexed_links(db) -> set[str]:
+    return {row.link for row in db.execute(text("SELECT link FROM news_fts WHERE rowid > 0"))}
+
+
+def test_expired_and_over_limit_rows_go_with_their_bodies(db):
+    store(db, {1: 1, 2: 2, 3: 3, 4: 40})
+    counts = crud.compact_trending_news(db, max_age_seconds=30 * DAY, max_rows=2)
+    assert counts == {"expired": 1, "over_limit": 1, "orphan_bodies": 2, "migrated_inline": 0}
+    assert stored_links(db) == indexed_links(db) == {"https://n.example/1", "https://n.example/2"}
+    assert db.query(models.TrendingNewsBody).count() == 2
+
+
+def test_inline_articles_move_to_the_bodies_table(db):
+    db.add_all([
+        models.TrendingNews(headline=f"Legacy {n}", link=f"https://n.example/{n}", snippet="",
+                            article=f"Inline article {n}", fetched_at=datetime.utcnow())
+        for n in range(3)
+    ])
+    db.commit()
+    ids = [row.id for row in db.query(models.TrendingNews)]
+    before = crud.get_trending_articles(db, ids)
+
+    assert crud.compact_trending_news(db, 30 * DAY, 100, migrate_batch=2)["migrated_inline"] == 2
+    assert crud.compact_trending_news(db, 30 * DAY, 100, migrate_batch=2)["migrated_inline"] == 1
+    assert db.query(models.TrendingNews).filter(models.TrendingNews.article.is_not(None)).count() == 0
+    assert crud.get_trending_articles(db, ids) == before
+    assert crud.get_trending_article_by_link(db, "https://n.example/1")[0] == "Inline article 1"
+
+
+@pytest.mark.parametrize("codec", ["zlib", "none"])
+def test_article_codecs_round_trip(codec):
+    text_in = "Résultats trimestriels — ₹1,200 crore " * 50
+    stored_codec, data = crud.encode_article(text_in, codec)
+    assert stored_codec == codec
+    assert crud.decode_article(stored_codec, data) == text_in
+    if codec == "zlib":
+        assert len(data) < len(text_in.encode("utf-8")) / 4
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from api.upstream import (
+    BREAKER_MAX_OPEN_SECONDS,
+    BREAKER_MIN_CALLS,
+    BREAKER_OPEN_SECONDS,
+    CircuitBreaker,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    """Monotonic clock for the guard classes; sleep() advances it instead of waiting."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+# --- CircuitBreaker ---
+def trip(breaker: CircuitBreaker):
+    for _ in range(BREAKER_MIN_CALLS):
+        assert breaker.allow()
+        breaker.record(True)
+
+
+def test_breaker_needs_min_calls_before_tripping(clock):
+    breaker = CircuitBreaker(clock=clock.monotonic)
+    for _ in range(BREAKER_MIN_CALLS - 1):
+        breaker.record(True)
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "open" and breaker.trips == 1
+    assert not breaker.allow()
+
+
+def test_breaker_stays_closed_below_failure_ratio(clock):
+    breaker = CircuitBreaker(clock=clock.monotonic)
+    for i in range(BREAKER_MIN_CALLS * 2):
+        breaker.record(i % 3 == 0)  # a third of calls fail
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_allows_a_single_probe(clock):
+    breaker = CircuitBreaker(clock=clock.monotonic)
+    trip(breaker)
+    clock.now += BREAKER_OPEN_SECONDS - 1
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # the probe is still out
+
+
+def test_breaker_probe_success_closes(clock):
+    breaker = CircuitBreaker(clock=clock.monotonic)
+    trip(breaker)
+    clock.now += BREAKER_OPEN_SECONDS
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "closed"
+    assert breaker.open_seconds == BREAKER_OPEN_SECONDS
+    assert breaker.stats()["recent_failure_ratio"] == 0.0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_probe_failure_reopens_with_doubled_cooldown(clock):
+    breaker = CircuitBreaker(clock=clock.monotonic)
+    trip(breaker)
+    expected = BREAKER_OPEN_SECONDS
+    for _ in range(8):
+        clock.now += breaker.open_seconds
+        assert breaker.allow()
+        breaker.record(True)
+        expected = min(expected * 2, BREAKER_MAX_OPEN_SECONDS)
+        assert breaker.state == "open"
+        assert breaker.open_seconds == expected
+        assert breaker.stats()["reopens_in_seconds"] == expected
+    assert breaker.open_seconds == BREAKER_MAX_OPEN_SECONDS
+
+
+def test_breaker_lost_probe_expires(clock):
+    breaker = CircuitBreaker(clock=clock.monotonic)
+    trip(breaker)
+    clock.now += BREAKER_OPEN_SECONDS
+    assert breaker.allow()
+    # The probe never reports back; another is allowed after a cool-down
+    clock.now += BREAKER_OPEN_SECONDS
+    assert breaker.allow()
+
+
+# --- TokenBucket ---
+def test_bucket_serves_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock.monotonic, sleep=clock.sleep)
+
+    async def main():
+        for _ in range(5):
+            await bucket.acquire()
+
+    asyncio.run(main())
+    assert clock.sleeps == [pytest.approx(0.5), pytest.approx(0.5)]
+    assert bucket.waits == 2
+    assert bucket.wait_seconds == pytest.approx(1.0)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=10.0, burst=2, clock=clock.monotonic, sleep=clock.sleep)
+
+    async def main():
+        await bucket.acquire()
+        await bucket.acquire()
+        clock.now += 60  # long idle: still only `burst` tokens
+        for _ in range(3):
+            await bucket.acquire()
+
+    asyncio.run(main())
+    assert clock.sleeps == [pytest.approx(0.1)]
+
+
+def test_bucket_pause_blocks_until_retry_after(clock):
+    bucket = TokenBucket(rate=1.0, burst=5, clock=clock.monotonic, sleep=clock.sleep)
+
+    async def main():
+        bucket.pause(30)
+        await bucket.acquire()
+
+    asyncio.run(main())
+    # Waits out the pause, then for one token to accrue from an empty bucket
+    assert clock.sleeps == [pytest.approx(30), pytest.approx(1.0)]
+
+
+def test_bucket_takes_the_token_it_waited_for(clock):
+    # 1/3 s refills don't sum back to exactly one token in floating point
+    bucket = TokenBucket(rate=3.0, burst=1, clock=clock.monotonic, sleep=clock.sleep)
+
+    async def main():
+        for _ in range(50):
+            await bucket.acquire()
+
+    asyncio.run(main())
+    assert len(clock.sleeps) == 49
+    assert clock.now == pytest.approx(1000 + 49 / 3)
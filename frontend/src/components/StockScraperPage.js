@@ -79,27 +79,15 @@ const fetchStockData = async () => {
     setLoading(false);
   };
 
+  // Trending news is crawled by a backend job; this is just a cheap read
   useEffect(() => {
-    const lastFetch = localStorage.getItem("lastTrendFetch");
-    console.log(lastFetch)
-    if (!lastFetch) {
-      fetchtrend();
-    } else {
-      const lastDate = new Date(lastFetch);
-      const now = new Date();
-
-      const oneDayMs = 24 * 60 * 60 * 1000;
-      if (now - lastDate > oneDayMs) {
-        fetchtrend();
-      }
-    }
+    fetchtrend();
   }, []);
 
   const fetchtrend = async () => {
     try {
       const data = await apiFetch(`/api/trending-news-india`);
       settrendnews(data.news);
-      localStorage.setItem("lastTrendFetch", new Date().toISOString());
     } catch (e) {
       setError("Failed to fetch trending news");
     }